@@ -1,12 +1,14 @@
 # analyze_budgets.py
-import pdfplumber, re, json
+import re, json
 from pathlib import Path
 from collections import OrderedDict
+from page_cache import PageTextCache, DEFAULT_CACHE
 
 PDF = Path("gov.pdf")
 EXTRACTED_JSON = Path("output_json_improved_full") / "all_demands_improved_full.json"
 OUT_MAP = Path("ministry_department_mapping_full.json")
 OUT_ANALYSIS = Path("budget_analysis_full.json")
+PAGE_CACHE = DEFAULT_CACHE  # filled by extract.py; PDF parsing is skipped if it has gov.pdf
 
 num_tok_re = re.compile(r"^-?\d[\d,]*(?:\.\d+)?$|^\.\.\.$")
 page_range_re = re.compile(r"^\d+(?:-\d+)?$")
@@ -31,27 +33,28 @@ def split_name_and_numeric_tail(tokens, max_nums=4):
     return tokens[:idx], nums
 
 def extract_summary_lines(pdf_path):
-    """Extracts full SBE summary region from PDF."""
-    with pdfplumber.open(pdf_path) as pdf:
-        lines = []
-        total_pages = len(pdf.pages)
-        found_start = None
-        found_end = None
-        for pno in range(total_pages):
-            text = pdf.pages[pno].extract_text()
-            if not text: continue
-            page_lines = [re.sub(r"\s+", " ", l).strip() for l in text.splitlines() if l.strip()]
-            for li, L in enumerate(page_lines):
-                if not found_start and ("SBE Summary" in L or "Summary of Contents" in L):
-                    found_start = (pno, li)
-                if "Notes on Demand" in L or L.startswith("Notes on Demand"):
-                    found_end = (pno, li)
-            lines.extend(page_lines)
-        if not found_start:
-            raise RuntimeError("Could not locate SBE Summary section.")
-        if not found_end:
-            found_end = (total_pages-1, len(lines))
-        return lines, found_start, found_end
+    """Extracts full SBE summary region from PDF (page texts via page_cache)."""
+    cache = PageTextCache(PAGE_CACHE)
+    texts = cache.texts(pdf_path)
+    cache.close()
+    lines = []
+    total_pages = len(texts)
+    found_start = None
+    found_end = None
+    for pno, text in enumerate(texts):
+        if not text: continue
+        page_lines = [re.sub(r"\s+", " ", l).strip() for l in text.splitlines() if l.strip()]
+        for li, L in enumerate(page_lines):
+            if not found_start and ("SBE Summary" in L or "Summary of Contents" in L):
+                found_start = (pno, li)
+            if "Notes on Demand" in L or L.startswith("Notes on Demand"):
+                found_end = (pno, li)
+        lines.extend(page_lines)
+    if not found_start:
+        raise RuntimeError("Could not locate SBE Summary section.")
+    if not found_end:
+        found_end = (total_pages-1, len(lines))
+    return lines, found_start, found_end
 
 def parse_summary_lines(lines):
     ministries = OrderedDict()
@@ -0,0 +1,82 @@
+# bench_bundle.py
+#
+# budget_bundle.json vs the per-demand layout the budget pages used
+# (sequential fetches of DEMAND_1..120.json, indented JSON).
+#
+#   size:  bytes on the wire, raw / gzip / brotli (if installed)
+#   parse: json.loads of the 102 files vs the bundle + expand_bundle
+#   load:  modelled page-load time, requests x RTT + bytes / bandwidth
+#          (the old pages awaited each of the 120 requests in turn)
+#
+# Run from public/data/:
+#   python benchmarks/bench_bundle.py [--rtt-ms 50] [--mbps 20]
+import argparse, glob, gzip, json, os, sys, time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from budget_bundle import BUNDLE_NAME, build_bundle, expand_bundle, load_demand_files  # noqa: E402
+from extract import output_dir  # noqa: E402
+
+OLD_REQUESTS = 120   # the pages tried DEMAND_1 .. DEMAND_120
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def encodings(raw):
+    out = {"raw": len(raw), "gzip": len(gzip.compress(raw, 9))}
+    if brotli is not None:
+        out["br"] = len(brotli.compress(raw, quality=11))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rtt-ms", type=float, default=50)
+    ap.add_argument("--mbps", type=float, default=20)
+    args = ap.parse_args()
+
+    files = []
+    for p in glob.glob(os.path.join(output_dir, "DEMAND_*.json")):
+        with open(p, "rb") as f:
+            files.append(f.read())
+    bundle_path = os.path.join(output_dir, BUNDLE_NAME)
+    with open(bundle_path, "rb") as f:
+        bundle_raw = f.read()
+
+    demands = load_demand_files(output_dir)
+    assert expand_bundle(json.loads(bundle_raw)) == demands, "bundle is stale: run budget_bundle.py"
+
+    old_sizes = {}
+    for raw in files:
+        for enc, n in encodings(raw).items():
+            old_sizes[enc] = old_sizes.get(enc, 0) + n
+    new_sizes = encodings(bundle_raw)
+
+    print(f"{len(files)} demand files vs {BUNDLE_NAME} ({len(json.loads(bundle_raw)['strings'])} interned strings)")
+    print(f"{'size KB':<10}" + "".join(f"{enc:>10}" for enc in new_sizes))
+    print(f"{'per-file':<10}" + "".join(f"{old_sizes[enc] / 1024:>10.0f}" for enc in new_sizes))
+    print(f"{'bundle':<10}" + "".join(f"{new_sizes[enc] / 1024:>10.0f}" for enc in new_sizes))
+
+    old_parse = best_of(lambda: [json.loads(raw) for raw in files])
+    new_parse = best_of(lambda: expand_bundle(json.loads(bundle_raw)))
+    build = best_of(lambda: json.dumps(build_bundle(demands), separators=(",", ":")).encode())
+    print(f"parse ms: per-file {old_parse * 1000:.1f}, bundle + expand {new_parse * 1000:.1f} "
+          f"(building the bundle: {build * 1000:.1f})")
+
+    bytes_per_s = args.mbps * 1e6 / 8
+    wire = "br" if "br" in new_sizes else "gzip"
+    old_load = OLD_REQUESTS * args.rtt_ms / 1000 + old_sizes["raw"] / bytes_per_s
+    new_load = args.rtt_ms / 1000 + new_sizes[wire] / bytes_per_s
+    print(f"modelled load at {args.rtt_ms:.0f} ms RTT, {args.mbps:.0f} Mbit/s: "
+          f"per-file {old_load:.2f}s (uncompressed static files), bundle {new_load:.2f}s ({wire})")
+
+if __name__ == "__main__":
+    main()
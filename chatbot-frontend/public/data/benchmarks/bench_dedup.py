@@ -0,0 +1,68 @@
+# bench_dedup.py
+#
+# Item de-duplication in extract.py: the old any() scan over the
+# section vs DemandParser.append_unique (hashed key index).
+#
+# Replays the items of the largest sections in output_json_improved_full
+# (every item offered twice, as rows repeated on continuation pages
+# are), then the same sections grown to a few thousand lines to show
+# how both scale. Checks that both keep exactly the same items in the
+# same order.
+#
+# Run from public/data/:
+#   python benchmarks/bench_dedup.py
+import glob, json, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extract import DemandParser, output_dir  # noqa: E402
+
+def old_append(section, item, by_code):
+    if by_code:
+        if not any(it.get("code")==item["code"] and it.get("name")==item["name"] and it.get("values")==item["values"] for it in section["items"]):
+            section["items"].append(item)
+    elif not any(it.get("name")==item["name"] and it.get("values")==item["values"] for it in section["items"]):
+        section["items"].append(item)
+
+def replay(use_index, offers):
+    parser = DemandParser()
+    parser.current_section = section = {"heading": "bench", "items": []}
+    start = time.perf_counter()
+    for item, by_code in offers:
+        if use_index:
+            parser.append_unique(item, by_code)
+        else:
+            old_append(section, item, by_code)
+    return time.perf_counter() - start, section["items"]
+
+def offers_for(items, size):
+    grown = []
+    for n in range(size):
+        item = dict(items[n % len(items)])
+        if n >= len(items):   # copies beyond the real section get their own code
+            item["code"] = f"{item['code'] or 'T'}.{n}"
+            item["name"] = f"{item['name']} #{n}"
+        grown.append(item)
+    offers = [(it, it["code"] is not None) for it in grown]
+    return offers + offers
+
+def main():
+    sections = []
+    for path in glob.glob(os.path.join(output_dir, "DEMAND_*.json")):
+        with open(path, encoding="utf-8") as f:
+            demand = json.load(f)
+        for sec in demand["sections"]:
+            sections.append((len(sec["items"]), os.path.basename(path), sec))
+    sections.sort(key=lambda s: -s[0])
+
+    print(f"{'section':<28} {'items':>6} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+    cases = [(f"{name} (real)", sec["items"], len(sec["items"])) for _, name, sec in sections[:5]]
+    cases += [(f"{sections[0][1]} x{size}", sections[0][2]["items"], size) for size in (200, 1000, 5000)]
+    for label, items, size in cases:
+        offers = offers_for(items, size)
+        old_s, old_items = replay(False, offers)
+        new_s, new_items = replay(True, offers)
+        assert json.dumps(old_items) == json.dumps(new_items), label
+        print(f"{label:<28} {len(new_items):>6} {old_s * 1000:>9.2f} {new_s * 1000:>9.2f} {old_s / new_s:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
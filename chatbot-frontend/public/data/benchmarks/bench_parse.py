@@ -0,0 +1,213 @@
+# bench_parse.py
+#
+# Per-page parse throughput of extract.DemandParser: the old feed()
+# (re.sub + separate regex calls per line, lookahead lines re-cleaned,
+# a 14-line window re-normalized per new demand) vs the current one
+# (each line cleaned, split and classified once).
+#
+# Page texts come from the page-text cache when --pdf is given (the
+# PDF is extracted once if it isn't cached yet); otherwise pages are
+# rebuilt from output_json_improved_full/DEMAND_*.json, 45 lines each,
+# laid out the way the budget PDF prints them. Both parsers must
+# produce exactly the same demands.
+#
+# Run from public/data/:
+#   python benchmarks/bench_parse.py
+#   python benchmarks/bench_parse.py --pdf gov.pdf
+import argparse, glob, json, os, re, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extract import (  # noqa: E402
+    DemandParser, output_dir, demand_re, ministry_re, department_re, num_re, code_re,
+    is_numeric_token, parse_numbers, split_name_and_numeric_tail, values_dict_from_list,
+)
+
+LINES_PER_PAGE = 45
+REPEATS = 5
+
+class LegacyParser(DemandParser):
+    """feed() as it was before lines were cached and classified once."""
+
+    def feed(self, text):
+        if not text:
+            return
+        lines = text.split("\n")
+        for i, raw_line in enumerate(lines):
+            line = raw_line.strip()
+            line_clean = re.sub(r"\s+", " ", line)
+
+            dem = demand_re.search(line_clean)
+            if dem:
+                demand_no = int(dem.group(1))
+                if demand_no in self.demand_index:
+                    self.current_demand = self.demand_index[demand_no]
+                else:
+                    window_start = max(0, i-6)
+                    window_end = min(len(lines), i+8)
+                    ministry_val = None
+                    department_val = None
+                    for w in range(window_start, window_end):
+                        wline = re.sub(r"\s+", " ", lines[w].strip())
+                        mm = ministry_re.search(wline)
+                        if mm:
+                            ministry_val = mm.group(0).title().strip()
+                        dd = department_re.search(wline)
+                        if dd:
+                            department_val = dd.group(0).title().strip()
+                    new_d = {"demand_no": demand_no, "ministry": ministry_val, "department": department_val, "sections": []}
+                    self.data.append(new_d)
+                    self.demand_index[demand_no] = new_d
+                    self.current_demand = new_d
+                self.current_section = None
+                continue
+
+            if self.current_demand is None:
+                continue
+
+            mm = ministry_re.search(line_clean)
+            if mm and not self.current_demand.get("ministry"):
+                self.current_demand["ministry"] = mm.group(0).title().strip()
+                continue
+            dd = department_re.search(line_clean)
+            if dd and not self.current_demand.get("department"):
+                self.current_demand["department"] = dd.group(0).title().strip()
+                continue
+
+            if re.match(r"^(Grand\s+Total|Total\b|Net\b|Total-)", line_clean, re.IGNORECASE):
+                parts = line_clean.split()
+                name_tokens, nums = split_name_and_numeric_tail(parts)
+                if not nums:
+                    for k in (1,2):
+                        if i+k < len(lines):
+                            nxt = re.sub(r"\s+", " ", lines[i+k].strip())
+                            _, nxt_nums = split_name_and_numeric_tail(nxt.split())
+                            if nxt_nums:
+                                nums = nxt_nums
+                                break
+                values = parse_numbers(nums)
+                if self.current_section is None:
+                    self.current_section = {"heading": "Totals", "items": []}
+                    self.current_demand["sections"].append(self.current_section)
+                name = " ".join(name_tokens) if name_tokens else parts[0]
+                item = {"code": None, "name": name, "values": values_dict_from_list(values),
+                        "type": "grand_total" if re.match(r"^Grand\s+Total", line_clean, re.IGNORECASE) else "total"}
+                self.append_unique(item, by_code=False)
+                continue
+
+            if "Total-" in line_clean and any(num_re.search(tok) for tok in line_clean.split()):
+                parts = line_clean.split()
+                name_tokens, nums = split_name_and_numeric_tail(parts)
+                values = parse_numbers(nums)
+                if self.current_section is None:
+                    self.current_section = {"heading": "Totals", "items": []}
+                    self.current_demand["sections"].append(self.current_section)
+                name = " ".join(name_tokens) if name_tokens else line_clean
+                item = {"code": None, "name": name, "values": values_dict_from_list(values), "type":"total"}
+                self.append_unique(item, by_code=False)
+                continue
+
+            tokens = line_clean.split()
+            contains_numbers = any(num_re.fullmatch(tok) for tok in tokens)
+            is_letter_dot = re.match(r"^[A-Z]\.", line_clean)
+            has_keywords = any(kw.lower() in line_clean.lower() for kw in ["expenditure", "schemes", "projects", "allocations", "heads", "developmental", "centre's", "transfers", "welfare", "autonomous", "centrally"])
+            is_upper = line_clean.isupper() and len(tokens) > 1
+
+            if (is_upper or is_letter_dot or has_keywords) and not contains_numbers:
+                self.current_section = {"heading": line_clean, "items": []}
+                self.current_demand["sections"].append(self.current_section)
+                continue
+
+            if tokens and code_re.fullmatch(tokens[0]):
+                second_tok = tokens[1] if len(tokens) > 1 else ""
+                if not is_numeric_token(second_tok):
+                    name_tokens, nums = split_name_and_numeric_tail(tokens)
+                    if name_tokens and name_tokens[0] == tokens[0]:
+                        name_tokens = name_tokens[1:]
+                    if not nums:
+                        for k in (1,2):
+                            if i+k < len(lines):
+                                nxt = re.sub(r"\s+", " ", lines[i+k].strip())
+                                _, nxt_nums = split_name_and_numeric_tail(nxt.split())
+                                if nxt_nums:
+                                    nums = nxt_nums
+                                    break
+                    values = parse_numbers(nums)
+                    code = tokens[0].rstrip(".")
+                    name = " ".join(name_tokens).strip() if name_tokens else " ".join(tokens[1:]).strip()
+                    item = {"code": code, "name": name, "values": values_dict_from_list(values)}
+                    if self.current_section is None:
+                        self.current_section = {"heading": "Miscellaneous", "items": []}
+                        self.current_demand["sections"].append(self.current_section)
+                    self.append_unique(item, by_code=True)
+                    continue
+                else:
+                    continue
+
+            if tokens and is_numeric_token(tokens[0]) and sum(1 for t in tokens if is_numeric_token(t)) >= 3:
+                name_tokens, nums = split_name_and_numeric_tail(tokens)
+                values = parse_numbers(nums)
+                if self.current_section is None:
+                    self.current_section = {"heading": "Totals", "items": []}
+                    self.current_demand["sections"].append(self.current_section)
+                item = {"code": None, "name": "Totals (line)", "values": values_dict_from_list(values), "type":"total"}
+                self.append_unique(item, by_code=False)
+                continue
+
+def number(v):
+    return "..." if v is None else f"{v:,.2f}"
+
+def synthetic_pages():
+    """Demand tables printed back as text, with the PDF's ragged spacing."""
+    lines = []
+    paths = sorted(glob.glob(os.path.join(output_dir, "DEMAND_*.json")),
+                   key=lambda p: int(re.search(r"(\d+)\.json$", p).group(1)))
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        lines += ["", (d.get("ministry") or "Ministry of Finance").upper(),
+                  (d.get("department") or "Department of Revenue").upper(),
+                  f"DEMAND NO. {d['demand_no']}", "(In ₹ crores)"]
+        for sec in d["sections"]:
+            lines.append(sec["heading"])
+            for it in sec["items"]:
+                vals = "  ".join(number(v) for v in it["values"].values())
+                lines.append(f"{it['code'] or ''}   {it['name']}  {vals}".strip())
+    return ["\n".join(lines[p:p + LINES_PER_PAGE]) for p in range(0, len(lines), LINES_PER_PAGE)]
+
+def pdf_pages(pdf):
+    from page_cache import PageTextCache
+    cache = PageTextCache()
+    texts = cache.texts(pdf)
+    cache.close()
+    return texts
+
+def parse(parser_cls, texts):
+    best = float("inf")
+    for _ in range(REPEATS):
+        parser = parser_cls()
+        start = time.perf_counter()
+        for text in texts:
+            parser.feed(text)
+        best = min(best, time.perf_counter() - start)
+    return best, json.dumps(parser.data)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", help="read page texts of this PDF through the page-text cache")
+    args = ap.parse_args()
+
+    texts = pdf_pages(args.pdf) if args.pdf else synthetic_pages()
+    n_lines = sum(len(t.split("\n")) for t in texts if t)
+    print(f"{len(texts)} pages, {n_lines} lines ({'PDF' if args.pdf else 'synthetic'}), best of {REPEATS}")
+
+    old_s, old_out = parse(LegacyParser, texts)
+    new_s, new_out = parse(DemandParser, texts)
+    assert old_out == new_out, "parsers disagree"
+
+    print(f"{'parser':<10} {'total ms':>9} {'ms/page':>8} {'pages/s':>9}")
+    for label, s in (("old feed", old_s), ("new feed", new_s)):
+        print(f"{label:<10} {s * 1000:>9.1f} {s * 1000 / len(texts):>8.3f} {len(texts) / s:>9.0f}")
+    print(f"speedup {old_s / new_s:.2f}x, output identical")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# budget_bundle.py
+#
+# One compact file with every demand, replacing the per-demand
+# DEMAND_{n}.json fetches of the budget pages.
+#
+# Layout (all lists are columns, all strings interned in "strings"):
+#   columns                    the 12 year keys of values_dict_from_list
+#   demands.demand_no/ministry/department
+#   demands.section_start      sections of demand d: section_start[d] .. section_start[d+1]
+#   sections.heading
+#   sections.item_start        items of section s: item_start[s] .. item_start[s+1]
+#   items.code/name/type       string ids, -1 = null (code) or absent key (type)
+#   items.values[c][i]         column c of item i, null where the PDF had "..."
+#
+# Usage (from this folder):
+#   python budget_bundle.py    # rebuild from output_json_improved_full/DEMAND_*.json
+import json, os, re
+from pathlib import Path
+
+BUNDLE_NAME = "budget_bundle.json"
+FORMAT = "budget-bundle"
+VERSION = 1
+
+VALUE_KEYS = [
+    "actual_2024_25","capital_2024_25","total_2024_25",
+    "budget_2025_26","capital_2025_26","total_2025_26",
+    "revised_2024_25","capital_revised_2024_25","total_revised_2024_25",
+    "budget_2026_27","capital_2026_27","total_2026_27"
+]
+
+class _Strings:
+    def __init__(self):
+        self.ids = {}
+        self.table = []
+
+    def id(self, s):
+        if s is None:
+            return -1
+        sid = self.ids.get(s)
+        if sid is None:
+            sid = self.ids[s] = len(self.table)
+            self.table.append(s)
+        return sid
+
+def _compact(v):
+    # 1234.0 -> 1234 in the file; expand_bundle turns it back into a float
+    return int(v) if isinstance(v, float) and v.is_integer() else v
+
+def build_bundle(demands):
+    """demands: demand dicts as written to DEMAND_{n}.json, in order (any iterable)."""
+    strings = _Strings()
+    d_cols = {"demand_no": [], "ministry": [], "department": [], "section_start": [0]}
+    s_cols = {"heading": [], "item_start": [0]}
+    i_cols = {"code": [], "name": [], "type": [], "values": [[] for _ in VALUE_KEYS]}
+
+    for demand in demands:
+        d_cols["demand_no"].append(demand["demand_no"])
+        d_cols["ministry"].append(strings.id(demand.get("ministry")))
+        d_cols["department"].append(strings.id(demand.get("department")))
+        for section in demand["sections"]:
+            s_cols["heading"].append(strings.id(section["heading"]))
+            for item in section["items"]:
+                i_cols["code"].append(strings.id(item["code"]))
+                i_cols["name"].append(strings.id(item["name"]))
+                i_cols["type"].append(strings.id(item.get("type")))
+                for c, key in enumerate(VALUE_KEYS):
+                    i_cols["values"][c].append(_compact(item["values"][key]))
+            s_cols["item_start"].append(len(i_cols["name"]))
+        d_cols["section_start"].append(len(s_cols["heading"]))
+
+    return {"format": FORMAT, "version": VERSION, "columns": VALUE_KEYS,
+            "strings": strings.table, "demands": d_cols, "sections": s_cols, "items": i_cols}
+
+def expand_bundle(bundle):
+    """Inverse of build_bundle: the list of demand dicts."""
+    strings = bundle["strings"]
+    d, s, it = bundle["demands"], bundle["sections"], bundle["items"]
+    columns = list(zip(*it["values"])) if it["values"] and it["values"][0] else []
+
+    def string(sid):
+        return None if sid < 0 else strings[sid]
+
+    def item(i):
+        out = {"code": string(it["code"][i]), "name": strings[it["name"][i]],
+               "values": {k: (None if v is None else float(v)) for k, v in zip(bundle["columns"], columns[i])}}
+        if it["type"][i] >= 0:
+            out["type"] = strings[it["type"][i]]
+        return out
+
+    demands = []
+    for n, demand_no in enumerate(d["demand_no"]):
+        sections = [
+            {"heading": strings[s["heading"][k]],
+             "items": [item(i) for i in range(s["item_start"][k], s["item_start"][k + 1])]}
+            for k in range(d["section_start"][n], d["section_start"][n + 1])
+        ]
+        demands.append({"demand_no": demand_no, "ministry": string(d["ministry"][n]),
+                        "department": string(d["department"][n]), "sections": sections})
+    return demands
+
+def write_bundle(demands, out_dir):
+    """Writes out_dir/budget_bundle.json (no whitespace, UTF-8); returns its path."""
+    path = Path(out_dir)/BUNDLE_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(build_bundle(demands), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+def load_demand_files(out_dir):
+    """DEMAND_{n}.json of out_dir, ordered by demand number."""
+    files = sorted(Path(out_dir).glob("DEMAND_*.json"), key=lambda p: int(re.findall(r"\d+", p.name)[0]))
+    demands = []
+    for p in files:
+        with open(p, encoding="utf-8") as f:
+            demands.append(json.load(f))
+    return demands
+
+if __name__ == "__main__":
+    out_dir = "output_json_improved_full"
+    demands = load_demand_files(out_dir)
+    path = write_bundle(demands, out_dir)
+    print(f"{len(demands)} demands -> {path} ({path.stat().st_size / 1024:.0f} KB)")
@@ -0,0 +1,137 @@
+# demand_sink.py
+#
+# Incremental output of extract.py --stream.
+#
+# Each demand is written as soon as the parser moves on to another one:
+#   demands.ndjson      one compact JSON line per write; the last line of a
+#                       demand number wins (a demand the PDF comes back to
+#                       is read back from here, extended and written again)
+#   DEMAND_{n}.json     replaced atomically on every write of demand n
+# The combined all_demands_improved_full.json and budget_bundle.json are
+# streamed from the NDJSON file once the last page is parsed.
+#
+# extract_checkpoint.json records the pages parsed so far, the NDJSON
+# length at that point and the demand still open in the parser, so an
+# interrupted run continues from its last checkpoint. Every file is
+# written to a .tmp next to it and renamed into place.
+import hashlib, json, os
+from pathlib import Path
+from budget_bundle import write_bundle
+
+NDJSON_NAME = "demands.ndjson"
+COMBINED_NAME = "all_demands_improved_full.json"
+CHECKPOINT_NAME = "extract_checkpoint.json"
+
+# Parsed pages between checkpoints
+CHECKPOINT_EVERY = 25
+
+def write_atomic(path, write):
+    """Calls write(f) on path + '.tmp', then renames it over path."""
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def write_demand_file(demand, out_dir):
+    write_atomic(Path(out_dir)/f"DEMAND_{demand['demand_no']}.json",
+                 lambda f: json.dump(demand, f, indent=4, ensure_ascii=False))
+
+def dump_list(demands, f):
+    """json.dump(list(demands), f, indent=4, ensure_ascii=False), one demand in memory at a time."""
+    f.write("[")
+    empty = True
+    for demand in demands:
+        f.write("\n    " if empty else ",\n    ")
+        f.write(json.dumps(demand, indent=4, ensure_ascii=False).replace("\n", "\n    "))
+        empty = False
+    f.write("]" if empty else "\n]")
+
+class DemandSink:
+    def __init__(self, out_dir, state=None):
+        """state: DemandSink.state() of a checkpoint to continue from."""
+        self.out_dir = Path(out_dir)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.path = self.out_dir/NDJSON_NAME
+        state = state or {"size": 0, "offsets": {}, "digests": {}}
+        # demand number -> byte offset of its latest line, in first-write
+        # order (= the order demands first appear in the PDF)
+        self.offsets = {int(no): off for no, off in state["offsets"].items()}
+        self.digests = {int(no): d for no, d in state["digests"].items()}
+        # Lines written after the checkpoint are parsed again
+        with open(self.path, "ab") as f:
+            f.truncate(state["size"])
+        self.file = open(self.path, "a+b")
+        self.writes = 0
+
+    def __contains__(self, demand_no):
+        return demand_no in self.offsets
+
+    def write(self, demand):
+        """Appends demand to the log and replaces its DEMAND file, unless unchanged."""
+        line = json.dumps(demand, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha1(line).hexdigest()
+        demand_no = demand["demand_no"]
+        if self.digests.get(demand_no) == digest:
+            return
+        self.file.seek(0, os.SEEK_END)
+        self.offsets[demand_no] = self.file.tell()
+        self.digests[demand_no] = digest
+        self.file.write(line + b"\n")
+        write_demand_file(demand, self.out_dir)
+        self.writes += 1
+
+    def read(self, demand_no):
+        self.file.flush()
+        self.file.seek(self.offsets[demand_no])
+        return json.loads(self.file.readline())
+
+    def demands(self):
+        for demand_no in self.offsets:
+            yield self.read(demand_no)
+
+    def state(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {
+            "size": self.file.seek(0, os.SEEK_END),
+            "offsets": {str(no): off for no, off in self.offsets.items()},
+            "digests": {str(no): d for no, d in self.digests.items()},
+        }
+
+    def finish(self):
+        """Writes the combined file and the bundle from the log."""
+        write_atomic(self.out_dir/COMBINED_NAME, lambda f: dump_list(self.demands(), f))
+        write_bundle(self.demands(), self.out_dir)
+
+    def close(self):
+        self.file.close()
+
+# ---------- checkpoint ----------
+def load_checkpoint(out_dir, pdf_hash):
+    """The checkpoint of an unfinished run over the same PDF, else None."""
+    try:
+        with open(Path(out_dir)/CHECKPOINT_NAME, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("pdf_hash") != pdf_hash:
+        return None
+    # The log must still hold everything the checkpoint counts on
+    ndjson = Path(out_dir)/NDJSON_NAME
+    if not ndjson.exists() or ndjson.stat().st_size < checkpoint["sink"]["size"]:
+        return None
+    return checkpoint
+
+def save_checkpoint(out_dir, pdf_hash, pages_done, sink, parser):
+    checkpoint = {"pdf_hash": pdf_hash, "pages_done": pages_done,
+                  "sink": sink.state(), "parser": parser.state()}
+    write_atomic(Path(out_dir)/CHECKPOINT_NAME,
+                 lambda f: json.dump(checkpoint, f, ensure_ascii=False))
+
+def clear_checkpoint(out_dir):
+    try:
+        os.remove(Path(out_dir)/CHECKPOINT_NAME)
+    except FileNotFoundError:
+        pass
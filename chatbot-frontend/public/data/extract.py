@@ -1,10 +1,27 @@
 # extract_budget_improved.py
-import pdfplumber, re, os, json
+#
+# Usage (from this folder, gov.pdf next to the script):
+#   python extract.py                 # one extraction process per CPU
+#   python extract.py --workers 1     # serial
+#   python extract.py --pdf other.pdf --out some_dir
+#   python extract.py --no-cache      # ignore page_text_cache.sqlite
+#   python extract.py --stream        # write demands as they complete; rerun
+#                                     # after an interruption to resume
+import pdfplumber, re, os, json, time, argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from page_cache import PageTextCache, DEFAULT_CACHE, file_hash
+from budget_bundle import write_bundle
+from demand_sink import (DemandSink, CHECKPOINT_EVERY, COMBINED_NAME, write_atomic, write_demand_file,
+                         load_checkpoint, save_checkpoint, clear_checkpoint)
 
 pdf_file = "gov.pdf"  # place your gov.pdf in the same folder
 output_dir = "output_json_improved_full"
-os.makedirs(output_dir, exist_ok=True)
+
+# Pages per extraction task = total / (workers * SHARDS_PER_WORKER);
+# several small contiguous shards per worker keep the pool busy when
+# some page ranges are much denser than others
+SHARDS_PER_WORKER = 4
 
 demand_re = re.compile(r"(?:DEMAND\s*NO\.?|No\.)\s*(\d+)", re.IGNORECASE)
 ministry_re = re.compile(r"MINISTRY OF [A-Z &']+", re.IGNORECASE)
@@ -57,150 +74,392 @@ def values_dict_from_list(values):
         d[k] = values[i] if i < len(values) else None
     return d
 
-data = []
-demand_index = {}
-current_demand = None
-current_section = None
-
-with pdfplumber.open(pdf_file) as pdf:
-    total_pages = len(pdf.pages)
-    print(f"Processing {total_pages} pages...")
-    for pageno in range(total_pages):
-        page = pdf.pages[pageno]
-        text = page.extract_text()
-        if not text:
-            continue
-        lines = text.split("\n")
-        for i, raw_line in enumerate(lines):
-            line = raw_line.strip()
-            line_clean = re.sub(r"\s+", " ", line)
+# ---------- line classification ----------
+# Kinds of line the parser acts on once a demand has started, checked
+# in this order (demand headers and ministry / department names come
+# first and depend on the parser's state)
+GRAND_TOTAL, TOTAL, TOTAL_DASH, HEADING, CODE_ROW, NUMBERS = (
+    "grand_total", "total", "total_dash", "heading", "code_row", "numbers"
+)
+
+# Every demand / ministry / department match contains one of these, so
+# most lines need one search instead of three
+header_hint_re = re.compile(r"demand|no\.|ministry|department", re.IGNORECASE)
+total_re = re.compile(r"^(?:(Grand\s+Total)|Total\b|Net\b|Total-)", re.IGNORECASE)
+letter_dot_re = re.compile(r"^[A-Z]\.")
+# Section keywords, searched in the lower-cased line
+keywords_re = re.compile("|".join(re.escape(kw) for kw in [
+    "expenditure", "schemes", "projects", "allocations", "heads", "developmental",
+    "centre's", "transfers", "welfare", "autonomous", "centrally"
+]))
+
+def numeric_tail(tokens, numeric, max_nums=12):
+    """split_name_and_numeric_tail() for tokens whose num_re flags are known."""
+    end = len(tokens)
+    while end and not numeric[end-1]:
+        end -= 1
+    if not end:
+        return tokens[:], []
+    start = end - 1
+    while start and numeric[start-1] and end - start < max_nums:
+        start -= 1
+    return tokens[:start], tokens[start:end]
+
+class Line:
+    """
+    One line of page text: whitespace-normalized, split, matched against
+    num_re token by token and classified once. The parser looks back and
+    ahead through these instead of re-cleaning neighbouring raw lines.
+    """
+    __slots__ = ("clean", "tokens", "numeric", "demand_no", "ministry", "department", "kind", "_tail")
 
-            dem = demand_re.search(line_clean)
+    def __init__(self, raw):
+        self.tokens = tokens = raw.split()
+        self.clean = clean = " ".join(tokens)
+        self.numeric = [num_re.fullmatch(tok) is not None for tok in tokens]
+        self.demand_no = self.ministry = self.department = None
+        if header_hint_re.search(clean):
+            dem = demand_re.search(clean)
             if dem:
-                demand_no = int(dem.group(1))
-                if demand_no in demand_index:
-                    current_demand = demand_index[demand_no]
-                else:
-                    window_start = max(0, i-6)
-                    window_end = min(len(lines), i+8)
-                    ministry_val = None
-                    department_val = None
-                    for w in range(window_start, window_end):
-                        wline = re.sub(r"\s+", " ", lines[w].strip())
-                        mm = ministry_re.search(wline)
-                        if mm:
-                            ministry_val = mm.group(0).title().strip()
-                        dd = department_re.search(wline)
-                        if dd:
-                            department_val = dd.group(0).title().strip()
-                    new_d = {"demand_no": demand_no, "ministry": ministry_val, "department": department_val, "sections": []}
-                    data.append(new_d)
-                    demand_index[demand_no] = new_d
-                    current_demand = new_d
-                current_section = None
+                self.demand_no = int(dem.group(1))
+            mm = ministry_re.search(clean)
+            if mm:
+                self.ministry = mm.group(0).title().strip()
+            dd = department_re.search(clean)
+            if dd:
+                self.department = dd.group(0).title().strip()
+        self.kind = self.classify()
+        self._tail = None
+
+    def classify(self):
+        clean, tokens, numeric = self.clean, self.tokens, self.numeric
+        m = total_re.match(clean)
+        if m:
+            return GRAND_TOTAL if m.group(1) else TOTAL
+        if "Total-" in clean and any(num_re.search(tok) for tok in tokens):
+            return TOTAL_DASH
+
+        if not any(numeric) and (
+            (clean.isupper() and len(tokens) > 1)
+            or letter_dot_re.match(clean)
+            or keywords_re.search(clean.lower())
+        ):
+            return HEADING
+
+        if tokens and code_re.fullmatch(tokens[0]):
+            # a code followed by a number is a continuation row: skipped
+            return None if len(tokens) > 1 and numeric[1] else CODE_ROW
+        if numeric and numeric[0] and sum(numeric) >= 3:
+            return NUMBERS
+        return None
+
+    def tail(self):
+        """(name tokens, numeric tail), computed on first use."""
+        if self._tail is None:
+            self._tail = numeric_tail(self.tokens, self.numeric)
+        return self._tail
+
+def lookahead_numbers(lines, i):
+    """Numeric tail of the first of the next two lines that has one."""
+    for k in (1,2):
+        if i+k < len(lines):
+            nxt_nums = lines[i+k].tail()[1]
+            if nxt_nums:
+                return nxt_nums
+    return []
+
+# ---------- page text extraction (parallel) ----------
+def shard_pages(pagenos, workers):
+    """Contiguous runs of pagenos, in page order."""
+    shards = max(1, workers * SHARDS_PER_WORKER)
+    size = max(1, -(-len(pagenos) // shards))
+    return [pagenos[start:start + size] for start in range(0, len(pagenos), size)]
+
+def extract_shard(args):
+    """Worker: texts of the given pages, each process opens its own handle."""
+    path, pagenos = args
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[pageno].extract_text() for pageno in pagenos]
+
+def iter_page_texts(path, pagenos, workers):
+    """Texts of pagenos in order; shards run in a process pool when workers > 1."""
+    tasks = [(path, shard) for shard in shard_pages(list(pagenos), workers)]
+    if workers <= 1:
+        for task in tasks:
+            yield from extract_shard(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() hands shards back in submission order, so parsing can
+        # run on early pages while later shards are still extracting
+        for texts in pool.map(extract_shard, tasks):
+            yield from texts
+
+# ---------- demand parser (serial, carries state across pages) ----------
+class DemandParser:
+    """
+    Consumes page texts in page order. current_demand / current_section
+    live here rather than in the shards, so a demand or section that
+    spans a shard boundary continues exactly as in a single pass.
+    """
+
+    def __init__(self, sink=None):
+        self.data = []
+        self.demand_index = {}
+        self.current_demand = None
+        self.current_section = None
+        # With a DemandSink, only the open demand stays in data /
+        # demand_index: the others are written out and read back if
+        # the PDF returns to them
+        self.sink = sink
+        # Duplicate-item index of the section last appended to
+        self._keyed_section = None
+        self._name_keys = set()
+        self._code_keys = set()
+
+    def append_unique(self, item, by_code):
+        """
+        Appends item to current_section unless an equal item is already
+        there: same (code, name, values) for coded lines, same
+        (name, values) for totals. Hash lookups instead of scanning the
+        section, which made large sections quadratic.
+        """
+        section = self.current_section
+        if section is not self._keyed_section:
+            self._keyed_section = section
+            self._name_keys = set()
+            self._code_keys = set()
+            for it in section["items"]:
+                self._remember(it)
+        values = tuple(item["values"].items())
+        if by_code:
+            if (item["code"], item["name"], values) in self._code_keys:
+                return
+        elif (item["name"], values) in self._name_keys:
+            return
+        section["items"].append(item)
+        self._remember(item)
+
+    def _remember(self, item):
+        values = tuple(item["values"].items())
+        self._name_keys.add((item.get("name"), values))
+        self._code_keys.add((item.get("code"), item.get("name"), values))
+
+    def feed(self, text):
+        if not text:
+            return
+        lines = [Line(raw) for raw in text.split("\n")]
+        for i, line in enumerate(lines):
+            if line.demand_no is not None:
+                self.start_demand(lines, i)
                 continue
 
-            if current_demand is None:
+            if self.current_demand is None:
                 continue
 
-            mm = ministry_re.search(line_clean)
-            if mm and not current_demand.get("ministry"):
-                current_demand["ministry"] = mm.group(0).title().strip()
+            if line.ministry and not self.current_demand.get("ministry"):
+                self.current_demand["ministry"] = line.ministry
                 continue
-            dd = department_re.search(line_clean)
-            if dd and not current_demand.get("department"):
-                current_demand["department"] = dd.group(0).title().strip()
+            if line.department and not self.current_demand.get("department"):
+                self.current_demand["department"] = line.department
                 continue
 
-            if re.match(r"^(Grand\s+Total|Total\b|Net\b|Total-)", line_clean, re.IGNORECASE):
-                parts = line_clean.split()
-                name_tokens, nums = split_name_and_numeric_tail(parts)
-                if not nums:
-                    for k in (1,2):
-                        if i+k < len(lines):
-                            nxt = re.sub(r"\s+", " ", lines[i+k].strip())
-                            _, nxt_nums = split_name_and_numeric_tail(nxt.split())
-                            if nxt_nums:
-                                nums = nxt_nums
-                                break
-                values = parse_numbers(nums)
-                if current_section is None:
-                    current_section = {"heading": "Totals", "items": []}
-                    current_demand["sections"].append(current_section)
-                name = " ".join(name_tokens) if name_tokens else parts[0]
-                item = {"code": None, "name": name, "values": values_dict_from_list(values),
-                        "type": "grand_total" if re.match(r"^Grand\s+Total", line_clean, re.IGNORECASE) else "total"}
-                if not any(it.get("name")==item["name"] and it.get("values")==item["values"] for it in current_section["items"]):
-                    current_section["items"].append(item)
-                continue
+            handler = self.handlers.get(line.kind)
+            if handler:
+                handler(self, lines, i)
 
-            if "Total-" in line_clean and any(num_re.search(tok) for tok in line_clean.split()):
-                parts = line_clean.split()
-                name_tokens, nums = split_name_and_numeric_tail(parts)
-                values = parse_numbers(nums)
-                if current_section is None:
-                    current_section = {"heading": "Totals", "items": []}
-                    current_demand["sections"].append(current_section)
-                name = " ".join(name_tokens) if name_tokens else line_clean
-                item = {"code": None, "name": name, "values": values_dict_from_list(values), "type":"total"}
-                if not any(it.get("name")==item["name"] and it.get("values")==item["values"] for it in current_section["items"]):
-                    current_section["items"].append(item)
-                continue
+    # ---------- line handlers ----------
+    def start_demand(self, lines, i):
+        demand_no = lines[i].demand_no
+        if self.current_demand is not None and self.current_demand["demand_no"] != demand_no:
+            self.release()
+        if demand_no in self.demand_index:
+            self.current_demand = self.demand_index[demand_no]
+        elif self.sink is not None and demand_no in self.sink:
+            self.hold(self.sink.read(demand_no))
+        else:
+            ministry_val = None
+            department_val = None
+            # last ministry / department named within 6 lines before, 7 after
+            for w in lines[max(0, i-6):i+8]:
+                if w.ministry:
+                    ministry_val = w.ministry
+                if w.department:
+                    department_val = w.department
+            self.hold({"demand_no": demand_no, "ministry": ministry_val, "department": department_val, "sections": []})
+        self.current_section = None
 
-            tokens = line_clean.split()
-            contains_numbers = any(num_re.fullmatch(tok) for tok in tokens)
-            is_letter_dot = re.match(r"^[A-Z]\.", line_clean)
-            has_keywords = any(kw.lower() in line_clean.lower() for kw in ["expenditure", "schemes", "projects", "allocations", "heads", "developmental", "centre's", "transfers", "welfare", "autonomous", "centrally"])
-            is_upper = line_clean.isupper() and len(tokens) > 1
+    def hold(self, demand):
+        self.data.append(demand)
+        self.demand_index[demand["demand_no"]] = demand
+        self.current_demand = demand
 
-            if (is_upper or is_letter_dot or has_keywords) and not contains_numbers:
-                current_section = {"heading": line_clean, "items": []}
-                current_demand["sections"].append(current_section)
-                continue
+    def release(self):
+        """Hands the open demand to the sink (no-op without one)."""
+        if self.sink is None or self.current_demand is None:
+            return
+        demand = self.current_demand
+        self.sink.write(demand)
+        self.data.remove(demand)
+        del self.demand_index[demand["demand_no"]]
+        self.current_demand = self.current_section = None
 
-            if tokens and code_re.fullmatch(tokens[0]):
-                second_tok = tokens[1] if len(tokens) > 1 else ""
-                if not is_numeric_token(second_tok):
-                    name_tokens, nums = split_name_and_numeric_tail(tokens)
-                    if name_tokens and name_tokens[0] == tokens[0]:
-                        name_tokens = name_tokens[1:]
-                    if not nums:
-                        for k in (1,2):
-                            if i+k < len(lines):
-                                nxt = re.sub(r"\s+", " ", lines[i+k].strip())
-                                _, nxt_nums = split_name_and_numeric_tail(nxt.split())
-                                if nxt_nums:
-                                    nums = nxt_nums
-                                    break
-                    values = parse_numbers(nums)
-                    code = tokens[0].rstrip(".")
-                    name = " ".join(name_tokens).strip() if name_tokens else " ".join(tokens[1:]).strip()
-                    item = {"code": code, "name": name, "values": values_dict_from_list(values)}
-                    if current_section is None:
-                        current_section = {"heading": "Miscellaneous", "items": []}
-                        current_demand["sections"].append(current_section)
-                    if not any(it.get("code")==item["code"] and it.get("name")==item["name"] and it.get("values")==item["values"] for it in current_section["items"]):
-                        current_section["items"].append(item)
-                    continue
-                else:
-                    continue
-
-            if tokens and is_numeric_token(tokens[0]) and sum(1 for t in tokens if is_numeric_token(t)) >= 3:
-                name_tokens, nums = split_name_and_numeric_tail(tokens)
-                values = parse_numbers(nums)
-                if current_section is None:
-                    current_section = {"heading": "Totals", "items": []}
-                    current_demand["sections"].append(current_section)
-                item = {"code": None, "name": "Totals (line)", "values": values_dict_from_list(values), "type":"total"}
-                if not any(it.get("name")==item["name"] and it.get("values")==item["values"] for it in current_section["items"]):
-                    current_section["items"].append(item)
-                continue
+    # ---------- checkpoint state ----------
+    def state(self):
+        """The open demand and section; everything else is in the sink."""
+        sections = self.current_demand["sections"] if self.current_demand else []
+        section = next((k for k, sec in enumerate(sections) if sec is self.current_section), None)
+        return {"current_demand": self.current_demand, "current_section": section}
+
+    def restore(self, state):
+        demand, section = state["current_demand"], state["current_section"]
+        if demand is not None:
+            self.hold(demand)
+            if section is not None:
+                self.current_section = demand["sections"][section]
+
+    def ensure_section(self, heading):
+        if self.current_section is None:
+            self.current_section = {"heading": heading, "items": []}
+            self.current_demand["sections"].append(self.current_section)
+
+    def total_line(self, lines, i):
+        line = lines[i]
+        name_tokens, nums = line.tail()
+        if not nums:
+            nums = lookahead_numbers(lines, i)
+        values = parse_numbers(nums)
+        self.ensure_section("Totals")
+        name = " ".join(name_tokens) if name_tokens else line.tokens[0]
+        item = {"code": None, "name": name, "values": values_dict_from_list(values),
+                "type": "grand_total" if line.kind == GRAND_TOTAL else "total"}
+        self.append_unique(item, by_code=False)
+
+    def total_dash_line(self, lines, i):
+        line = lines[i]
+        name_tokens, nums = line.tail()
+        values = parse_numbers(nums)
+        self.ensure_section("Totals")
+        name = " ".join(name_tokens) if name_tokens else line.clean
+        item = {"code": None, "name": name, "values": values_dict_from_list(values), "type":"total"}
+        self.append_unique(item, by_code=False)
+
+    def heading_line(self, lines, i):
+        self.current_section = {"heading": lines[i].clean, "items": []}
+        self.current_demand["sections"].append(self.current_section)
+
+    def code_line(self, lines, i):
+        tokens = lines[i].tokens
+        name_tokens, nums = lines[i].tail()
+        if name_tokens and name_tokens[0] == tokens[0]:
+            name_tokens = name_tokens[1:]
+        if not nums:
+            nums = lookahead_numbers(lines, i)
+        values = parse_numbers(nums)
+        code = tokens[0].rstrip(".")
+        name = " ".join(name_tokens).strip() if name_tokens else " ".join(tokens[1:]).strip()
+        item = {"code": code, "name": name, "values": values_dict_from_list(values)}
+        self.ensure_section("Miscellaneous")
+        self.append_unique(item, by_code=True)
+
+    def numbers_line(self, lines, i):
+        name_tokens, nums = lines[i].tail()
+        values = parse_numbers(nums)
+        self.ensure_section("Totals")
+        item = {"code": None, "name": "Totals (line)", "values": values_dict_from_list(values), "type":"total"}
+        self.append_unique(item, by_code=False)
+
+    handlers = {
+        TOTAL: total_line,
+        GRAND_TOTAL: total_line,
+        TOTAL_DASH: total_dash_line,
+        HEADING: heading_line,
+        CODE_ROW: code_line,
+        NUMBERS: numbers_line,
+    }
+
+def save(demand_index, out_dir):
+    # Save per-demand and master file
+    os.makedirs(out_dir, exist_ok=True)
+    for demand in demand_index.values():
+        write_demand_file(demand, out_dir)
+    write_atomic(Path(out_dir)/COMBINED_NAME,
+                 lambda f: json.dump(list(demand_index.values()), f, indent=4, ensure_ascii=False))
+    # Compact single-file form served to the budget pages
+    write_bundle(list(demand_index.values()), out_dir)
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract demand-wise budget tables from the budget PDF")
+    ap.add_argument("--pdf", default=pdf_file)
+    ap.add_argument("--out", default=output_dir)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="page extraction processes (1 = serial, default: CPU count)")
+    ap.add_argument("--cache", default=DEFAULT_CACHE, help="page-text cache shared with analyze_budgets.py")
+    ap.add_argument("--no-cache", action="store_true", help="extract every page, don't read or write the cache")
+    ap.add_argument("--stream", action="store_true",
+                    help="write each demand as soon as it is complete, with checkpoints to resume from")
+    ap.add_argument("--fresh", action="store_true", help="with --stream: ignore an earlier run's checkpoint")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    sink = checkpoint = None
+    pages_done = 0
+    if args.stream:
+        pdf_hash = file_hash(args.pdf)
+        checkpoint = None if args.fresh else load_checkpoint(args.out, pdf_hash)
+        sink = DemandSink(args.out, checkpoint and checkpoint["sink"])
+    parser = DemandParser(sink)
+    if checkpoint:
+        parser.restore(checkpoint["parser"])
+        pages_done = checkpoint["pages_done"]
+        print(f"Resuming after page {pages_done} ({len(sink.offsets)} demands written)")
+
+    parse_seconds = 0.0
+    cache = None
+    if args.no_cache:
+        with pdfplumber.open(args.pdf) as pdf:
+            total_pages = len(pdf.pages)
+        print(f"Processing {total_pages - pages_done} pages with {args.workers} worker(s)...")
+        texts = iter_page_texts(args.pdf, range(pages_done, total_pages), args.workers)
+    else:
+        # Cached pages come straight from the page-text layer; only new
+        # or changed pages go through the extraction pool. Pages reach
+        # the parser one at a time, in page order
+        cache = PageTextCache(args.cache)
+        total_pages, texts = cache.iter_texts(
+            args.pdf, lambda path, pagenos: iter_page_texts(path, pagenos, args.workers), start=pages_done)
+        stats = cache.last_stats
+        print(f"Processing {total_pages} pages: {stats['cached']} from {args.cache}, "
+              f"{stats['extracted']} extracted with {args.workers} worker(s)")
+
+    for pageno, text in enumerate(texts, start=pages_done):
+        t = time.perf_counter()
+        parser.feed(text)
+        if sink is not None and (pageno + 1) % CHECKPOINT_EVERY == 0:
+            save_checkpoint(args.out, pdf_hash, pageno + 1, sink, parser)
+        parse_seconds += time.perf_counter() - t
+    if cache is not None:
+        cache.close()
+    extracted = time.perf_counter()
+
+    if sink is None:
+        save(parser.demand_index, args.out)
+    else:
+        parser.release()
+        sink.finish()
+        sink.close()
+        clear_checkpoint(args.out)
+    saved = time.perf_counter()
 
-# Save per-demand and master file
-for dno, demand in demand_index.items():
-    with open(Path(output_dir)/f"DEMAND_{dno}.json", "w", encoding="utf-8") as f:
-        json.dump(demand, f, indent=4, ensure_ascii=False)
-with open(Path(output_dir)/"all_demands_improved_full.json", "w", encoding="utf-8") as f:
-    json.dump(list(demand_index.values()), f, indent=4, ensure_ascii=False)
+    pages = total_pages - pages_done
+    extract_seconds = extracted - started - parse_seconds
+    print(f"  extract: {extract_seconds:.2f}s ({pages / max(extract_seconds, 1e-9):.1f} pages/s)")
+    if sink is None:
+        print(f"  parse:   {parse_seconds:.2f}s ({len(parser.demand_index)} demands)")
+    else:
+        print(f"  parse:   {parse_seconds:.2f}s ({len(sink.offsets)} demands, {sink.writes} demand writes)")
+    print(f"  write:   {saved - extracted:.2f}s")
+    print(f"  total:   {saved - started:.2f}s")
+    print("Done. Output saved to", args.out)
 
-print("Done. Output saved to", output_dir)
+if __name__ == "__main__":
+    main()
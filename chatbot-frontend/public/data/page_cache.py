@@ -0,0 +1,170 @@
+# page_cache.py
+#
+# Page-text layer shared by extract.py and analyze_budgets.py.
+#
+# pdfplumber's extract_text() is by far the slowest step of both tools,
+# so its output is kept in a SQLite file:
+#   page_text    content hash of a page -> extracted text
+#   doc_pages    (pdf hash, page number) -> content hash
+#   documents    pdf hash -> page count, written once every page is stored
+# A PDF seen before (same file hash) is served without opening it.
+# A changed PDF is opened only to hash its pages; pages whose content
+# streams are unchanged keep their text, the rest are re-extracted.
+import hashlib, sqlite3
+import pdfplumber
+from pdfminer.pdftypes import PDFStream, resolve1
+
+DEFAULT_CACHE = "page_text_cache.sqlite"
+
+# Part of every page key: a different extractor means different text
+EXTRACTOR = f"pdfplumber {pdfplumber.__version__} extract_text"
+
+# Extracted pages between commits, so an interrupted run keeps its work
+COMMIT_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_text (content_hash TEXT PRIMARY KEY, text TEXT);
+CREATE TABLE IF NOT EXISTS doc_pages (pdf_hash TEXT, pageno INTEGER, content_hash TEXT,
+                                      PRIMARY KEY (pdf_hash, pageno));
+CREATE TABLE IF NOT EXISTS documents (pdf_hash TEXT PRIMARY KEY, page_count INTEGER);
+"""
+
+def file_hash(path):
+    h = hashlib.sha256(EXTRACTOR.encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _streams(obj):
+    obj = resolve1(obj)
+    if isinstance(obj, list):
+        for o in obj:
+            yield from _streams(o)
+    elif isinstance(obj, PDFStream):
+        yield obj
+
+def page_content_hash(page):
+    """
+    Hash of what extract_text() reads from one page: geometry, the raw
+    content streams, font names and any form XObjects (which can hold
+    text). Images are left out, they don't change the text.
+    """
+    po = page.page_obj
+    h = hashlib.sha256(EXTRACTOR.encode())
+    h.update(repr((po.mediabox, po.cropbox, po.rotate)).encode())
+    for stream in _streams(po.contents):
+        h.update(stream.get_rawdata() or b"")
+    resources = resolve1(po.resources) or {}
+    for name, font in sorted((resolve1(resources.get("Font")) or {}).items()):
+        h.update(f"{name}={(resolve1(font) or {}).get('BaseFont')}".encode())
+    for name, xobj in sorted((resolve1(resources.get("XObject")) or {}).items()):
+        xobj = resolve1(xobj)
+        if isinstance(xobj, PDFStream) and getattr(xobj.get("Subtype"), "name", None) == "Form":
+            h.update(name.encode())
+            h.update(xobj.get_rawdata() or b"")
+    return h.hexdigest()
+
+def extract_page_texts(pdf_path, pagenos):
+    """Default extractor: texts of the given pages, in that order."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for pageno in pagenos:
+            yield pdf.pages[pageno].extract_text()
+
+class PageTextCache:
+    def __init__(self, path=DEFAULT_CACHE):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.last_stats = {}
+
+    def close(self):
+        self.db.close()
+
+    def texts(self, pdf_path, extract_pages=extract_page_texts):
+        """
+        Text of every page of pdf_path (None/"" for pages without text).
+        extract_pages(pdf_path, pagenos) must yield the texts of pagenos
+        in order; it only sees the pages that are not cached.
+        """
+        _, texts = self.iter_texts(pdf_path, extract_pages)
+        return list(texts)
+
+    def iter_texts(self, pdf_path, extract_pages=extract_page_texts, start=0):
+        """
+        (page count, generator of the texts of pages start.. in page
+        order), like texts() but holding one page's text at a time.
+        last_stats is set before the first page; the document is recorded
+        as complete once the generator is exhausted. Uncached pages before
+        start are still extracted, so the cache ends up whole.
+        """
+        pdf_hash = file_hash(pdf_path)
+        page_count = self._document_pages(pdf_hash)
+        if page_count is not None:
+            self.last_stats = {"pages": page_count, "cached": page_count, "extracted": 0, "pdf_opened": False}
+            return page_count, self._document_texts(pdf_hash, start)
+
+        with pdfplumber.open(pdf_path) as pdf:
+            hashes = [page_content_hash(page) for page in pdf.pages]
+
+        known = self._known_hashes(set(hashes))
+        missing = [pageno for pageno, ch in enumerate(hashes) if ch not in known]
+
+        self.last_stats = {"pages": len(hashes), "cached": len(hashes) - len(missing),
+                           "extracted": len(missing), "pdf_opened": True}
+        return len(hashes), self._extract_texts(pdf_path, pdf_hash, hashes, missing, extract_pages, start)
+
+    def _extract_texts(self, pdf_path, pdf_hash, hashes, missing, extract_pages, start):
+        extracted = zip(missing, extract_pages(pdf_path, missing))
+        missing_pages = set(missing)
+        done = 0
+        for pageno, ch in enumerate(hashes):
+            if pageno in missing_pages:
+                page = next(extracted, None)
+                if page is None:
+                    self.db.commit()
+                    raise RuntimeError(f"extractor returned {done} of {len(missing)} pages")
+                text = page[1]
+                self.db.execute("INSERT OR REPLACE INTO page_text VALUES (?, ?)", (ch, text))
+                done += 1
+                if done % COMMIT_EVERY == 0:
+                    self.db.commit()
+            else:
+                text = self.db.execute("SELECT text FROM page_text WHERE content_hash = ?", (ch,)).fetchone()[0]
+            if pageno >= start:
+                yield text
+
+        self.db.execute("DELETE FROM doc_pages WHERE pdf_hash = ?", (pdf_hash,))
+        self.db.executemany("INSERT INTO doc_pages VALUES (?, ?, ?)",
+                            [(pdf_hash, pageno, ch) for pageno, ch in enumerate(hashes)])
+        self.db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (pdf_hash, len(hashes)))
+        self.db.commit()
+
+    def _document_pages(self, pdf_hash):
+        """Page count of a document whose every page text is stored, else None."""
+        row = self.db.execute("SELECT page_count FROM documents WHERE pdf_hash = ?", (pdf_hash,)).fetchone()
+        if row is None:
+            return None
+        pages, stored = self.db.execute(
+            "SELECT COUNT(*), COUNT(t.content_hash) FROM doc_pages d "
+            "LEFT JOIN page_text t ON t.content_hash = d.content_hash "
+            "WHERE d.pdf_hash = ?", (pdf_hash,)).fetchone()
+        if pages != row[0] or stored != pages:
+            return None
+        return row[0]
+
+    def _document_texts(self, pdf_hash, start=0):
+        rows = self.db.execute(
+            "SELECT t.text FROM doc_pages d JOIN page_text t ON t.content_hash = d.content_hash "
+            "WHERE d.pdf_hash = ? AND d.pageno >= ? ORDER BY d.pageno", (pdf_hash, start))
+        for (text,) in rows:
+            yield text
+
+    def _known_hashes(self, hashes):
+        known = set()
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            known.update(ch for (ch,) in self.db.execute(
+                f"SELECT content_hash FROM page_text WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                chunk))
+        return known
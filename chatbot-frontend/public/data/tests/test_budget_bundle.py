@@ -0,0 +1,61 @@
+# test_budget_bundle.py
+#
+# build_bundle / expand_bundle round trip.
+#
+# Run from public/data/:
+#   python -m pytest tests
+import json, os, sys
+
+import pytest
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATA_DIR)
+from budget_bundle import VALUE_KEYS, build_bundle, expand_bundle, load_demand_files, write_bundle  # noqa: E402
+
+def values(*vals):
+    return dict(zip(VALUE_KEYS, list(vals) + [None] * (len(VALUE_KEYS) - len(vals))))
+
+EDGE_CASES = [
+    {"demand_no": 1, "ministry": None, "department": None, "sections": []},
+    {"demand_no": 7, "ministry": "Ministry of Finance", "department": "Department of Revenue", "sections": [
+        {"heading": "Totals", "items": []},
+        {"heading": "A. Centre's Expenditure", "items": [
+            {"code": None, "name": "Grand Total", "values": values(1234.0, 0.5, -3.25), "type": "grand_total"},
+            {"code": "1", "name": "Scheme ₹ (नया)", "values": values()},
+            {"code": "1", "name": "Scheme ₹ (नया)", "values": values(*[float(i) for i in range(12)])},
+        ]},
+    ]},
+    # strings shared between demands, a repeated demand number
+    {"demand_no": 7, "ministry": "Ministry of Finance", "department": None, "sections": [
+        {"heading": "Totals", "items": [{"code": None, "name": "Total", "values": values(1e12), "type": "total"}]},
+    ]},
+]
+
+def assert_same(expanded, demands):
+    assert expanded == demands
+    # 1234.0 is written as 1234 but must come back as a float
+    for demand in expanded:
+        for section in demand["sections"]:
+            for item in section["items"]:
+                assert all(v is None or type(v) is float for v in item["values"].values())
+
+def test_round_trip_edge_cases():
+    bundle = build_bundle(EDGE_CASES)
+    assert_same(expand_bundle(bundle), EDGE_CASES)
+    # survives JSON, as served to the frontend
+    assert_same(expand_bundle(json.loads(json.dumps(bundle, ensure_ascii=False))), EDGE_CASES)
+
+def test_round_trip_empty():
+    assert expand_bundle(build_bundle([])) == []
+
+def test_build_accepts_any_iterable():
+    assert expand_bundle(build_bundle(iter(EDGE_CASES))) == EDGE_CASES
+
+def test_round_trip_extracted_demands(tmp_path):
+    out_dir = os.path.join(DATA_DIR, "output_json_improved_full")
+    demands = load_demand_files(out_dir)
+    if not demands:
+        pytest.skip("no extracted DEMAND_*.json files")
+    path = write_bundle(demands, tmp_path)
+    with open(path, encoding="utf-8") as f:
+        assert_same(expand_bundle(json.load(f)), demands)
@@ -18,7 +18,7 @@ export default function ChatApp() {
   const userEmail = localStorage.getItem("userEmail");
 
   // --------------------------------------------------
-  // LOAD USER CHATS FROM BACKEND
+  // LOAD USER CHATS FROM BACKEND (titles only)
   // --------------------------------------------------
   useEffect(() => {
     if (!userEmail) return;
@@ -26,10 +26,10 @@ export default function ChatApp() {
     const fetchChats = async () => {
       try {
         const res = await axios.get(
-          `http://127.0.0.1:8000/api/chats/${userEmail}`
+          `http://127.0.0.1:8000/api/chats/${userEmail}/list`
         );
 
-        const backendChats = res.data;
+        const backendChats = res.data.chats;
 
         if (backendChats.length === 0) {
           createChat();
@@ -45,6 +45,44 @@ export default function ChatApp() {
     fetchChats();
   }, [userEmail]);
 
+  // --------------------------------------------------
+  // LOAD MESSAGES (newest page, then older on demand)
+  // --------------------------------------------------
+  // "before" is the seq cursor returned as next_before
+  const loadMessages = async (id, before = null) => {
+    try {
+      const res = await axios.get(
+        `http://127.0.0.1:8000/api/chat/${id}/messages`,
+        { params: before != null ? { before } : {} }
+      );
+
+      const { messages, next_before } = res.data;
+
+      setChats((prev) =>
+        prev.map((c) =>
+          c.id === id
+            ? {
+                ...c,
+                messages: before != null
+                  ? [...messages, ...(c.messages || [])]
+                  : messages,
+                nextBefore: next_before,
+              }
+            : c
+        )
+      );
+    } catch (err) {
+      console.error("Failed to load messages:", err);
+    }
+  };
+
+  useEffect(() => {
+    const chat = chats.find((c) => c.id === activeChatId);
+    if (chat && chat.messages === undefined) {
+      loadMessages(chat.id);
+    }
+  }, [activeChatId, chats]);
+
   // --------------------------------------------------
   // CREATE CHAT
   // --------------------------------------------------
@@ -105,6 +143,21 @@ export default function ChatApp() {
     );
   };
 
+  // Patch the newest message of the active chat (streamed bot replies)
+  const updateLastMessage = (patch) => {
+    setChats((prev) =>
+      prev.map((c) => {
+        if (c.id !== activeChatId || !c.messages?.length) return c;
+        const messages = [...c.messages];
+        messages[messages.length - 1] = {
+          ...messages[messages.length - 1],
+          ...patch,
+        };
+        return { ...c, messages };
+      })
+    );
+  };
+
   const updateActive = (patch) => {
     setChats((prev) =>
       prev.map((c) =>
@@ -168,7 +221,12 @@ export default function ChatApp() {
             chat={activeChat}
             chatId={activeChatId}
             append={appendToActive}
+            updateLastMessage={updateLastMessage}
             updateActive={updateActive}
+            loadOlder={() =>
+              activeChat?.nextBefore != null &&
+              loadMessages(activeChatId, activeChat.nextBefore)
+            }
             openReview={(chartUri) => {
               setActiveChart(chartUri);
               setReviewOpen(true);
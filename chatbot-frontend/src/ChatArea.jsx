@@ -2,10 +2,42 @@ import React, { useEffect, useRef, useState } from "react";
 import axios from "axios";
 import { Copy } from "lucide-react";
 
+const API_BASE = "http://127.0.0.1:8000";
+
+const toChartUri = (event) => {
+  if (event.url) return `${API_BASE}${event.url}`;
+  if (!event.chart) return null;
+  return event.chart.startsWith("data:")
+    ? event.chart
+    : `data:image/png;base64,${event.chart}`;
+};
+
+// Reads the NDJSON event stream of /api/chat/stream
+const readEvents = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+
+    let nl;
+    while ((nl = buffered.indexOf("\n")) >= 0) {
+      const line = buffered.slice(0, nl).trim();
+      buffered = buffered.slice(nl + 1);
+      if (line) onEvent(JSON.parse(line));
+    }
+  }
+};
+
 export default function ChatArea({
   chat,
   append,
+  updateLastMessage,
   updateActive,
+  loadOlder,
   openReview,
   setToast,
   toggleSidebar,
@@ -73,54 +105,41 @@ export default function ChatArea({
       console.error("Auto-rename error:", err);
     }
 
-    // SAVE USER MESSAGE TO BACKEND
-    try {
-      await axios.post(
-        "http://127.0.0.1:8000/api/chat/add-message",
-        {
-          chat_id: chatId,
-          role: "user",
-          text: m,
-          chart: null,
-        }
-      );
-    } catch (err) {
-      console.error("Save user message error:", err);
-    }
+    // Both sides of the exchange are saved in one request at the end
+    const toSave = [{ role: "user", text: m, chart: null }];
 
     // ---------------- BOT RESPONSE ----------------
+    // Streamed: rule text / LLM tokens show up as they arrive,
+    // the chart (if any) comes last.
     try {
-      const res = await axios.post(
-        "http://127.0.0.1:8000/api/chat",
-        { message: m }
-      );
-
-      const { summary, chart } = res.data;
-
-      const chartUri = chart
-        ? chart.startsWith("data:")
-          ? chart
-          : `data:image/png;base64,${chart}`
-        : null;
+      const res = await fetch(`${API_BASE}/api/chat/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: m }),
+      });
 
-      const bot = {
-        role: "bot",
-        text: summary,
-        chart: chartUri,
-      };
+      if (!res.ok || !res.body) {
+        throw new Error(`HTTP ${res.status}`);
+      }
 
-      append(bot);
+      let summary = "";
+      let chartUri = null;
+      append({ role: "bot", text: "", chart: null });
 
-      // SAVE BOT MESSAGE
-      await axios.post(
-        "http://127.0.0.1:8000/api/chat/add-message",
-        {
-          chat_id: chatId,
-          role: "bot",
-          text: summary,
-          chart: chartUri,
+      await readEvents(res, (event) => {
+        if (event.type === "text" || event.type === "error") {
+          summary = event.text;
+        } else if (event.type === "token") {
+          summary += event.text;
+        } else if (event.type === "chart") {
+          chartUri = toChartUri(event);
+        } else {
+          return;
         }
-      );
+        updateLastMessage({ text: summary, chart: chartUri });
+      });
+
+      toSave.push({ role: "bot", text: summary, chart: chartUri });
     } catch (err) {
       console.error("API error", err);
 
@@ -135,6 +154,16 @@ export default function ChatArea({
           type: "error",
         });
     }
+
+    // SAVE EXCHANGE TO BACKEND
+    try {
+      await axios.post(
+        "http://127.0.0.1:8000/api/chat/add-messages",
+        { chat_id: chatId, messages: toSave }
+      );
+    } catch (err) {
+      console.error("Save messages error:", err);
+    }
   };
 
   const copyMessage = async (msg) => {
@@ -172,6 +201,17 @@ export default function ChatArea({
       </header>
 
       <section className="chat-messages">
+        {chat.nextBefore != null && (
+          <div className="view-chart-line">
+            <button
+              className="view-chart-inline"
+              onClick={loadOlder}
+            >
+              Load earlier messages
+            </button>
+          </div>
+        )}
+
         {!chat.messages || chat.messages.length === 0 ? (
           <div className="empty-state">
             <h1>Where should we begin?</h1>
@@ -0,0 +1,85 @@
+// src/budgetData.js
+// All budget demands, loaded once per page session from the compact
+// bundle (see public/data/budget_bundle.py) instead of one request
+// per DEMAND_{n}.json.
+
+const API_BASE = "http://127.0.0.1:8000";
+
+// The API serves the bundle compressed with an ETag; the static copy
+// is there when only the frontend is running
+const BUNDLE_URLS = [
+  `${API_BASE}/api/budget/bundle`,
+  "/data/output_json_improved_full/budget_bundle.json",
+];
+const DEMAND_PREFIX = "/data/output_json_improved_full/DEMAND_";
+const MAX_DEMAND_NO = 120;
+
+// Bundle -> the same demand objects as DEMAND_{n}.json
+export function expandBundle(bundle) {
+  const { strings, columns, demands: d, sections: s, items: it } = bundle;
+  const str = (id) => (id < 0 ? null : strings[id]);
+
+  const item = (i) => {
+    const values = {};
+    columns.forEach((key, c) => {
+      values[key] = it.values[c][i];
+    });
+    const out = { code: str(it.code[i]), name: strings[it.name[i]], values };
+    if (it.type[i] >= 0) out.type = strings[it.type[i]];
+    return out;
+  };
+
+  return d.demand_no.map((demandNo, n) => {
+    const sections = [];
+    for (let k = d.section_start[n]; k < d.section_start[n + 1]; k++) {
+      const items = [];
+      for (let i = s.item_start[k]; i < s.item_start[k + 1]; i++) items.push(item(i));
+      sections.push({ heading: strings[s.heading[k]], items });
+    }
+    return {
+      demand_no: demandNo,
+      ministry: str(d.ministry[n]),
+      department: str(d.department[n]),
+      sections,
+    };
+  });
+}
+
+// Old layout, fetched in parallel
+async function fetchDemandFiles() {
+  const nums = Array.from({ length: MAX_DEMAND_NO }, (_, i) => i + 1);
+  const demands = await Promise.all(
+    nums.map(async (n) => {
+      try {
+        const r = await fetch(`${DEMAND_PREFIX}${n}.json`);
+        return r.ok ? await r.json() : null;
+      } catch {
+        return null;
+      }
+    })
+  );
+  return demands.filter(Boolean);
+}
+
+let demandsPromise = null;
+
+export function loadDemands() {
+  if (!demandsPromise) {
+    demandsPromise = (async () => {
+      for (const url of BUNDLE_URLS) {
+        try {
+          const res = await fetch(url);
+          if (!res.ok) continue;
+          const bundle = await res.json();
+          if (bundle.format === "budget-bundle") return expandBundle(bundle);
+        } catch {
+          // try the next source
+        }
+      }
+      const demands = await fetchDemandFiles();
+      if (!demands.length) demandsPromise = null; // retry on next call
+      return demands;
+    })();
+  }
+  return demandsPromise;
+}
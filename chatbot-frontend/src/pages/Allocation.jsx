@@ -6,9 +6,7 @@ import { jsPDF } from "jspdf";
 
 import "../styles/allocation.css";
 import "../styles/home.css";
-
-const DATA_PATH = "/data/output_json_improved_full/all_demands_improved_full.json";
-const PER_DEMAND_PATH_PREFIX = "/data/output_json_improved_full/DEMAND_";
+import { loadDemands } from "../budgetData";
 
 const TOP_MINISTRIES = [
   "defence","road transport","railway","education","health",
@@ -39,19 +37,7 @@ export default function Allocation() {
     (async function load() {
       setIsLoading(true);
       try {
-        const res = await fetch(DATA_PATH);
-        if (res.ok) {
-          setRawData(await res.json());
-        } else {
-          const arr = [];
-          for (let i = 1; i <= 120; i++) {
-            try {
-              const r = await fetch(`${PER_DEMAND_PATH_PREFIX}${i}.json`);
-              if (r.ok) arr.push(await r.json());
-            } catch {}
-          }
-          setRawData(arr);
-        }
+        setRawData(await loadDemands());
       } catch {
         setRawData([]);
       } finally {
@@ -5,6 +5,7 @@ import Chart from "chart.js/auto";
 import "../styles/navbar.css";
 import "../styles/home.css";
 import "../styles/comparison.css";
+import { loadDemands } from "../budgetData";
 
 export default function Comparison() {
   const navigate = useNavigate();
@@ -38,20 +39,8 @@ export default function Comparison() {
     (async function load() {
       setIsLoading(true);
       try {
-        // 1) Try to fetch consolidated all_demands_improved_full.json (fast)
-        try {
-          const res = await fetch("/data/output_json_improved_full/all_demands_improved_full.json");
-          if (res.ok) {
-            const json = await res.json();
-            setAllData(json);
-          } else {
-            // fallback: attempt to fetch DEMAND_x files (if you have them individually).
-            await fetchDemandsFallback();
-          }
-        } catch (err) {
-          // fallback
-          await fetchDemandsFallback();
-        }
+        // 1) All demands (one compressed bundle, see budgetData.js)
+        setAllData(await loadDemands());
 
         // 2) ministry_department.json (optional but useful)
         try {
@@ -83,22 +72,6 @@ export default function Comparison() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  // fallback to individually named demand files (DEMAND_1.json...)
-  async function fetchDemandsFallback() {
-    const results = [];
-    for (let i = 1; i <= 120; i++) {
-      try {
-        const r = await fetch(`/data/output_json_improved_full/DEMAND_${i}.json`);
-        if (!r.ok) continue;
-        const d = await r.json();
-        results.push(d);
-      } catch (err) {
-        // skip
-      }
-    }
-    setAllData(results);
-  }
-
   // build ministries list when allData loads
   useEffect(() => {
     if (!allData || !allData.length) return;
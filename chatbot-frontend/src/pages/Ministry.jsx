@@ -5,6 +5,7 @@ import { jsPDF } from "jspdf";
 
 import "../styles/navbar.css";
 import "../styles/ministry.css";
+import { loadDemands } from "../budgetData";
 
 export default function Ministry() {
 
@@ -28,9 +29,6 @@ export default function Ministry() {
   const downloadBtnRef = useRef(null);
   const [dropdownOpen, setDropdownOpen] = useState(false);
 
-
-  const DEMANDS_PATH = "/data/output_json_improved_full/";
-
   useEffect(() => {
   function handleClickOutside(e) {
     if (
@@ -79,19 +77,17 @@ export default function Ministry() {
     try {
       const found = [];
 
-      for (let num = 1; num <= 120; num++) {
-        const file = `${DEMANDS_PATH}DEMAND_${num}.json`;
+      const demands = await loadDemands();
+
+      for (const d of demands) {
         try {
-          const res = await fetch(file);
-          if (!res.ok) continue;
-          const d = await res.json();
           const rawMin = (d.ministry || d.ministry_name || "").toLowerCase();
 
           if (rawMin.includes(ministryName.toLowerCase())) {
             const total = extractTotal(d);
             const dept = d.department || d.department_name || "Directly under Ministry";
             found.push({
-              no: d.demand_no || num,
+              no: d.demand_no,
               dept,
               total,
               raw: d
@@ -5,6 +5,7 @@ import Chart from "chart.js/auto";
 import "../styles/navbar.css";
 import "../styles/allocation.css";
 import "../styles/projects.css";
+import { loadDemands } from "../budgetData";
 
 export default function Projects() {
   const location = useLocation();
@@ -25,9 +26,6 @@ export default function Projects() {
   const downloadBtnRef = useRef(null);
   const [dropdownOpen, setDropdownOpen] = useState(false);
 
-
-  const DEMANDS_PATH = "/data/output_json_improved_full/";
-
   /* ============================== DATA LOAD ============================== */
   useEffect(() => {
     setLoading(true);
@@ -41,14 +39,10 @@ export default function Projects() {
       try {
         const collected = [];
 
-        for (let i = 1; i <= 120; i++) {
-          const file = `${DEMANDS_PATH}DEMAND_${i}.json`;
-          try {
-            const res = await fetch(file);
-            if (!res.ok) continue;
-
-            const data = await res.json();
+        const demands = await loadDemands();
 
+        for (const data of demands) {
+          try {
             const matchesMinistry =
               data.ministry?.toLowerCase().includes(ministry.toLowerCase());
             const matchesDept =
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import CancelledError, Future
+from datetime import datetime, timezone
+
+# ==============================
+# CONFIG
+# ==============================
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "2048"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+# 0 disables fuzzy matching; e.g. 0.9 serves near-identical questions
+AI_CACHE_SIMILARITY = float(os.getenv("AI_CACHE_SIMILARITY", "0"))
+
+# Filler words that do not change what is being asked
+STOP_WORDS = {"a", "an", "the", "please", "me", "tell", "explain", "can", "you", "i", "about", "pls", "plz"}
+
+logger = logging.getLogger(__name__)
+
+_non_word = re.compile(r"[^\w\s]+")
+_spaces = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """
+    Cache key for a question: case, punctuation and
+    whitespace differences are ignored.
+    """
+    text = _non_word.sub(" ", text.lower())
+    return _spaces.sub(" ", text).strip()
+
+
+def _terms(normalized):
+    return [t for t in normalized.split() if t not in STOP_WORDS]
+
+
+# ==============================
+# PERSISTENCE BACKENDS
+# ==============================
+class JsonlStore:
+    """
+    Append-only JSON-lines file. The last line for a key wins;
+    the file is compacted on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        entries = OrderedDict()
+        if not os.path.exists(self.path):
+            return entries
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue   # torn last line after a crash
+                entries.pop(rec["key"], None)
+                entries[rec["key"]] = rec
+        if lines > 2 * len(entries):
+            self._rewrite(entries.values())
+        return entries
+
+    def _rewrite(self, records):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+    def save(self, rec):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def _utc_timestamp(dt):
+    # pymongo hands back naive datetimes (in UTC) unless the client
+    # is tz_aware; .timestamp() would read those as local time
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class MongoStore:
+    """
+    One document per normalized question; Mongo's TTL index
+    removes expired answers.
+
+    Nothing touches the server until load(), which AnswerCache.attach_store
+    calls; the servers do that from a startup task, not at import.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def load(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        entries = OrderedDict()
+        for doc in self.collection.find({}, {"_id": 0}).sort("created_at", 1):
+            doc["expires_at"] = _utc_timestamp(doc["expires_at"])
+            doc["created_at"] = _utc_timestamp(doc["created_at"])
+            entries[doc["key"]] = doc
+        return entries
+
+    def save(self, rec):
+        doc = dict(rec)
+        doc["expires_at"] = datetime.fromtimestamp(rec["expires_at"], timezone.utc)
+        doc["created_at"] = datetime.fromtimestamp(rec["created_at"], timezone.utc)
+        self.collection.replace_one({"key": rec["key"]}, doc, upsert=True)
+
+
+# ==============================
+# ANSWER CACHE
+# ==============================
+class AnswerCache:
+    """
+    TTL + LRU cache of LLM answers keyed on the normalized question.
+
+    Optionally falls back to TF-IDF cosine similarity over cached
+    questions, and coalesces concurrent identical questions into a
+    single upstream call (threads and asyncio tasks alike).
+    """
+
+    def __init__(self, max_entries=AI_CACHE_SIZE, ttl=AI_CACHE_TTL, similarity=AI_CACHE_SIMILARITY, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.store = None
+
+        self._entries = OrderedDict()   # key -> record
+        self._postings = {}             # term -> set(keys)
+        self._tf = {}                   # key -> Counter(terms)
+        self._lock = threading.Lock()
+        self._inflight = {}             # key -> concurrent Future
+        self._ainflight = {}            # key -> asyncio Future
+        self._stats = {"hits": 0, "similar_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "store_errors": 0}
+
+        if store is not None:
+            self.attach_store(store)
+
+    def attach_store(self, store):
+        """
+        Persists future answers to store and loads its unexpired ones.
+        """
+        now = time.time()
+        records = store.load()
+        with self._lock:
+            for key, rec in records.items():
+                if rec["expires_at"] > now and rec["answer"]:
+                    self._insert(key, rec)
+            self.store = store
+
+    # ---------------- INDEX ----------------
+    def _insert(self, key, rec):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = rec
+        tf = Counter(_terms(key))
+        self._tf[key] = tf
+        for term in tf:
+            self._postings.setdefault(term, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old = next(iter(self._entries))
+            self._remove(old)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        for term in self._tf.pop(key, ()):
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def _idf(self, term):
+        return math.log((len(self._entries) + 1) / (len(self._postings.get(term, ())) + 1)) + 1
+
+    def _vector(self, tf):
+        vec = {t: c * self._idf(t) for t, c in tf.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return vec, norm
+
+    def _similar(self, key):
+        tf = Counter(_terms(key))
+        if not tf:
+            return None
+        candidates = set()
+        for term in tf:
+            candidates |= self._postings.get(term, set())
+        if not candidates:
+            return None
+
+        qvec, qnorm = self._vector(tf)
+        best, best_score = None, self.similarity
+        for cand in candidates:
+            cvec, cnorm = self._vector(self._tf[cand])
+            dot = sum(w * cvec.get(t, 0.0) for t, w in qvec.items())
+            score = dot / (qnorm * cnorm)
+            if score >= best_score:
+                best, best_score = cand, score
+        return best
+
+    # ---------------- LOOKUP ----------------
+    def _lookup(self, key):
+        """
+        Called with self._lock held.
+        """
+        now = time.time()
+        rec = self._entries.get(key)
+        if rec is not None and rec["expires_at"] <= now:
+            self._remove(key)
+            rec = None
+        if rec is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return rec["answer"]
+
+        if self.similarity > 0:
+            cand = self._similar(key)
+            if cand is not None and self._entries[cand]["expires_at"] > now:
+                self._entries.move_to_end(cand)
+                self._stats["similar_hits"] += 1
+                return self._entries[cand]["answer"]
+        return None
+
+    def get(self, question):
+        with self._lock:
+            return self._lookup(normalize_query(question))
+
+    def _record(self, question, answer):
+        """
+        Caches answer in memory and returns its record; None for an
+        empty answer, which is not cached.
+        """
+        if not answer:
+            return None
+        key = normalize_query(question)
+        now = time.time()
+        rec = {"key": key, "question": question, "answer": answer,
+               "created_at": now, "expires_at": now + self.ttl}
+        with self._lock:
+            self._insert(key, rec)
+        return rec
+
+    def _save(self, rec):
+        # A failed write only costs the answer its persistence
+        try:
+            self.store.save(rec)
+        except Exception:
+            with self._lock:
+                self._stats["store_errors"] += 1
+            logger.exception("Could not persist cached answer %r", rec["key"])
+
+    def put(self, question, answer):
+        rec = self._record(question, answer)
+        if rec is not None and self.store is not None:
+            self._save(rec)
+
+    # ---------------- COALESCING ----------------
+    # claim() hands the first caller of a question the job of answering
+    # it (owner=True); callers arriving meanwhile wait for that answer.
+    # The owner ends its claim with resolve() (aresolve() / afail() for
+    # tasks), also when it fails. The thread claims (_inflight) and the
+    # asyncio ones (_ainflight) are each shared by the plain and the
+    # streaming answer paths.
+    def _claim(self, key, inflight, new_future):
+        with self._lock:
+            answer = self._lookup(key)
+            if answer is not None:
+                return answer, None
+            pending = inflight.get(key)
+            if pending is None:
+                self._stats["misses"] += 1
+                inflight[key] = new_future()
+            else:
+                self._stats["coalesced"] += 1
+            return None, pending
+
+    def _settle(self, question, inflight, answer, error):
+        """
+        Ends a claim; returns the record to persist, if any.
+        """
+        rec = self._record(question, answer) if error is None else None
+        with self._lock:
+            pending = inflight.pop(normalize_query(question))
+        if error is None:
+            pending.set_result(answer)
+        elif isinstance(error, (GeneratorExit, CancelledError, asyncio.CancelledError)):
+            # The owner went away (client disconnected): waiters ask again
+            pending.cancel()
+        else:
+            pending.set_exception(error)
+            pending.exception()   # mark retrieved if nobody was waiting
+        return rec
+
+    def claim(self, question):
+        """
+        (answer, owner) for a thread: the cached answer or the one
+        another thread was computing, or (None, True) when the caller
+        has to compute it and then call resolve().
+        """
+        key = normalize_query(question)
+        while True:
+            answer, pending = self._claim(key, self._inflight, Future)
+            if answer is not None:
+                return answer, False
+            if pending is None:
+                return None, True
+            try:
+                return pending.result(), False
+            except CancelledError:
+                continue
+
+    def resolve(self, question, answer=None, error=None):
+        """
+        Ends a claim() with its answer (cached unless empty) or error.
+        """
+        rec = self._settle(question, self._inflight, answer, error)
+        if rec is not None and self.store is not None:
+            self._save(rec)
+
+    async def aclaim(self, question):
+        """
+        claim() for asyncio tasks; end it with aresolve() or afail().
+        """
+        key = normalize_query(question)
+        loop = asyncio.get_running_loop()
+        while True:
+            answer, pending = self._claim(key, self._ainflight, loop.create_future)
+            if answer is not None:
+                return answer, False
+            if pending is None:
+                return None, True
+            try:
+                return await asyncio.shield(pending), False
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise   # this task was cancelled, not the owner
+
+    async def aresolve(self, question, answer):
+        """
+        Ends an aclaim() with its answer; waiters get it before
+        the store write, which runs in the default executor.
+        """
+        rec = self._settle(question, self._ainflight, answer, None)
+        if rec is not None and self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._save, rec)
+
+    def afail(self, question, error):
+        """
+        Ends a failed aclaim(). Never suspends, so it is safe in the
+        cleanup of a cancelled task or a closed async generator.
+        """
+        self._settle(question, self._ainflight, None, error)
+
+    def get_or_compute(self, question, compute):
+        """
+        Cached answer, or compute(question) run by exactly one of
+        the threads asking the same question at the same time.
+        """
+        answer, owner = self.claim(question)
+        if not owner:
+            return answer
+        try:
+            answer = compute(question)
+        except BaseException as e:
+            self.resolve(question, error=e)
+            raise
+        self.resolve(question, answer)
+        return answer
+
+    async def aget_or_compute(self, question, compute):
+        """
+        asyncio version: compute is an async function.
+        """
+        answer, owner = await self.aclaim(question)
+        if not owner:
+            return answer
+        try:
+            answer = await compute(question)
+        except BaseException as e:
+            self.afail(question, e)
+            raise
+        await self.aresolve(question, answer)
+        return answer
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "max_entries": self.max_entries}
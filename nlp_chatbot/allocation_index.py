@@ -0,0 +1,107 @@
+import numpy as np
+
+# ==============================
+# ALLOCATION VECTORS
+# ==============================
+class AllocationVectors:
+    """
+    Ministry and department shares from data_allocation_2025.json,
+    converted to floats and sorted once.
+
+    Attributing an amount is then one vector multiply plus a slice
+    of the precomputed order, instead of rebuilding and sorting a
+    list of dicts per query.
+    """
+
+    def __init__(self, allocation_data):
+        ministries = allocation_data.get("ministries", [])
+
+        self.ministries = [m.get("ministry", "Unknown") for m in ministries]
+        self.shares = np.array(
+            [float(m.get("percentage_share", 0)) for m in ministries]
+        )
+        # stable sorts, so ties keep file order like sorted(..., reverse=True)
+        self.order_desc = np.argsort(-self.shares, kind="stable")
+        self.order_asc = np.argsort(self.shares, kind="stable")
+
+        # department level: flattened over all ministries
+        dept_ministry, dept_names, within = [], [], []
+        for i, m in enumerate(ministries):
+            for d in m.get("departments", []):
+                dept_ministry.append(i)
+                dept_names.append(d.get("department", "Unknown"))
+                within.append(float(d.get("percentage_share_within_ministry", 0)))
+
+        self.dept_ministry = np.array(dept_ministry, dtype=np.int64)
+        self.dept_names = dept_names
+        self.dept_within = np.array(within)
+        self.dept_shares = (
+            self.shares[self.dept_ministry] * self.dept_within / 100
+            if dept_names else np.zeros(0)
+        )
+        self.dept_order = np.argsort(-self.dept_shares, kind="stable")
+
+        # per-ministry department rows, biggest first
+        self.ministry_depts = {}
+        for i, name in enumerate(self.ministries):
+            rows = np.flatnonzero(self.dept_ministry == i)
+            rows = rows[np.argsort(-self.dept_within[rows], kind="stable")]
+            self.ministry_depts[name.lower()] = rows
+
+    @classmethod
+    def from_data(cls, allocation_data):
+        return cls(allocation_data)
+
+    def _order(self, tax_amount):
+        if tax_amount > 0:
+            return self.order_desc
+        if tax_amount < 0:
+            return self.order_asc
+        # all amounts are 0: sorted() keeps the original order
+        return np.arange(len(self.ministries))
+
+    def allocate(self, tax_amount, top_k=None):
+        """
+        Splits tax_amount across ministries, largest share first.
+        Returns at most top_k entries.
+        """
+        order = self._order(tax_amount)
+        if top_k is not None:
+            order = order[:top_k]
+        pct = self.shares[order]
+        amounts = (pct / 100) * tax_amount
+        return [
+            {"ministry": self.ministries[i], "percent": p, "amount": a}
+            for i, p, a in zip(order.tolist(), pct.tolist(), amounts.tolist())
+        ]
+
+    def allocate_departments(self, tax_amount, top_k=None, ministry=None):
+        """
+        Splits tax_amount down to departments. With ministry set, only
+        that ministry's departments are returned; "percent" is then the
+        department's share of the whole amount either way.
+        """
+        if ministry is None:
+            rows = self.dept_order
+        else:
+            rows = self.ministry_depts.get(ministry.lower(), np.zeros(0, dtype=np.int64))
+        if top_k is not None:
+            rows = rows[:top_k]
+
+        pct = self.dept_shares[rows]
+        amounts = (pct / 100) * tax_amount
+        return [
+            {
+                "ministry": self.ministries[self.dept_ministry[r]],
+                "department": self.dept_names[r],
+                "percent": p,
+                "percent_within_ministry": w,
+                "amount": a
+            }
+            for r, p, w, a in zip(
+                rows.tolist(),
+                pct.tolist(),
+                self.dept_within[rows].tolist(),
+                amounts.tolist()
+            )
+        ]
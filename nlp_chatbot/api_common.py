@@ -0,0 +1,261 @@
+from pydantic import BaseModel, EmailStr
+import bcrypt
+import io
+import json
+import base64
+import asyncio
+import numpy as np
+from datetime import datetime
+from typing import List, Optional
+
+from nlp_query import (
+    CHART_FORMAT,
+    calculate_tax_batch,
+    calculate_income_tax_batch,
+    smart_tax_flow_stream,
+    smart_tax_flow_stream_async
+)
+from chat_store import parse_object_id
+from budget_analytics import budget_index
+from budget_search import budget_search
+
+# ------------------------------------------------------------
+# Shared by server.py (sync) and server_async.py (async):
+# request models and the CPU-only helpers behind the routes.
+# ------------------------------------------------------------
+
+# ------------------------------------------------------------
+# PASSWORD HASHING
+# ------------------------------------------------------------
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return bcrypt.checkpw(plain.encode(), hashed.encode())
+
+# ------------------------------------------------------------
+# MODELS
+# ------------------------------------------------------------
+class Signup(BaseModel):
+    username: str
+    email: EmailStr
+    password: str
+
+class LoginModel(BaseModel):
+    email: EmailStr
+    password: str
+
+class UserMessage(BaseModel):
+    message: str
+
+# NEW MODELS FOR CHAT STORAGE
+class CreateChatModel(BaseModel):
+    email: EmailStr
+    title: Optional[str] = "New chat"
+
+class AddMessageModel(BaseModel):
+    chat_id: str
+    role: str
+    text: str
+    chart: Optional[str] = None
+
+class ChatMessageModel(BaseModel):
+    role: str
+    text: str
+    chart: Optional[str] = None
+
+class AddMessagesModel(BaseModel):
+    chat_id: str
+    messages: List[ChatMessageModel]
+
+# BULK TAX PRICING (columnar: one list per field)
+class BatchTaxModel(BaseModel):
+    products: List[str] = []
+    amounts: List[float] = []
+    states: Optional[List[Optional[str]]] = None
+    variants: Optional[List[Optional[str]]] = None
+    incomes: Optional[List[float]] = None
+
+# ------------------------------------------------------------
+# CHART ENCODING
+# ------------------------------------------------------------
+def encode_chart(chart_buf):
+    if not chart_buf:
+        return {"chart": None}
+
+    data = chart_buf.getvalue()
+    if CHART_FORMAT == "json":
+        return {"chart": None, "chart_spec": json.loads(data)}
+
+    chart_base64 = base64.b64encode(data).decode("utf-8")
+    if CHART_FORMAT == "svg":
+        return {"chart": f"data:image/svg+xml;base64,{chart_base64}"}
+    return {"chart": chart_base64}
+
+CHART_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "json": "application/json"
+}
+
+# ------------------------------------------------------------
+# STREAMING CHAT (NDJSON, one event per line)
+#   {"type": "text",  "text": ...}   rule-based / UTTI answer
+#   {"type": "token", "text": ...}   piece of an LLM answer
+#   {"type": "chart", ...}           inline chart, or {"url": ...}
+#   {"type": "error", "text": ...}
+#   {"type": "done"}
+# ------------------------------------------------------------
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+def _chart_event(key, chart_bytes, chart_mode):
+    if chart_mode == "url":
+        return {"type": "chart", "url": f"/api/charts/{key}"}
+    return {"type": "chart", **encode_chart(io.BytesIO(chart_bytes))}
+
+def chat_stream(message: str, chart_mode: str = "inline"):
+    try:
+        for kind, payload in smart_tax_flow_stream(message):
+            if kind == "chart":
+                key, future = payload
+                yield ndjson(_chart_event(key, future.result(), chart_mode))
+            else:
+                yield ndjson({"type": kind, "text": payload})
+    except Exception as e:
+        print("❌ Backend Error:", e)
+        yield ndjson({"type": "error", "text": "Error processing request."})
+    yield ndjson({"type": "done"})
+
+async def chat_stream_async(message: str, chart_mode: str = "inline"):
+    try:
+        async for kind, payload in smart_tax_flow_stream_async(message):
+            if kind == "chart":
+                key, future = payload
+                chart_bytes = await asyncio.wrap_future(future)
+                yield ndjson(_chart_event(key, chart_bytes, chart_mode))
+            else:
+                yield ndjson({"type": kind, "text": payload})
+    except Exception as e:
+        print("❌ Backend Error:", e)
+        yield ndjson({"type": "error", "text": "Error processing request."})
+    yield ndjson({"type": "done"})
+
+# ------------------------------------------------------------
+# CHAT HISTORY PAGING
+#   list:     newest chats first, keyset cursor on (created_at, _id)
+#   messages: see chat_store.ChatStore.page
+# ------------------------------------------------------------
+CHAT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+CHAT_INDEXES = [("email", 1), ("created_at", -1), ("_id", -1)]
+CHAT_LIST_SORT = [("created_at", -1), ("_id", -1)]
+
+# Chats not yet moved to the messages collection are counted on the
+# server; their embedded messages never leave Mongo
+CHAT_LIST_PROJECTION = {
+    "title": 1,
+    "created_at": 1,
+    "message_count": {
+        "$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]
+    }
+}
+
+def encode_chat_cursor(chat: dict) -> str:
+    return f"{chat['created_at'].isoformat()}_{chat['_id']}"
+
+def chat_list_query(email: str, cursor: Optional[str] = None) -> dict:
+    """
+    Raises ValueError for a malformed cursor.
+    """
+    query = {"email": email}
+    if cursor:
+        created_at, _, chat_id = cursor.rpartition("_")
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            raise ValueError(f"invalid cursor: {cursor}")
+        chat_id = parse_object_id(chat_id)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": chat_id}}
+        ]
+    return query
+
+def chat_list_page(docs: list, limit: int) -> dict:
+    """
+    docs holds up to limit + 1 chats; the extra one only
+    tells whether another page exists.
+    """
+    more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "chats": [
+            {
+                "id": str(doc["_id"]),
+                "title": doc["title"],
+                "created_at": doc.get("created_at"),
+                "message_count": doc.get("message_count", 0)
+            }
+            for doc in docs
+        ],
+        "next_cursor": encode_chat_cursor(docs[-1]) if more else None
+    }
+
+# ------------------------------------------------------------
+# BULK TAX CALCULATION
+# ------------------------------------------------------------
+def batch_tax_response(payload: BatchTaxModel) -> dict:
+    """
+    Raises ValueError when the columns have different lengths.
+    """
+    n = len(payload.amounts)
+    if len(payload.products) != n:
+        raise ValueError("products and amounts must have the same length")
+    for name, col in (("states", payload.states), ("variants", payload.variants)):
+        if col is not None and len(col) != n:
+            raise ValueError(f"{name} must have the same length as amounts")
+
+    result = calculate_tax_batch(
+        payload.products,
+        payload.amounts,
+        payload.states,
+        payload.variants
+    )
+    response = {
+        "count": n,
+        "variants": result["variant"].tolist(),
+        "components": {
+            name: np.round(tax, 2).tolist()
+            for name, tax in result["components"].items()
+        },
+        "total_tax": np.round(result["total"], 2).tolist(),
+        "unmatched": np.flatnonzero(~result["matched"]).tolist()
+    }
+
+    if payload.incomes is not None:
+        income_tax = calculate_income_tax_batch(payload.incomes)
+        response["income_tax"] = np.round(income_tax, 2).tolist()
+
+    return response
+
+# ------------------------------------------------------------
+# BUDGET ANALYTICS
+# ------------------------------------------------------------
+def budget_query(method: str, *args):
+    """
+    Runs one BudgetIndex query (ministry, demand, top, compare, stats).
+    Raises ValueError for a bad column/level, LookupError for an
+    unknown ministry or demand, OSError if the data files are missing.
+    """
+    return getattr(budget_index(), method)(*args)
+
+def budget_item_search(q: str, n: int):
+    """
+    Budget line items matching `q`, best first. Raises ValueError for a
+    query with no searchable words, OSError if the bundle is missing.
+    """
+    return budget_search().search(q, n)
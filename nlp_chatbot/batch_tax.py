@@ -0,0 +1,189 @@
+import numpy as np
+
+# ==============================
+# BATCH TAX ENGINE
+# ==============================
+class BatchTaxEngine:
+    """
+    Vectorized version of calculate_components / the income-tax slab loop.
+
+    tax_rate.json is compiled once into dense rule tables:
+    one row per (product, variant) or service, one column per tax
+    component name. Pricing N line items is then a handful of NumPy
+    gathers instead of N passes through the Python rule walk.
+    """
+
+    def __init__(self, tax_data):
+        categories = tax_data.get("categories", {})
+        state_fees = tax_data.get("state_fees", {})
+
+        rules = []   # (product, variant, rule)
+        for items in categories.get("Goods", {}).values():
+            for product, variants in items.items():
+                if "tax_components" in variants:
+                    variants = {product: variants}
+                for variant, rule in variants.items():
+                    rules.append((product, variant, rule))
+        for service, rule in categories.get("Services", {}).items():
+            rules.append((service, None, rule))
+
+        components = []
+        for _, _, rule in rules:
+            for c in rule["tax_components"]:
+                if c["name"] not in components:
+                    components.append(c["name"])
+        self.components = components
+        col = {name: j for j, name in enumerate(components)}
+
+        n_rules, n_comp = len(rules), len(components)
+        self.rule_rates = np.zeros((n_rules, n_comp))
+        self.rule_state_specific = np.zeros((n_rules, n_comp), dtype=bool)
+        self.rule_present = np.zeros((n_rules, n_comp), dtype=bool)
+        self.price_above = np.full(n_rules, -np.inf)
+        self.price_below = np.full(n_rules, np.inf)
+        self.rule_variant = np.array([v if v is not None else "" for _, v, _ in rules], dtype=object)
+
+        # rules of one product are contiguous: product -> (first row, count)
+        self.product_rules = {}
+        self.variant_rule = {}
+        for r, (product, variant, rule) in enumerate(rules):
+            first, count = self.product_rules.get(product, (r, 0))
+            self.product_rules[product] = (first, count + 1)
+            self.variant_rule[(product, variant)] = r
+
+            if "price_above" in rule:
+                self.price_above[r] = rule["price_above"]
+            if "price_below" in rule:
+                self.price_below[r] = rule["price_below"]
+
+            for c in rule["tax_components"]:
+                j = col[c["name"]]
+                rate = c["rate_percent"]
+                if rate == "state_specific":
+                    self.rule_state_specific[r, j] = True
+                    self.rule_present[r, j] = True
+                elif rate == "state_specific_incentive":
+                    self.rule_present[r, j] = True
+                elif isinstance(rate, (int, float)):
+                    self.rule_rates[r, j] = rate
+                    self.rule_present[r, j] = True
+
+        # last row = no / unknown state, every state-specific rate is 0
+        self.states = list(state_fees.keys())
+        self.state_index = {s: i for i, s in enumerate(self.states)}
+        self.state_rates = np.zeros((len(self.states) + 1, n_comp))
+        for i, s in enumerate(self.states):
+            for name, rate in state_fees[s].items():
+                if name in col:
+                    self.state_rates[i, col[name]] = rate
+
+        slabs = categories.get("IncomeTax", {}).get("Individual", [])
+        self.slab_min = np.array([s["min"] for s in slabs], dtype=float)
+        self.slab_width = np.array([s["max"] - s["min"] for s in slabs], dtype=float)
+        self.slab_rate = np.array([s["rate"] for s in slabs], dtype=float)
+
+    @classmethod
+    def from_tax_data(cls, tax_data):
+        return cls(tax_data)
+
+    # ---------------- LOOKUPS ----------------
+    def _codes(self, values, table, missing):
+        """
+        Maps an array of names to integer codes, resolving each
+        distinct name only once.
+        """
+        uniq, inverse = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        codes = np.array([table.get(u, missing) for u in uniq], dtype=np.int64)
+        return codes[inverse] if len(uniq) else np.zeros(0, dtype=np.int64)
+
+    def _resolve_rules(self, products, amounts, variants):
+        n = len(amounts)
+        rule = np.full(n, -1, dtype=np.int64)
+
+        if variants is not None:
+            keys = [f"{p}\x00{v}" if v else "" for p, v in zip(products, variants)]
+            table = {f"{p}\x00{v}": r for (p, v), r in self.variant_rule.items()}
+            explicit = self._codes(keys, table, -1)
+            rule = np.where(explicit >= 0, explicit, rule)
+
+        first_table = {p: fc[0] for p, fc in self.product_rules.items()}
+        count_table = {p: fc[1] for p, fc in self.product_rules.items()}
+        first = self._codes(products, first_table, -1)
+        count = self._codes(products, count_table, 0)
+
+        # first variant whose price_above / price_below bounds admit the amount
+        max_variants = int(count.max()) if n else 0
+        for k in range(max_variants):
+            open_rows = (rule < 0) & (k < count)
+            if not open_rows.any():
+                break
+            cand = np.where(open_rows, first + k, 0)
+            ok = open_rows & (amounts > self.price_above[cand]) & (amounts < self.price_below[cand])
+            rule = np.where(ok, cand, rule)
+        return rule
+
+    # ---------------- PUBLIC API ----------------
+    def calculate(self, products, amounts, states=None, variants=None):
+        """
+        Prices N line items at once.
+
+        products: product or service names as in tax_rate.json
+        amounts:  base prices
+        states:   optional state names (for state-specific fees)
+        variants: optional explicit variants; None picks the first
+                  variant whose price rules match, like smart_tax_flow
+
+        Returns a dict with per-component tax arrays, the total,
+        the resolved variant and a matched mask. Unmatched rows
+        (unknown product, no admissible variant) are taxed at 0.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        n = len(amounts)
+        if len(products) != n:
+            raise ValueError("products and amounts must have the same length")
+
+        rule = self._resolve_rules(products, amounts, variants)
+        matched = rule >= 0
+        safe_rule = np.where(matched, rule, 0)
+
+        if states is None:
+            state = np.full(n, len(self.states), dtype=np.int64)
+        else:
+            state = self._codes([s or "" for s in states], self.state_index, len(self.states))
+
+        rates = np.where(
+            self.rule_state_specific[safe_rule],
+            self.state_rates[state],
+            self.rule_rates[safe_rule],
+        )
+        rates[~matched] = 0
+        tax = amounts[:, None] * rates / 100
+
+        components = {
+            name: tax[:, j]
+            for j, name in enumerate(self.components)
+            if self.rule_present[safe_rule[matched], j].any()
+        }
+        variant = np.where(matched, self.rule_variant[safe_rule], None)
+
+        return {
+            "components": components,
+            "total": tax.sum(axis=1),
+            "variant": variant,
+            "matched": matched,
+        }
+
+    def income_tax(self, incomes):
+        """
+        Individual slab tax for N incomes, same arithmetic as
+        the INCOME TAX branch of smart_tax_flow.
+        """
+        incomes = np.asarray(incomes, dtype=float)
+        remaining = incomes.copy()
+        tax = np.zeros_like(incomes)
+        for lo, width, rate in zip(self.slab_min, self.slab_width, self.slab_rate):
+            active = incomes > lo
+            taxable = np.where(active, np.minimum(remaining, width), 0)
+            tax += taxable * rate / 100
+            remaining -= taxable
+        return tax
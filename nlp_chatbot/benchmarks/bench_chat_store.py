@@ -0,0 +1,130 @@
+"""
+Chat persistence benchmark: embedded messages array vs chat_store.
+
+For conversations of increasing length, measures the latency of
+appending one message and of reading the newest page, for
+  - embedded: the old layout ($push into chats.messages, inline charts)
+  - store:    ChatStore (messages collection + deduplicated chart blobs)
+
+Needs a MongoDB; everything is written to a scratch database that is
+dropped afterwards.
+
+Run from nlp_chatbot/:
+    python benchmarks/bench_chat_store.py
+    python benchmarks/bench_chat_store.py --lengths 10 100 1000 --mongo mongodb://host:27017
+"""
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_store import ChatStore  # noqa: E402
+
+PAGE = 50
+# Every 10th bot answer carries a chart, as a ~20 KB PNG data URI would
+CHART = "data:image/png;base64," + base64.b64encode(os.urandom(15_000)).decode()
+
+
+def message(i):
+    return {
+        "role": "user" if i % 2 == 0 else "bot",
+        "text": f"message {i}: car 1500000 in Maharashtra",
+        "chart": CHART if i % 20 == 19 else None,
+        "timestamp": datetime.utcnow()
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def bench_embedded(db, length, repeat):
+    chats = db["chats_embedded"]
+    chat_id = chats.insert_one({
+        "email": "bench@example.com",
+        "title": "bench",
+        "messages": [message(i) for i in range(length)],
+        "created_at": datetime.utcnow()
+    }).inserted_id
+
+    n = [length]
+
+    def append():
+        chats.update_one({"_id": chat_id}, {"$push": {"messages": message(n[0])}})
+        n[0] += 1
+
+    append_ms = timed(append, repeat)
+    full_ms = timed(lambda: chats.find_one({"_id": chat_id}), repeat)
+    page_ms = timed(lambda: chats.find_one({"_id": chat_id}, {"messages": {"$slice": -PAGE}}), repeat)
+    size = db.command("collstats", "chats_embedded")["avgObjSize"]
+    return append_ms, page_ms, full_ms, size
+
+
+def bench_store(db, length, repeat):
+    store = ChatStore(db)
+    store.create_indexes()
+    chat_id = store.create_chat("bench@example.com", "bench")
+    for start in range(0, length, 500):
+        store.append(chat_id, [message(i) for i in range(start, min(length, start + 500))])
+
+    n = [length]
+
+    def append():
+        store.append(chat_id, [message(n[0])])
+        n[0] += 1
+
+    def read_all():
+        before = None
+        while True:
+            page = store.page(chat_id, before, 200)
+            before = page["next_before"]
+            if before is None:
+                break
+
+    append_ms = timed(append, repeat)
+    full_ms = timed(read_all, repeat)
+    page_ms = timed(lambda: store.page(chat_id, None, PAGE), repeat)
+    size = db.command("collstats", "chats")["avgObjSize"]
+    return append_ms, page_ms, full_ms, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo)
+    client.drop_database("bench_chat_store")
+    db = client["bench_chat_store"]
+
+    print(f"median of {args.repeat} runs, newest page = {PAGE} messages")
+    print(f"{'messages':>8} {'layout':<9} {'append ms':>10} {'page ms':>8} {'all ms':>8} {'chat doc':>10}")
+    try:
+        for length in args.lengths:
+            for name, bench in (("embedded", bench_embedded), ("store", bench_store)):
+                try:
+                    append_ms, page_ms, full_ms, size = bench(db, length, args.repeat)
+                except Exception as e:   # e.g. embedded past the 16 MB document limit
+                    print(f"{length:>8} {name:<9} failed: {e}")
+                    continue
+                print(f"{length:>8} {name:<9} {append_ms:>10.2f} {page_ms:>8.2f} {full_ms:>8.2f} {size / 1024:>8.0f} KB")
+            client.drop_database("bench_chat_store")
+    finally:
+        client.drop_database("bench_chat_store")
+
+
+if __name__ == "__main__":
+    main()
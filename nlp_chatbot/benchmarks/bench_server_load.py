@@ -0,0 +1,185 @@
+"""
+Mixed-traffic load test: server.py (sync) vs server_async.py (async).
+
+Starts a stub LLM endpoint (OpenAI-compatible, fixed latency) and a stub
+UTTI service, launches each app under uvicorn pointed at the stubs, and
+drives both with the same mix of rule-based, UTTI, LLM-fallback and
+(optionally) login requests.
+
+Run from nlp_chatbot/ (login traffic needs a local MongoDB):
+    python benchmarks/bench_server_load.py --duration 15 --concurrency 64
+    python benchmarks/bench_server_load.py --with-login
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_utti_client import StubSlipHandler  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ==============================
+# STUB LLM
+# ==============================
+def make_llm_handler(delay):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "stub",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "GST is a tax on goods and services."},
+                }],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubLLMHandler
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+# ==============================
+# TRAFFIC
+# ==============================
+def traffic_mix(with_login):
+    mix = [
+        ("rule", 5, "POST", "/api/chat", {"message": "car 1500000 in Maharashtra"}),
+        ("utti", 2, "POST", "/api/chat", {"message": "UTTI-GST-25-A9F3KQ"}),
+        ("llm", 2, "POST", "/api/chat", {"message": "what is compensation cess?"}),
+        ("health", 1, "GET", "/", None),
+    ]
+    if with_login:
+        mix.append(("login", 2, "POST", "/login", {"email": "bench@example.com", "password": "bench-pass"}))
+    return mix
+
+
+async def drive(base_url, duration, concurrency, mix):
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    by_name = {m[0]: m for m in mix}
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = random.choices(names, weights)[0]
+                _, _, method, path, body = by_name[name]
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, json=body)
+                    ok = resp.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies[name].append(time.perf_counter() - start)
+                else:
+                    errors[name] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def wait_ready(base_url, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def run_app(module, port, env, args, mix):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url)
+        if args.with_login:
+            httpx.post(base_url + "/signup", json={
+                "username": "bench", "email": "bench@example.com", "password": "bench-pass"
+            })
+        latencies, errors = asyncio.run(drive(base_url, args.duration, args.concurrency, mix))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{module}: {total / args.duration:.0f} req/s overall")
+    print(f"  {'route':<8} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for name, values in latencies.items():
+        if values:
+            values.sort()
+            p50 = statistics.median(values) * 1000
+            p95 = values[int(len(values) * 0.95) - 1] * 1000
+        else:
+            p50 = p95 = float("nan")
+        print(f"  {name:<8} {len(values):>7} {p50:>8.1f} {p95:>8.1f} {errors[name]:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--llm-delay", type=float, default=1.5)
+    parser.add_argument("--with-login", action="store_true")
+    args = parser.parse_args()
+
+    llm, llm_port = serve(make_llm_handler(args.llm_delay))
+    utti, utti_port = serve(StubSlipHandler)
+
+    env = dict(os.environ)
+    env["OPENROUTER_API_KEY"] = "bench"
+    env["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    env["UTTI_SERVICE_BASE"] = f"http://127.0.0.1:{utti_port}/slip"
+
+    mix = traffic_mix(args.with_login)
+    print(f"mix: {[(m[0], m[1]) for m in mix]}, concurrency {args.concurrency}, LLM delay {args.llm_delay}s")
+    run_app("server", 18000, env, args, mix)
+    run_app("server_async", 18001, env, args, mix)
+
+    llm.shutdown()
+    utti.shutdown()
+
+
+if __name__ == "__main__":
+    main()
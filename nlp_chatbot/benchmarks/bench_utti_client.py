@@ -0,0 +1,89 @@
+"""
+UTTI client benchmark against a local stub slip service.
+
+Compares the old per-call requests.get (new TCP connection every time)
+with the pooled UTTIClient, cold (cache disabled) and warm (cached).
+
+Run from nlp_chatbot/:
+    python benchmarks/bench_utti_client.py [n_requests] [threads]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utti_client import SlipCache, UTTIClient  # noqa: E402
+
+
+# ==============================
+# STUB UTTI SERVICE
+# ==============================
+class StubSlipHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        utti = self.path.rsplit("/", 1)[-1]
+        if utti.endswith("404404"):
+            body, status = b'{"detail": "UTTI not found"}', 404
+        else:
+            body = json.dumps({
+                "utti": utti,
+                "invoice_number": "INV-1",
+                "total_gst": 180.0,
+                "items": [{"name": "Laptop", "price": 1000, "gst_percent": 18, "gst_amount": 180}],
+            }).encode()
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSlipHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/slip"
+
+
+def run(label, fn, keys, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(fn, keys))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(keys) / elapsed:>10.0f} req/s  ({elapsed * 1000:.0f} ms)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server, base = start_stub()
+    # 50 distinct slips, 1 unknown UTTI, repeated like chat traffic
+    keys = [f"UTTI-GST-25-{i % 50:06d}" for i in range(n)]
+    keys[::10] = ["UTTI-GST-25-404404"] * len(keys[::10])
+
+    run("requests.get per call", lambda k: requests.get(f"{base}/{k}", timeout=5), keys, threads)
+
+    cold = UTTIClient(base, cache=SlipCache(ttl=0, negative_ttl=0))
+    run("pooled, no cache", cold.get_slip, keys, threads)
+
+    warm = UTTIClient(base)
+    run("pooled + LRU/TTL cache", warm.get_slip, keys, threads)
+    print("cache stats:", warm.stats())
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
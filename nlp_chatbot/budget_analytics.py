@@ -0,0 +1,302 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from rule_store import rule_store
+from budget_data import BUDGET_BUNDLE_FILE
+
+# ==============================
+# CONFIG
+# ==============================
+# Written by chatbot-frontend/public/data/analyze_budgets.py
+BUDGET_ANALYSIS_FILE = os.getenv(
+    "BUDGET_ANALYSIS_FILE",
+    "../chatbot-frontend/public/data/budget_analysis_full.json"
+)
+BUDGET_MAPPING_FILE = os.getenv(
+    "BUDGET_MAPPING_FILE",
+    "../chatbot-frontend/public/data/ministry_department_mapping_full.json"
+)
+
+TOP_N_MAX = 100
+LEVELS = ("ministry", "department", "demand", "scheme")
+
+_PREFIX_RE = re.compile(r"^(?:the\s+)?(?:ministry|department)\s+of\s+")
+
+
+def normalize_name(name: str) -> str:
+    """'MINISTRY OF Road Transport & Highways' -> 'road transport and highways'"""
+    key = (name or "").lower().replace("&", " and ")
+    key = re.sub(r"[^a-z0-9]+", " ", key).strip()
+    return _PREFIX_RE.sub("", key)
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _group_sum(values: np.ndarray, groups: np.ndarray, count: int) -> np.ndarray:
+    """Row sums per group; NaN where a group has no value in a column."""
+    sums = np.zeros((count, values.shape[1]))
+    seen = np.zeros((count, values.shape[1]), dtype=bool)
+    np.add.at(sums, groups, np.nan_to_num(values))
+    np.logical_or.at(seen, groups, ~np.isnan(values))
+    sums[~seen] = np.nan
+    return sums
+
+
+# ==============================
+# LEVEL (one table of rollups)
+# ==============================
+class _Level:
+    """
+    Rows of one aggregation level (ministries, departments, demands or
+    schemes) x the 12 year columns, with every column pre-sorted.
+    """
+
+    def __init__(self, rows: list, values: np.ndarray):
+        self.rows = rows            # dicts with the row's labels
+        self.values = values        # float (len(rows), n_columns), NaN = no figure
+        ranked = np.where(np.isnan(values), -np.inf, values)
+        # descending, ties in row order
+        self.order = np.argsort(-ranked, axis=0, kind="stable")
+        self.present = (~np.isnan(values)).sum(axis=0)
+
+
+# ==============================
+# BUDGET INDEX
+# ==============================
+class BudgetIndex:
+    """
+    Rollups of the budget bundle by ministry, department, demand and
+    scheme for every year column, built once per version of the data
+    files. Queries are slices of pre-sorted orders and dict lookups.
+
+    A demand's figures are its Grand Total row. Ministry and department
+    names come from the SBE summary (ministry_department_mapping_full.json),
+    falling back to the names found on the demand's own pages.
+    """
+
+    def __init__(self, bundle: dict, analysis: dict, mapping: dict):
+        started = time.perf_counter()
+        self.columns = list(bundle["columns"])
+        self.column_index = {c: j for j, c in enumerate(self.columns)}
+
+        strings = bundle["strings"]
+        d, s, it = bundle["demands"], bundle["sections"], bundle["items"]
+        item_values = np.array(it["values"], dtype=float).T.reshape(-1, len(self.columns))
+        item_type = np.array(it["type"])
+        grand_total = strings.index("grand_total") if "grand_total" in strings else -2
+
+        # First entry per demand number = the SBE summary line; later
+        # entries of the mapping are detail rows of the notes
+        summary = {}
+        for ministry in mapping.values():
+            for dept in ministry.get("departments", []):
+                summary.setdefault(dept["demand_no"], (ministry["ministry"], dept))
+
+        # ---------- demands ----------
+        demand_rows = []
+        demand_values = np.full((len(d["demand_no"]), len(self.columns)), np.nan)
+        item_demand = np.empty(len(it["name"]), dtype=np.int64)
+        for n, demand_no in enumerate(d["demand_no"]):
+            first = s["item_start"][d["section_start"][n]]
+            last = s["item_start"][d["section_start"][n + 1]]
+            item_demand[first:last] = n
+            totals = np.flatnonzero(item_type[first:last] == grand_total)
+            if totals.size:
+                demand_values[n] = item_values[first + totals[0]]
+
+            found_ministry = strings[d["ministry"][n]] if d["ministry"][n] >= 0 else None
+            found_department = strings[d["department"][n]] if d["department"][n] >= 0 else None
+            ministry, dept = summary.get(demand_no, (None, {}))
+            ministry = ministry or (found_ministry or "Unknown ministry").upper()
+            demand_rows.append({
+                "demand_no": demand_no,
+                "ministry": ministry,
+                "department": dept.get("department") or found_department or ministry.title(),
+                "page_range": dept.get("page_range"),
+            })
+        self.demands = _Level(demand_rows, demand_values)
+        self.demand_by_no = {row["demand_no"]: n for n, row in enumerate(demand_rows)}
+
+        # ---------- ministries / departments ----------
+        ministry_ids, department_ids = {}, {}
+        ministry_of = np.empty(len(demand_rows), dtype=np.int64)
+        department_of = np.empty(len(demand_rows), dtype=np.int64)
+        for n, row in enumerate(demand_rows):
+            ministry_of[n] = ministry_ids.setdefault(row["ministry"], len(ministry_ids))
+            department_of[n] = department_ids.setdefault((row["ministry"], row["department"]), len(department_ids))
+
+        shares = {normalize_name(m["ministry"]): m for m in analysis.get("ministries", [])}
+        ministry_rows = []
+        for name in ministry_ids:
+            info = shares.get(normalize_name(name), {})
+            ministry_rows.append({
+                "ministry": name,
+                "summary_total_2025_26": info.get("total_2025_26"),
+                "percentage_share": info.get("percentage_share"),
+                "demands": [row["demand_no"] for row in demand_rows if row["ministry"] == name],
+            })
+        self.ministries = _Level(ministry_rows, _group_sum(demand_values, ministry_of, len(ministry_ids)))
+
+        department_rows = [
+            {"ministry": m, "department": dep,
+             "demands": [row["demand_no"] for row in demand_rows if (row["ministry"], row["department"]) == (m, dep)]}
+            for m, dep in department_ids
+        ]
+        self.departments = _Level(department_rows, _group_sum(demand_values, department_of, len(department_ids)))
+        self.ministry_departments = {}
+        for k, (m, _) in enumerate(department_ids):
+            self.ministry_departments.setdefault(m, []).append(k)
+
+        # ---------- schemes (top-level coded lines) ----------
+        scheme_rows, scheme_idx = [], []
+        for i, code in enumerate(it["code"]):
+            if code < 0 or item_type[i] >= 0 or "." in strings[code]:
+                continue
+            demand = demand_rows[item_demand[i]]
+            scheme_rows.append({
+                "scheme": strings[it["name"][i]],
+                "code": strings[code],
+                "demand_no": demand["demand_no"],
+                "ministry": demand["ministry"],
+            })
+            scheme_idx.append(i)
+        self.schemes = _Level(scheme_rows, item_values[scheme_idx])
+
+        self.ministry_by_key = {normalize_name(row["ministry"]): k for k, row in enumerate(ministry_rows)}
+        self._compare_cache = {}
+        self._ministry_cache = {}
+        self.build_seconds = time.perf_counter() - started
+
+    # ---------------- INTERNAL ----------------
+    def _level(self, level: str) -> _Level:
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+        return {"ministry": self.ministries, "department": self.departments,
+                "demand": self.demands, "scheme": self.schemes}[level]
+
+    def _column(self, col: str) -> int:
+        if col not in self.column_index:
+            raise ValueError(f"unknown column {col!r}; expected one of {', '.join(self.columns)}")
+        return self.column_index[col]
+
+    def _totals(self, level: _Level, row: int) -> dict:
+        return {c: _number(v) for c, v in zip(self.columns, level.values[row])}
+
+    # ---------------- PUBLIC API ----------------
+    def find_ministry(self, name: str) -> int:
+        """
+        Row of the ministry called `name` (case, '&' and the 'Ministry of'
+        prefix don't matter; a unique partial name is enough).
+        """
+        key = normalize_name(name)
+        if key in self.ministry_by_key:
+            return self.ministry_by_key[key]
+        matches = [k for n, k in self.ministry_by_key.items() if key and key in n]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            names = ", ".join(self.ministries.rows[k]["ministry"] for k in matches)
+            raise LookupError(f"{name!r} matches several ministries: {names}")
+        raise LookupError(f"No ministry matches {name!r}")
+
+    def ministry(self, name: str) -> dict:
+        k = self.find_ministry(name)
+        result = self._ministry_cache.get(k)
+        if result is None:
+            row = self.ministries.rows[k]
+            result = self._ministry_cache[k] = {
+                **row,
+                "totals": self._totals(self.ministries, k),
+                "departments": [
+                    {**self.departments.rows[j], "totals": self._totals(self.departments, j)}
+                    for j in self.ministry_departments[row["ministry"]]
+                ],
+            }
+        return result
+
+    def demand(self, demand_no: int) -> dict:
+        if demand_no not in self.demand_by_no:
+            raise LookupError(f"No demand {demand_no}")
+        n = self.demand_by_no[demand_no]
+        return {**self.demands.rows[n], "totals": self._totals(self.demands, n)}
+
+    def top(self, col: str = "total_2025_26", n: int = 10, level: str = "demand") -> dict:
+        table, j = self._level(level), self._column(col)
+        rows = table.order[:min(n, table.present[j]), j]
+        return {
+            "level": level,
+            "column": col,
+            "results": [
+                {"rank": r + 1, **table.rows[i], "value": _number(table.values[i, j])}
+                for r, i in enumerate(rows)
+            ],
+        }
+
+    def compare(self, from_col: str, to_col: str, level: str = "ministry", n: int = 10) -> dict:
+        """
+        Change between two year columns per row of `level`, largest
+        increase first (rows missing either figure are left out).
+        """
+        table, a, b = self._level(level), self._column(from_col), self._column(to_col)
+        key = (level, a, b)
+        ranked = self._compare_cache.get(key)
+        if ranked is None:
+            delta = table.values[:, b] - table.values[:, a]
+            valid = np.flatnonzero(~np.isnan(delta))
+            ranked = valid[np.argsort(-delta[valid], kind="stable")]
+            self._compare_cache[key] = ranked
+
+        results = []
+        for i in ranked[:n]:
+            before, after = table.values[i, a], table.values[i, b]
+            results.append({
+                **table.rows[i],
+                "from": _number(before),
+                "to": _number(after),
+                "change": _number(after - before),
+                "change_pct": round(float((after - before) / before * 100), 2) if before else None,
+            })
+        return {"level": level, "from": from_col, "to": to_col, "results": results}
+
+    def stats(self) -> dict:
+        return {
+            "columns": self.columns,
+            "ministries": len(self.ministries.rows),
+            "departments": len(self.departments.rows),
+            "demands": len(self.demands.rows),
+            "schemes": len(self.schemes.rows),
+            "build_ms": round(self.build_seconds * 1000, 2),
+        }
+
+
+# ==============================
+# SHARED INSTANCE
+# ==============================
+_lock = threading.Lock()
+# (versions, index), replaced as a whole so a reader never pairs one
+# build's versions with another build's index
+_current = (None, None)
+
+
+def budget_index() -> BudgetIndex:
+    """
+    The BudgetIndex for the current contents of the three data files;
+    rebuilt when rule_store sees any of them change.
+    """
+    global _current
+    files = (BUDGET_BUNDLE_FILE, BUDGET_ANALYSIS_FILE, BUDGET_MAPPING_FILE)
+    snapshots = [rule_store.snapshot(f) for f in files]
+    versions = tuple(version for _, version in snapshots)
+    current = _current
+    if current[0] == versions:
+        return current[1]
+    with _lock:
+        if _current[0] != versions:
+            _current = (versions, BudgetIndex(*(data for data, _ in snapshots)))
+        return _current[1]
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:   # optional; without it clients get gzip
+    brotli = None
+
+from rule_store import rule_store
+
+# ==============================
+# CONFIG
+# ==============================
+# Written by chatbot-frontend/public/data/extract.py (or budget_bundle.py)
+BUDGET_BUNDLE_FILE = os.getenv(
+    "BUDGET_BUNDLE_FILE",
+    "../chatbot-frontend/public/data/output_json_improved_full/budget_bundle.json"
+)
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip", "identity")
+
+
+# ==============================
+# ENCODED BUNDLE
+# ==============================
+class EncodedBundle:
+    """
+    The bundle as compact JSON, compressed once per snapshot of the
+    file. Each encoding is its own representation, so each gets its
+    own strong ETag.
+    """
+
+    def __init__(self, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        self.bodies = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+        self.etags = {
+            enc: f'"{digest}"' if enc == "identity" else f'"{digest}-{enc}"'
+            for enc in self.bodies
+        }
+
+    def sizes(self):
+        return {enc: len(body) for enc, body in self.bodies.items()}
+
+
+def encoded_bundle():
+    return rule_store.derived(BUDGET_BUNDLE_FILE, "encoded", EncodedBundle)
+
+
+# ==============================
+# CONTENT NEGOTIATION
+# ==============================
+def choose_encoding(accept_encoding, available):
+    """
+    Best of `available` for an Accept-Encoding header. identity is
+    acceptable unless the header refuses it (identity;q=0 or *;q=0).
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+
+    wildcard = accepted.get("*")
+    for enc in ENCODINGS:
+        if enc not in available:
+            continue
+        q = accepted.get(enc, wildcard)
+        if enc == "identity" and q is None:
+            q = 1.0
+        if q:
+            return enc
+    return None
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    tags = (t.strip() for t in if_none_match.split(","))
+    return etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def bundle_response(accept_encoding, if_none_match):
+    """
+    (status, body, headers) for GET of the budget bundle.
+    Raises OSError if the bundle file has never been built.
+    """
+    bundle = encoded_bundle()
+    enc = choose_encoding(accept_encoding, bundle.bodies)
+    if enc is None:
+        return 406, b"", {"Vary": "Accept-Encoding"}
+
+    headers = {
+        "ETag": bundle.etags[enc],
+        "Vary": "Accept-Encoding",
+        # Cache, but revalidate: a 304 costs a few bytes
+        "Cache-Control": "no-cache",
+    }
+    if _etag_matches(if_none_match, bundle.etags[enc]):
+        return 304, b"", headers
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return 200, bundle.bodies[enc], headers
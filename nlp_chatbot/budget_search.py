@@ -0,0 +1,223 @@
+import bisect
+import difflib
+import heapq
+import math
+import re
+import time
+
+from rule_store import rule_store
+from budget_data import BUDGET_BUNDLE_FILE
+
+# ==============================
+# CONFIG
+# ==============================
+SEARCH_LIMIT_MAX = 50
+PREFIX_MIN = 3          # shorter query words only match whole tokens
+PREFIX_TERMS_MAX = 64   # expansions per query word
+FUZZY_CUTOFF = 0.8
+
+# Matches are worth less the further they are from the typed word
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+
+# Words that say nothing about which line item is meant
+STOPWORDS = {"a", "an", "the", "of", "for", "to", "in", "on", "and", "under"}
+
+# Codes stay whole ("9.02"), everything else splits on punctuation
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+# The extractor glues explanatory notes onto names after ':..' or, where
+# the PDF's rupee sign came out as '`', after '..`'
+_NOTE_RE = re.compile(r":\.\.|\.\.`")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall((text or "").lower().replace("&", " and "))
+
+
+def search_words(query: str) -> list:
+    """The words of `query` that take part in a search."""
+    return [w for w in tokenize(query) if w not in STOPWORDS]
+
+
+def item_title(name: str) -> str:
+    """Drops the explanatory note the extractor appends to a name."""
+    return _NOTE_RE.split(name or "", 1)[0].strip()
+
+
+# ==============================
+# INVERTED INDEX
+# ==============================
+class BudgetSearch:
+    """
+    Token -> line-item postings over every item of the budget bundle
+    (title words and code), built once per version of the bundle.
+
+    A query word matches its own token, tokens it is a prefix of, or
+    (failing both) the closest spellings in the vocabulary. Items are
+    ranked by the idf of the query words they contain, scaled by how
+    closely each word matched (exact > prefix > fuzzy).
+    """
+
+    def __init__(self, bundle: dict):
+        started = time.perf_counter()
+        self.columns = list(bundle["columns"])
+        strings = bundle["strings"]
+        d, s, it = bundle["demands"], bundle["sections"], bundle["items"]
+
+        def text(sid):
+            return strings[sid] if sid >= 0 else None
+
+        # item -> (demand row, section heading)
+        self.item_demand, self.item_section = [], []
+        for n in range(len(d["demand_no"])):
+            for k in range(d["section_start"][n], d["section_start"][n + 1]):
+                count = s["item_start"][k + 1] - s["item_start"][k]
+                self.item_demand.extend([n] * count)
+                self.item_section.extend([s["heading"][k]] * count)
+
+        self.demands = [
+            {"demand_no": no, "ministry": text(d["ministry"][n]), "department": text(d["department"][n])}
+            for n, no in enumerate(d["demand_no"])
+        ]
+        self.strings = strings
+        self.codes = it["code"]
+        self.types = it["type"]
+        self.titles = [item_title(strings[sid]) for sid in it["name"]]
+        self.values = it["values"]      # column-major, like the bundle
+
+        postings = {}
+        self.lengths = []
+        for i, title in enumerate(self.titles):
+            tokens = set(tokenize(title))
+            if self.codes[i] >= 0:
+                tokens.add(strings[self.codes[i]].lower())
+            # "Total- X" ties with "X" and is preferred (it sums X's lines)
+            self.lengths.append(len(tokens - {"total"}))
+            for token in tokens:
+                postings.setdefault(token, []).append(i)
+
+        self.postings = {t: tuple(items) for t, items in postings.items()}
+        self.vocabulary = sorted(self.postings)
+        # fuzzy candidates share the first letter
+        self._by_initial = {}
+        for t in self.vocabulary:
+            self._by_initial.setdefault(t[0], []).append(t)
+        self.build_seconds = time.perf_counter() - started
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls(bundle)
+
+    # ---------------- INTERNAL ----------------
+    def _expand(self, word: str) -> dict:
+        """Vocabulary terms a query word stands for, with their weights."""
+        terms = {}
+        if word in self.postings:
+            terms[word] = EXACT
+        if len(word) >= PREFIX_MIN:
+            start = bisect.bisect_left(self.vocabulary, word)
+            for t in self.vocabulary[start:start + PREFIX_TERMS_MAX + 1]:
+                if not t.startswith(word):
+                    break
+                terms.setdefault(t, PREFIX)
+        if not terms and len(word) >= PREFIX_MIN:
+            close = difflib.get_close_matches(
+                word, self._by_initial.get(word[0], []), n=3, cutoff=FUZZY_CUTOFF
+            )
+            for t in close:
+                terms[t] = FUZZY
+        return terms
+
+    def _has_figures(self, i: int, columns=None) -> bool:
+        """Any amount in `columns` (column indexes; default all)."""
+        if columns is None:
+            return any(col[i] is not None for col in self.values)
+        return any(self.values[j][i] is not None for j in columns)
+
+    def _result(self, i: int, score: float, matched: int) -> dict:
+        code = self.codes[i]
+        return {
+            "item": i,
+            "name": self.titles[i],
+            "code": self.strings[code] if code >= 0 else None,
+            "type": self.strings[self.types[i]] if self.types[i] >= 0 else None,
+            **self.demands[self.item_demand[i]],
+            "section": self.strings[self.item_section[i]],
+            "score": round(score, 3),
+            "matched": matched,
+            "values": {c: self.values[j][i] for j, c in enumerate(self.columns)},
+        }
+
+    # ---------------- PUBLIC API ----------------
+    def search(self, query: str, n: int = 10, with_figures=False) -> dict:
+        """
+        Best `n` line items for `query`. Each result says how many of the
+        query's `words` it matched. with_figures leaves out items that
+        carry no amount in any column (explanatory notes); a list of
+        column names instead requires an amount in one of those.
+        """
+        words = search_words(query)
+        if not words:
+            raise ValueError("query has no searchable words")
+
+        scores, matched = {}, {}
+        total = len(self.titles) or 1
+        for word in words:
+            best = {}
+            for term, weight in self._expand(word).items():
+                for i in self.postings[term]:
+                    if weight > best.get(i, 0):
+                        best[i] = weight
+            if not best:
+                continue
+            # The word's own idf (over every item it reaches), so a rare
+            # expansion can't outweigh an exact match of the same word
+            idf = math.log(1 + total / len(best))
+            best = {i: weight * idf for i, weight in best.items()}
+            for i, w in best.items():
+                scores[i] = scores.get(i, 0) + w
+                matched[i] = matched.get(i, 0) + 1
+
+        candidates = list(scores.items())
+        if with_figures:
+            required = None
+            if with_figures is not True:
+                unknown = [c for c in with_figures if c not in self.columns]
+                if unknown:
+                    raise ValueError(f"unknown columns: {', '.join(unknown)}")
+                required = [self.columns.index(c) for c in with_figures]
+            candidates = [(i, sc) for i, sc in candidates if self._has_figures(i, required)]
+        # ties: items with amounts, shorter titles, total rows, top-level
+        # codes, file order
+        ranked = heapq.nsmallest(
+            n,
+            candidates,
+            key=lambda e: (
+                -e[1],
+                not self._has_figures(e[0]),
+                self.lengths[e[0]],
+                self.types[e[0]] < 0,
+                self.codes[e[0]] < 0 or "." in self.strings[self.codes[e[0]]],
+                e[0],
+            )
+        )
+        return {
+            "query": query,
+            "words": len(words),
+            "total": len(candidates),
+            "results": [self._result(i, sc, matched[i]) for i, sc in ranked],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self.titles),
+            "terms": len(self.vocabulary),
+            "postings": sum(len(p) for p in self.postings.values()),
+            "build_ms": round(self.build_seconds * 1000, 2),
+        }
+
+
+def budget_search() -> BudgetSearch:
+    # Rebuilt only when the bundle file changes
+    return rule_store.derived(BUDGET_BUNDLE_FILE, "search", BudgetSearch.from_bundle)
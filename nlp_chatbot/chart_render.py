@@ -0,0 +1,166 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# ==============================
+# CONFIG
+# ==============================
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "64"))
+CHART_EXECUTOR = os.getenv("CHART_EXECUTOR", "thread")   # "thread" or "process"
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+
+CHART_FORMATS = ("png", "svg", "json")
+
+matplotlib.rcParams["font.family"] = "DejaVu Sans"
+
+
+# ==============================
+# RENDERING (no pyplot state)
+# ==============================
+def _render_pie(labels, values, title, fmt):
+    """
+    Renders one pie chart through the object-oriented Figure API.
+    Module-level so it can run in a worker process.
+    """
+    if fmt == "json":
+        total = sum(values) or 1
+        spec = {
+            "type": "pie",
+            "title": title,
+            "labels": list(labels),
+            "values": list(values),
+            "percent": [round(v / total * 100, 1) for v in values],
+        }
+        return json.dumps(spec, ensure_ascii=False).encode("utf-8")
+
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=140)
+    ax.set_title(title)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def chart_key(labels, values, title, fmt):
+    """
+    Content address of a pie chart. Only the relative sizes matter,
+    so every slip with the same allocation maps to the same key.
+    """
+    total = sum(values) or 1
+    shape = [round(v / total, 6) for v in values]
+    payload = json.dumps([list(labels), shape, title, fmt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ==============================
+# CACHED RENDERER
+# ==============================
+class ChartRenderer:
+    """
+    LRU cache of rendered charts in front of a dedicated worker pool.
+    Concurrent requests for the same chart share one render.
+    """
+
+    def __init__(self, max_entries=CHART_CACHE_SIZE, executor=CHART_EXECUTOR, workers=CHART_WORKERS):
+        self.max_entries = max_entries
+        self._executor_kind = executor
+        self._workers = workers
+        self._executor = None
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "errors": 0}
+
+    def _pool(self):
+        if self._executor is None:
+            if self._executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="chart"
+                )
+        return self._executor
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is not None:
+                self._stats["errors"] += 1
+                return
+            self._stats["renders"] += 1
+            self._cache[key] = future.result()
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def submit(self, labels, values, title="", fmt="png"):
+        """
+        Returns (key, future) for the chart bytes. The future is
+        already resolved on a cache hit.
+        """
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unsupported chart format: {fmt}")
+
+        labels, values = list(labels), [float(v) for v in values]
+        key = chart_key(labels, values, title, fmt)
+
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return key, _done(data)
+
+            future = self._pending.get(key)
+            if future is not None:
+                self._stats["hits"] += 1
+                return key, future
+
+            self._stats["misses"] += 1
+            future = self._pool().submit(_render_pie, labels, values, title, fmt)
+            self._pending[key] = future
+
+        # outside the lock: the callback runs inline if the render is done
+        future.add_done_callback(lambda f, k=key: self._store(k, f))
+        return key, future
+
+    def render(self, labels, values, title="", fmt="png"):
+        """
+        Blocking helper: chart bytes, from cache or freshly rendered.
+        """
+        _, future = self.submit(labels, values, title, fmt)
+        return future.result()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._cache), "max_entries": self.max_entries}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _done(value):
+    f = Future()
+    f.set_result(value)
+    return f
+
+
+# Shared renderer used by nlp_query
+chart_renderer = ChartRenderer()
@@ -0,0 +1,619 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from bson import Binary, ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# ==============================
+# CONFIG
+# ==============================
+# > 0 turns on the write-behind buffer: appends arriving within this
+# many milliseconds are written together
+CHAT_WRITE_BEHIND_MS = float(os.getenv("CHAT_WRITE_BEHIND_MS", "0"))
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "500"))
+
+# ==============================
+# LAYOUT
+# ==============================
+#   chats:       {_id, email, title, created_at, message_count}
+#   messages:    {chat_id, seq, role, text, chart_id | chart, timestamp}
+#                unique on (chat_id, seq); seq numbers come from
+#                $inc on chats.message_count, so appends never rewrite
+#                the chat document
+#   chart_blobs: {_id: sha256 of the image bytes, media_type, data, size}
+#
+# Chats written before this layout keep their messages in an embedded
+# "messages" array; they are moved over on first access or in bulk by
+# migrate_chats.py.
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_INDEX = [("chat_id", 1), ("seq", 1)]
+
+DUPLICATE_KEY = 11000
+
+logger = logging.getLogger(__name__)
+
+_data_uri = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+);base64,(?P<data>.*)$", re.S)
+
+
+def parse_object_id(value):
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError(f"invalid id: {value}")
+
+
+# ==============================
+# CHART BLOBS
+# ==============================
+def chart_blob(chart):
+    """
+    (blob document, None) for an inline chart (data URI or bare base64
+    PNG), (None, chart) for anything else, e.g. a chart URL.
+    """
+    if not chart:
+        return None, None
+
+    m = _data_uri.match(chart)
+    if m:
+        media_type, encoded = m["type"], m["data"]
+    elif chart.startswith(("http://", "https://", "/")):
+        return None, chart
+    else:
+        media_type, encoded = "image/png", chart
+
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None, chart
+
+    return {
+        "_id": hashlib.sha256(data).hexdigest(),
+        "media_type": media_type,
+        "data": Binary(data),
+        "size": len(data)
+    }, None
+
+
+def chart_uri(blob):
+    encoded = base64.b64encode(blob["data"]).decode("ascii")
+    return f"data:{blob['media_type']};base64,{encoded}"
+
+
+# ==============================
+# CHAT STORES
+# ==============================
+class _BaseChatStore:
+    """
+    Document building and rendering shared by the sync
+    and async stores.
+    """
+
+    def __init__(self, db):
+        self.chats = db["chats"]
+        self.messages = db["messages"]
+        self.blobs = db["chart_blobs"]
+
+    @staticmethod
+    def _new_chat(email, title):
+        return {
+            "email": email,
+            "title": title,
+            "message_count": 0,
+            "created_at": datetime.utcnow()
+        }
+
+    @staticmethod
+    def _documents(chat_id, first_seq, messages):
+        """
+        Message documents numbered from first_seq, plus the
+        distinct chart blobs they reference.
+        """
+        docs, blobs = [], {}
+        now = datetime.utcnow()
+        for offset, message in enumerate(messages):
+            blob, chart = chart_blob(message.get("chart"))
+            doc = {
+                "chat_id": chat_id,
+                "seq": first_seq + offset,
+                "role": message["role"],
+                "text": message["text"],
+                "timestamp": message.get("timestamp") or now
+            }
+            if blob is not None:
+                blobs[blob["_id"]] = blob
+                doc["chart_id"] = blob["_id"]
+            elif chart is not None:
+                doc["chart"] = chart
+            docs.append(doc)
+        return docs, list(blobs.values())
+
+    @staticmethod
+    def _group(appends):
+        """
+        chat ObjectId -> indexes of its appends, in arrival order.
+        """
+        by_chat = {}
+        for i, (chat_id, _) in enumerate(appends):
+            by_chat.setdefault(parse_object_id(chat_id), []).append(i)
+        return by_chat
+
+    @staticmethod
+    def _distinct(blobs):
+        return list({blob["_id"]: blob for blob in blobs}.values())
+
+    @staticmethod
+    def _blob_writes(blobs):
+        return [
+            UpdateOne(
+                {"_id": blob["_id"]},
+                {"$setOnInsert": {k: v for k, v in blob.items() if k != "_id"}},
+                upsert=True
+            )
+            for blob in blobs
+        ]
+
+    @staticmethod
+    def _blob_ids(docs):
+        return list({doc["chart_id"] for doc in docs if doc.get("chart_id")})
+
+    @staticmethod
+    def _render(docs, blobs):
+        rendered = []
+        for doc in docs:
+            blob = blobs.get(doc.get("chart_id"))
+            rendered.append({
+                "seq": doc["seq"],
+                "role": doc["role"],
+                "text": doc["text"],
+                "chart": chart_uri(blob) if blob else doc.get("chart"),
+                "timestamp": doc.get("timestamp")
+            })
+        return rendered
+
+    @staticmethod
+    def _page(docs, limit):
+        """
+        docs: up to limit + 1 messages, newest first.
+        """
+        more = len(docs) > limit
+        docs = docs[:limit][::-1]
+        return docs, (docs[0]["seq"] if more and docs else None)
+
+    @staticmethod
+    def _check_insert(error):
+        # A re-run migration finds some messages already copied
+        if any(e["code"] != DUPLICATE_KEY for e in error.details.get("writeErrors", [])):
+            raise error
+
+
+class ChatStore(_BaseChatStore):
+    """
+    Chat persistence on a pymongo Database.
+    """
+
+    def create_indexes(self):
+        self.messages.create_index(MESSAGE_INDEX, unique=True)
+
+    def create_chat(self, email, title):
+        return str(self.chats.insert_one(self._new_chat(email, title)).inserted_id)
+
+    def delete_chat(self, chat_id):
+        oid = parse_object_id(chat_id)
+        self.chats.delete_one({"_id": oid})
+        self.messages.delete_many({"chat_id": oid})
+
+    def _save_blobs(self, blobs):
+        if blobs:
+            self.blobs.bulk_write(self._blob_writes(blobs), ordered=False)
+
+    def _load_blobs(self, docs):
+        ids = self._blob_ids(docs)
+        if not ids:
+            return {}
+        return {blob["_id"]: blob for blob in self.blobs.find({"_id": {"$in": ids}})}
+
+    def migrate_chat(self, chat_id):
+        """
+        Moves an embedded messages array into the messages collection.
+        Safe to re-run. Returns False if the chat does not exist.
+        """
+        chat = self.chats.find_one({"_id": chat_id}, {"messages": 1})
+        if chat is None:
+            return False
+        if "messages" not in chat:
+            return True
+
+        legacy = chat["messages"] or []
+        docs, blobs = self._documents(chat_id, 0, legacy)
+        self._save_blobs(blobs)
+        if docs:
+            try:
+                self.messages.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                self._check_insert(e)
+
+        self.chats.update_one(
+            {"_id": chat_id, "messages": {"$exists": True}},
+            {"$set": {"message_count": len(legacy)}, "$unset": {"messages": ""}}
+        )
+        return True
+
+    def _reserve(self, oid, n):
+        """
+        First of n new seq numbers for the chat, or None if it does not exist.
+        """
+        while True:
+            chat = self.chats.find_one_and_update(
+                {"_id": oid, "messages": {"$exists": False}},
+                {"$inc": {"message_count": n}},
+                projection={"message_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if chat is not None:
+                return chat["message_count"] - n
+            if not self.migrate_chat(oid):
+                return None
+
+    def append_batch(self, appends):
+        """
+        appends: [(chat_id, messages)], possibly for many chats. Each
+        chat gets one seq reservation and all messages go out in one
+        insert. Returns the seq numbers of each append, or None where
+        the chat does not exist.
+        """
+        results = [None] * len(appends)
+        docs, blobs = [], []
+        for oid, indexes in self._group(appends).items():
+            seq = self._reserve(oid, sum(len(appends[i][1]) for i in indexes))
+            if seq is None:
+                continue
+            for i in indexes:
+                chat_docs, chat_blobs = self._documents(oid, seq, appends[i][1])
+                seq += len(chat_docs)
+                docs += chat_docs
+                blobs += chat_blobs
+                results[i] = [doc["seq"] for doc in chat_docs]
+
+        self._save_blobs(self._distinct(blobs))
+        if docs:
+            self.messages.insert_many(docs, ordered=False)
+        return results
+
+    def append(self, chat_id, messages):
+        """
+        Stores messages (dicts with role, text and optional chart) at
+        the end of the chat. Returns their seq numbers, or None if the
+        chat does not exist.
+        """
+        return self.append_batch([(chat_id, messages)])[0]
+
+    def page(self, chat_id, before=None, limit=MESSAGE_PAGE_SIZE):
+        """
+        The newest `limit` messages with seq < before, oldest first.
+        None if the chat does not exist.
+        """
+        oid = parse_object_id(chat_id)
+        if not self.migrate_chat(oid):
+            return None
+
+        query = {"chat_id": oid}
+        if before is not None:
+            query["seq"] = {"$lt": before}
+        docs = list(self.messages.find(query).sort("seq", -1).limit(limit + 1))
+        docs, next_before = self._page(docs, limit)
+        return {
+            "messages": self._render(docs, self._load_blobs(docs)),
+            "next_before": next_before
+        }
+
+    def chats_with_messages(self, email):
+        """
+        Every chat of the user with all of its messages, newest
+        chat first (the GET /api/chats/{email} response).
+        """
+        user_chats = list(self.chats.find({"email": email}, {"title": 1, "messages": 1}).sort("created_at", -1))
+        for chat in user_chats:
+            if "messages" in chat:
+                self.migrate_chat(chat["_id"])
+
+        by_chat = {chat["_id"]: [] for chat in user_chats}
+        docs = list(self.messages.find({"chat_id": {"$in": list(by_chat)}}).sort(MESSAGE_INDEX))
+        blobs = self._load_blobs(docs)
+        for doc, message in zip(docs, self._render(docs, blobs)):
+            by_chat[doc["chat_id"]].append(message)
+
+        return [
+            {"id": str(chat["_id"]), "title": chat["title"], "messages": by_chat[chat["_id"]]}
+            for chat in user_chats
+        ]
+
+
+class AsyncChatStore(_BaseChatStore):
+    """
+    ChatStore on a PyMongo async (AsyncDatabase) handle.
+    """
+
+    async def create_indexes(self):
+        await self.messages.create_index(MESSAGE_INDEX, unique=True)
+
+    async def create_chat(self, email, title):
+        result = await self.chats.insert_one(self._new_chat(email, title))
+        return str(result.inserted_id)
+
+    async def delete_chat(self, chat_id):
+        oid = parse_object_id(chat_id)
+        await self.chats.delete_one({"_id": oid})
+        await self.messages.delete_many({"chat_id": oid})
+
+    async def _save_blobs(self, blobs):
+        if blobs:
+            await self.blobs.bulk_write(self._blob_writes(blobs), ordered=False)
+
+    async def _load_blobs(self, docs):
+        ids = self._blob_ids(docs)
+        if not ids:
+            return {}
+        return {blob["_id"]: blob async for blob in self.blobs.find({"_id": {"$in": ids}})}
+
+    async def migrate_chat(self, chat_id):
+        chat = await self.chats.find_one({"_id": chat_id}, {"messages": 1})
+        if chat is None:
+            return False
+        if "messages" not in chat:
+            return True
+
+        legacy = chat["messages"] or []
+        docs, blobs = self._documents(chat_id, 0, legacy)
+        await self._save_blobs(blobs)
+        if docs:
+            try:
+                await self.messages.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                self._check_insert(e)
+
+        await self.chats.update_one(
+            {"_id": chat_id, "messages": {"$exists": True}},
+            {"$set": {"message_count": len(legacy)}, "$unset": {"messages": ""}}
+        )
+        return True
+
+    async def _reserve(self, oid, n):
+        while True:
+            chat = await self.chats.find_one_and_update(
+                {"_id": oid, "messages": {"$exists": False}},
+                {"$inc": {"message_count": n}},
+                projection={"message_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if chat is not None:
+                return chat["message_count"] - n
+            if not await self.migrate_chat(oid):
+                return None
+
+    async def append_batch(self, appends):
+        results = [None] * len(appends)
+        docs, blobs = [], []
+        for oid, indexes in self._group(appends).items():
+            seq = await self._reserve(oid, sum(len(appends[i][1]) for i in indexes))
+            if seq is None:
+                continue
+            for i in indexes:
+                chat_docs, chat_blobs = self._documents(oid, seq, appends[i][1])
+                seq += len(chat_docs)
+                docs += chat_docs
+                blobs += chat_blobs
+                results[i] = [doc["seq"] for doc in chat_docs]
+
+        await self._save_blobs(self._distinct(blobs))
+        if docs:
+            await self.messages.insert_many(docs, ordered=False)
+        return results
+
+    async def append(self, chat_id, messages):
+        return (await self.append_batch([(chat_id, messages)]))[0]
+
+    async def page(self, chat_id, before=None, limit=MESSAGE_PAGE_SIZE):
+        oid = parse_object_id(chat_id)
+        if not await self.migrate_chat(oid):
+            return None
+
+        query = {"chat_id": oid}
+        if before is not None:
+            query["seq"] = {"$lt": before}
+        docs = await self.messages.find(query).sort("seq", -1).limit(limit + 1).to_list()
+        docs, next_before = self._page(docs, limit)
+        return {
+            "messages": self._render(docs, await self._load_blobs(docs)),
+            "next_before": next_before
+        }
+
+    async def chats_with_messages(self, email):
+        user_chats = await self.chats.find({"email": email}, {"title": 1, "messages": 1}).sort("created_at", -1).to_list()
+        for chat in user_chats:
+            if "messages" in chat:
+                await self.migrate_chat(chat["_id"])
+
+        by_chat = {chat["_id"]: [] for chat in user_chats}
+        docs = await self.messages.find({"chat_id": {"$in": list(by_chat)}}).sort(MESSAGE_INDEX).to_list()
+        blobs = await self._load_blobs(docs)
+        for doc, message in zip(docs, self._render(docs, blobs)):
+            by_chat[doc["chat_id"]].append(message)
+
+        return [
+            {"id": str(chat["_id"]), "title": chat["title"], "messages": by_chat[chat["_id"]]}
+            for chat in user_chats
+        ]
+
+
+# ==============================
+# WRITE-BEHIND BUFFERS
+# ==============================
+class _BaseWriteBuffer:
+    """
+    Counters shared by the thread and asyncio buffers.
+    """
+
+    def __init__(self, store, window_ms, max_batch):
+        self.store = store
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []   # (chat_id, messages)
+        self._closed = False
+        self._stats = {"appends": 0, "messages": 0, "batches": 0, "missing_chats": 0,
+                       "failed_batches": 0, "failed_appends": 0}
+
+    def _take(self):
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        return batch
+
+    def _record(self, batch, results):
+        self._stats["batches"] += 1
+        self._stats["appends"] += len(batch)
+        self._stats["messages"] += sum(len(messages) for _, messages in batch)
+        self._stats["missing_chats"] += sum(1 for r in results if r is None)
+
+    def _failed(self, batch, error):
+        # The writer keeps going; the batch's messages are lost
+        self._stats["failed_batches"] += 1
+        self._stats["failed_appends"] += len(batch)
+        logger.error("Chat write of %d appends failed", len(batch), exc_info=error)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        stats["avg_batch"] = round(stats["appends"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+
+class ChatWriteBuffer(_BaseWriteBuffer):
+    """
+    Write-behind queue in front of ChatStore.append_batch.
+
+    append() returns at once; a writer thread collects the appends
+    of all requests for `window_ms` and stores them together.
+    close() writes everything still queued before returning.
+    """
+
+    def __init__(self, store, window_ms=CHAT_WRITE_BEHIND_MS, max_batch=CHAT_WRITE_BATCH):
+        super().__init__(store, window_ms, max_batch)
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, chat_id, messages):
+        """
+        Raises ValueError for a malformed chat id. Unknown chats
+        are only counted (missing_chats) when the batch is written.
+        """
+        parse_object_id(chat_id)
+        with self._cond:
+            if not self._closed:
+                self._pending.append((chat_id, messages))
+                self._cond.notify()
+                return
+        # shutting down: write through
+        self.store.append(chat_id, messages)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._take()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return   # closed and drained
+            try:
+                results = self.store.append_batch(batch)
+            except Exception as e:
+                with self._cond:
+                    self._failed(batch, e)
+                continue
+            with self._cond:
+                self._record(batch, results)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self):
+        with self._cond:
+            return super().stats()
+
+
+class AsyncChatWriteBuffer(_BaseWriteBuffer):
+    """
+    asyncio counterpart of ChatWriteBuffer for AsyncChatStore; the
+    writer task starts with the first append.
+    """
+
+    def __init__(self, store, window_ms=CHAT_WRITE_BEHIND_MS, max_batch=CHAT_WRITE_BATCH):
+        super().__init__(store, window_ms, max_batch)
+        self._wakeup = None
+        self._task = None
+
+    async def append(self, chat_id, messages):
+        parse_object_id(chat_id)
+        if self._closed:
+            await self.store.append(chat_id, messages)
+            return
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._pending.append((chat_id, messages))
+        self._wakeup.set()
+
+    async def _next_batch(self):
+        while not self._pending and not self._closed:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        deadline = time.monotonic() + self.window
+        while len(self._pending) < self.max_batch and not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return self._take()
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                return
+            try:
+                results = await self.store.append_batch(batch)
+            except Exception as e:
+                self._failed(batch, e)
+                continue
+            self._record(batch, results)
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
@@ -0,0 +1,54 @@
+"""
+Moves chats that still embed a "messages" array into the messages
+and chart_blobs collections (see chat_store.py).
+
+The servers migrate a legacy chat on first access as well; this tool
+does the whole database up front. It is safe to stop and re-run.
+
+Run from nlp_chatbot/:
+    python migrate_chats.py
+    python migrate_chats.py --mongo mongodb://host:27017 --dry-run
+"""
+import argparse
+import time
+
+from pymongo import MongoClient
+
+from chat_store import ChatStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="user_db")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be moved")
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo)[args.db]
+    store = ChatStore(db)
+    store.create_indexes()
+
+    legacy = {"messages": {"$exists": True}}
+    total = db["chats"].count_documents(legacy)
+    blobs_before = db["chart_blobs"].estimated_document_count()
+    print(f"{total} chats to migrate")
+    if args.dry_run or not total:
+        return
+
+    start = time.perf_counter()
+    done = messages = 0
+    # Only ids and sizes here; migrate_chat reads one array at a time
+    for chat in db["chats"].find(legacy, {"_id": 1, "count": {"$size": {"$ifNull": ["$messages", []]}}}):
+        store.migrate_chat(chat["_id"])
+        done += 1
+        messages += chat["count"]
+        if done % 100 == 0:
+            print(f"  {done}/{total} chats, {messages} messages")
+
+    elapsed = time.perf_counter() - start
+    new_blobs = db["chart_blobs"].estimated_document_count() - blobs_before
+    print(f"migrated {done} chats / {messages} messages in {elapsed:.1f}s, {new_blobs} new chart blobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 import io
-import json
 import re
 import os
-import requests
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, ROUND_HALF_UP
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from rule_store import rule_store
+from tax_matcher import TaxMatcher
+from batch_tax import BatchTaxEngine
+from allocation_index import AllocationVectors
+from chart_render import chart_renderer
+from utti_client import UTTIClient, AsyncUTTIClient
+from ai_cache import AnswerCache, JsonlStore
+from budget_search import budget_search, search_words
 
 # ==============================
 # CONFIG
@@ -15,17 +20,48 @@ from openai import OpenAI
 ALLOCATION_FILE = "data_allocation_2025.json"
 TAX_RATE_FILE = "tax_rate.json"
 
-UTTI_SERVICE_BASE = "http://127.0.0.1:8001/slip"
+UTTI_SERVICE_BASE = os.getenv("UTTI_SERVICE_BASE", "http://127.0.0.1:8001/slip")
 
-matplotlib.rcParams["font.family"] = "DejaVu Sans"
+# Pooled keep-alive clients with retries; both share one slip cache
+utti_client = UTTIClient(UTTI_SERVICE_BASE)
+async_utti_client = AsyncUTTIClient(UTTI_SERVICE_BASE, cache=utti_client.cache)
+
+# "png" (default), "svg" or "json" (chart spec for client-side rendering)
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+CHART_TITLE = "GST Allocation Across Ministries"
+
+# Budget line-item answers: year columns shown, other matches listed
+BUDGET_ANSWER_COLUMNS = (
+    ("total_2024_25", "2024-25"),
+    ("total_2025_26", "2025-26"),
+    ("total_2026_27", "2026-27"),
+)
+BUDGET_OTHER_MATCHES = 3
+
+# CPU-bound work of the async entry points (rule matching, budget
+# lookups, rule file reloads) and of server_async (bcrypt, chart
+# encoding) runs here, off the event loop
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 4)))
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+async def run_cpu(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, fn, *args)
 
 # ==============================
 # AI CLIENT (EXPLANATION ONLY)
 # ==============================
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+AI_MODEL = "mistralai/mistral-7b-instruct"
 
 ai_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
+    base_url=OPENROUTER_BASE_URL,
+    api_key=OPENROUTER_API_KEY
+)
+
+async_ai_client = AsyncOpenAI(
+    base_url=OPENROUTER_BASE_URL,
     api_key=OPENROUTER_API_KEY
 )
 
@@ -37,20 +73,110 @@ DO NOT invent tax rates.
 If the question is unclear, ask for clarification.
 """
 
-def ai_explain(user_text: str) -> str:
-    if not OPENROUTER_API_KEY:
-        return "⚠️ AI explanation unavailable (API key not configured)."
+AI_UNAVAILABLE = "⚠️ AI explanation unavailable (API key not configured)."
+
+# Answers to repeated questions ("what is GST") are served from here.
+# AI_CACHE_FILE persists them across restarts; server.py can switch
+# the store to Mongo.
+AI_CACHE_FILE = os.getenv("AI_CACHE_FILE")
+ai_answer_cache = AnswerCache(store=JsonlStore(AI_CACHE_FILE) if AI_CACHE_FILE else None)
+
+def _ai_messages(user_text):
+    return [
+        {"role": "system", "content": AI_SYSTEM_PROMPT},
+        {"role": "user", "content": user_text}
+    ]
 
+def _ai_complete(user_text: str) -> str:
     response = ai_client.chat.completions.create(
-        model="mistralai/mistral-7b-instruct",
-        messages=[
-            {"role": "system", "content": AI_SYSTEM_PROMPT},
-            {"role": "user", "content": user_text}
-        ],
+        model=AI_MODEL,
+        messages=_ai_messages(user_text),
+        temperature=0.3
+    )
+    return response.choices[0].message.content.strip()
+
+async def _ai_complete_async(user_text: str) -> str:
+    response = await async_ai_client.chat.completions.create(
+        model=AI_MODEL,
+        messages=_ai_messages(user_text),
         temperature=0.3
     )
     return response.choices[0].message.content.strip()
 
+def ai_explain(user_text: str) -> str:
+    if not OPENROUTER_API_KEY:
+        return AI_UNAVAILABLE
+    return ai_answer_cache.get_or_compute(user_text, _ai_complete)
+
+async def ai_explain_async(user_text: str) -> str:
+    if not OPENROUTER_API_KEY:
+        return AI_UNAVAILABLE
+    return await ai_answer_cache.aget_or_compute(user_text, _ai_complete_async)
+
+def ai_explain_stream(user_text: str):
+    """
+    Yields the answer in pieces as the model produces them.
+    Cached answers, and answers another request was already
+    producing, come back as a single piece; streamed answers
+    are cached once complete.
+    """
+    if not OPENROUTER_API_KEY:
+        yield AI_UNAVAILABLE
+        return
+
+    answer, owner = ai_answer_cache.claim(user_text)
+    if not owner:
+        if answer:
+            yield answer
+        return
+
+    parts = []
+    try:
+        stream = ai_client.chat.completions.create(
+            model=AI_MODEL,
+            messages=_ai_messages(user_text),
+            temperature=0.3,
+            stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except BaseException as e:
+        ai_answer_cache.resolve(user_text, error=e)
+        raise
+    ai_answer_cache.resolve(user_text, "".join(parts).strip())
+
+async def ai_explain_stream_async(user_text: str):
+    if not OPENROUTER_API_KEY:
+        yield AI_UNAVAILABLE
+        return
+
+    answer, owner = await ai_answer_cache.aclaim(user_text)
+    if not owner:
+        if answer:
+            yield answer
+        return
+
+    parts = []
+    try:
+        stream = await async_ai_client.chat.completions.create(
+            model=AI_MODEL,
+            messages=_ai_messages(user_text),
+            temperature=0.3,
+            stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except BaseException as e:
+        ai_answer_cache.afail(user_text, e)
+        raise
+    await ai_answer_cache.aresolve(user_text, "".join(parts).strip())
+
 # ==============================
 # UTILITIES
 # ==============================
@@ -59,23 +185,23 @@ def money(v):
     return f"₹{d:,.2f}"
 
 def load_allocation():
-    with open(ALLOCATION_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    # Shared, read-only snapshot; reloaded only when the file changes
+    return rule_store.get(ALLOCATION_FILE)
 
 def load_tax_rates():
-    with open(TAX_RATE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return rule_store.get(TAX_RATE_FILE)
+
+def get_tax_matcher():
+    # Compiled once per tax_rate.json version
+    return rule_store.derived(TAX_RATE_FILE, "matcher", TaxMatcher.from_tax_data)
+
+def get_batch_engine():
+    return rule_store.derived(TAX_RATE_FILE, "batch_engine", BatchTaxEngine.from_tax_data)
 
 def extract_amount(text):
     m = re.search(r"(\d{1,3}(?:,\d{3})+|\d+)", text)
     return float(m.group().replace(",", "")) if m else None
 
-def extract_state(text, states):
-    for s in states:
-        if s.lower() in text.lower():
-            return s
-    return None
-
 def extract_utti(text):
     m = re.search(r"UTTI-[A-Z]+-\d{2}-[A-Z0-9]{6}", text.upper())
     return m.group() if m else None
@@ -83,115 +209,102 @@ def extract_utti(text):
 # ==============================
 # GST ALLOCATION
 # ==============================
-def allocate_to_ministries(allocation_data, tax_amount):
-    result = []
-    for m in allocation_data.get("ministries", []):
-        pct = float(m.get("percentage_share", 0))
-        amt = (pct / 100) * tax_amount
-        result.append({
-            "ministry": m.get("ministry", "Unknown"),
-            "percent": pct,
-            "amount": amt
-        })
-    return sorted(result, key=lambda x: x["amount"], reverse=True)
+def allocation_vectors(allocation_data):
+    # Precomputed once per data_allocation_2025.json version
+    if allocation_data is load_allocation():
+        return rule_store.derived(ALLOCATION_FILE, "vectors", AllocationVectors.from_data)
+    return AllocationVectors(allocation_data)
+
+def allocate_to_ministries(allocation_data, tax_amount, top_k=None):
+    return allocation_vectors(allocation_data).allocate(tax_amount, top_k)
+
+def allocate_to_departments(allocation_data, tax_amount, top_k=None, ministry=None):
+    return allocation_vectors(allocation_data).allocate_departments(
+        tax_amount, top_k, ministry
+    )
 
 # ==============================
 # 🔑 HANDLE UTTI QUERY
 # ==============================
-def handle_utti_query(utti, allocation_data):
-    try:
-        resp = requests.get(f"{UTTI_SERVICE_BASE}/{utti}", timeout=5)
-        if resp.status_code != 200:
-            return None, "⚠️ Invalid UTTI or data not found."
+def utti_summary(utti, slip, allocation_data):
+    """
+    Text answer for a fetched slip, plus the top allocation
+    entries used for the chart.
+    """
+    total_gst = float(slip.get("total_gst", 0))
+
+    lines = [
+        f"UTTI: {utti}",
+        f"Invoice Number: {slip.get('invoice_number')}",
+        f"Purchase Date: {slip.get('purchase_date')}",
+        f"Purchase Time: {slip.get('purchase_time')}",
+        "",
+        "Items Purchased:"
+    ]
+
+    for it in slip.get("items", []):
+        lines.append(
+            f"- {it['name']} – {money(it['price'])} "
+            f"(GST {it['gst_percent']}% = {money(it['gst_amount'])})"
+        )
 
-        slip = resp.json()
-        total_gst = float(slip.get("total_gst", 0))
+    lines.append("")
+    lines.append(f"Total GST Paid: {money(total_gst)}")
+    lines.append("")
+    lines.append("GST Allocation:")
 
-        # ---------------- TEXT ----------------
-        lines = [
-            f"UTTI: {utti}",
-            f"Invoice Number: {slip.get('invoice_number')}",
-            f"Purchase Date: {slip.get('purchase_date')}",
-            f"Purchase Time: {slip.get('purchase_time')}",
-            "",
-            "Items Purchased:"
-        ]
+    allocation = allocate_to_ministries(allocation_data, total_gst, top_k=6)
 
-        for it in slip.get("items", []):
-            lines.append(
-                f"- {it['name']} – {money(it['price'])} "
-                f"(GST {it['gst_percent']}% = {money(it['gst_amount'])})"
-            )
-
-        lines.append("")
-        lines.append(f"Total GST Paid: {money(total_gst)}")
-        lines.append("")
-        lines.append("GST Allocation:")
+    for a in allocation[:5]:
+        lines.append(
+            f"- {a['ministry']} ({a['percent']}%) → {money(a['amount'])}"
+        )
 
-        allocation = allocate_to_ministries(allocation_data, total_gst)
+    return "\n".join(lines), allocation
 
-        for a in allocation[:5]:
-            lines.append(
-                f"- {a['ministry']} ({a['percent']}%) → {money(a['amount'])}"
-            )
+def submit_allocation_chart(allocation):
+    # Same shares -> same pie: rendered once, then served from cache
+    return chart_renderer.submit(
+        [a["ministry"] for a in allocation],
+        [a["amount"] for a in allocation],
+        CHART_TITLE,
+        CHART_FORMAT
+    )
 
-        text_response = "\n".join(lines)
+def utti_answer(utti, slip, allocation_data):
+    """
+    Text answer for a fetched slip and the (key, future) of its
+    allocation chart, already submitted to the chart pool. A slip
+    of None (not found) gives the not-found text and no chart.
+    """
+    if slip is None:
+        return "⚠️ Invalid UTTI or data not found.", None
 
-        # ---------------- CHART ----------------
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.pie(
-            [a["amount"] for a in allocation[:6]],
-            labels=[a["ministry"] for a in allocation[:6]],
-            autopct="%1.1f%%",
-            startangle=140
-        )
-        ax.set_title("GST Allocation Across Ministries")
+    text_response, allocation = utti_summary(utti, slip, allocation_data)
+    return text_response, submit_allocation_chart(allocation)
 
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight")
-        buf.seek(0)
-        plt.close(fig)
+def handle_utti_query(utti, allocation_data):
+    try:
+        slip = utti_client.get_slip(utti)
+        text_response, chart = utti_answer(utti, slip, allocation_data)
+        if chart is None:
+            return None, text_response
 
-        return buf, text_response
+        _, future = chart
+        return io.BytesIO(future.result()), text_response
 
     except Exception as e:
         return None, f"⚠️ Error processing UTTI: {e}"
 
+async def handle_utti_query_async(utti, allocation_data):
     try:
-        resp = requests.get(f"{UTTI_SERVICE_BASE}/{utti}", timeout=5)
-        if resp.status_code != 200:
-            return None, "⚠️ Invalid UTTI or data not found."
-
-        slip = resp.json()
-        total_gst = float(slip.get("total_gst", 0))
+        slip = await async_utti_client.get_slip(utti)
+        text_response, chart = utti_answer(utti, slip, allocation_data)
+        if chart is None:
+            return None, text_response
 
-        lines = [
-            f"UTTI: {utti}",
-            f"Invoice Number: {slip.get('invoice_number')}",
-            f"Purchase Date: {slip.get('purchase_date')}",
-            f"Purchase Time: {slip.get('purchase_time')}",
-            "",
-            "Items Purchased:"
-        ]
-
-        for it in slip.get("items", []):
-            lines.append(
-                f"- {it['name']} – {money(it['price'])} "
-                f"(GST {it['gst_percent']}% = {money(it['gst_amount'])})"
-            )
-
-        lines.append("")
-        lines.append(f"Total GST Paid: {money(total_gst)}")
-        lines.append("")
-        lines.append("GST Allocation:")
-
-        allocation = allocate_to_ministries(allocation_data, total_gst)
-        for a in allocation[:3]:
-            lines.append(
-                f"- {a['ministry']} ({a['percent']}%) → {money(a['amount'])}"
-            )
-
-        return None, "\n".join(lines)
+        _, future = chart
+        return io.BytesIO(await asyncio.wrap_future(future)), text_response
 
     except Exception as e:
         return None, f"⚠️ Error processing UTTI: {e}"
@@ -223,83 +336,146 @@ def calculate_components(amount, components, state_fees=None, state=None):
 
     return breakdown, total
 
+def calculate_tax_batch(products, amounts, states=None, variants=None):
+    """
+    Prices many line items at once; see BatchTaxEngine.calculate.
+    """
+    return get_batch_engine().calculate(products, amounts, states, variants)
+
+def calculate_income_tax_batch(incomes):
+    return get_batch_engine().income_tax(incomes)
+
+# ==============================
+# BUDGET LOOKUP
+# ==============================
+# "how much is allocated to PM Kisan?", "what is the budget for Jal Jeevan Mission"
+ALLOCATION_QUESTION_RE = re.compile(
+    r"\b(?:how\s+much|what)\b.*?"
+    r"\b(?:allocat\w*|allott?\w*|budget\w*|earmark\w*|outlay|provision|spen[dt])\s+"
+    r"(?:is\s+|was\s+)?(?:to|for|on|under|towards?)\s+(?:the\s+)?"
+    r"(?P<scheme>.+?)[\s?.!]*$",
+    re.IGNORECASE
+)
+
+def crore(v):
+    return "not provided" if v is None else f"{money(v)} crore"
+
+def budget_answer(user_text):
+    """
+    Figures of the budget line item a "how much is allocated to <scheme>"
+    question names, from the in-memory search index. Returns None for
+    other questions, for names that are only numbers, and when no item
+    with a figure in BUDGET_ANSWER_COLUMNS matches every word.
+    """
+    m = ALLOCATION_QUESTION_RE.search(user_text)
+    if not m:
+        return None
+    # "the budget for 2025" names a year, not a line item
+    if all(w[0].isdigit() for w in search_words(m.group("scheme"))):
+        return None
+    try:
+        found = budget_search().search(
+            m.group("scheme"),
+            1 + BUDGET_OTHER_MATCHES,
+            with_figures=[col for col, _ in BUDGET_ANSWER_COLUMNS]
+        )
+    except (OSError, ValueError):
+        return None   # bundle not built yet / nothing searchable
+    results = found["results"]
+    if not results or results[0]["matched"] < found["words"]:
+        return None
+
+    best = results[0]
+    where = f"Demand No. {best['demand_no']}"
+    if best["department"] or best["ministry"]:
+        where += f" – {best['department'] or best['ministry']}"
+    lines = [f"Budget allocation: {best['name']}", where, ""]
+    for col, label in BUDGET_ANSWER_COLUMNS:
+        lines.append(f"- {label}: {crore(best['values'].get(col))}")
+
+    others = [r for r in results[1:] if r["matched"] == found["words"]]
+    if others:
+        lines.append("")
+        lines.append("Other matching items:")
+        for r in others:
+            lines.append(f"- {r['name']} (Demand No. {r['demand_no']})")
+
+    return "\n".join(lines)
+
 # ==============================
 # MAIN ENTRY
 # ==============================
-def smart_tax_flow(user_text):
-    allocation_data = load_allocation()
+def rule_based_answer(user_text):
+    """
+    Answers from tax_rate.json alone (goods, services, income tax).
+    Returns None when no rule applies.
+    """
     tax_data = load_tax_rates()
     categories = tax_data["categories"]
 
-    # 1️⃣ UTTI FLOW
-    utti = extract_utti(user_text)
-    if utti:
-        return handle_utti_query(utti, allocation_data)
-
     amount = extract_amount(user_text)
-    state = extract_state(user_text, tax_data.get("state_fees", {}).keys())
+    match = get_tax_matcher().match(user_text)
+    state = match.states[0] if match.states else None
 
     # 2️⃣ GOODS GST
     if amount:
-        for sector, items in categories["Goods"].items():
-            for product, variants in items.items():
-                if product.lower() in user_text.lower():
-                    for variant, rule in variants.items():
-                        if "price_above" in rule and amount <= rule["price_above"]:
-                            continue
-                        if "price_below" in rule and amount >= rule["price_below"]:
-                            continue
-
-                        breakdown, total_tax = calculate_components(
-                            amount,
-                            rule["tax_components"],
-                            tax_data.get("state_fees"),
-                            state
-                        )
-
-                        lines = [
-                            f"Product: {product} ({variant})",
-                            f"Base Price: {money(amount)}",
-                            ""
-                        ]
-
-                        for b in breakdown:
-                            lines.append(
-                                f"- {b['name']} ({b['rate']}%) → {b['amount']}"
-                            )
-
-                        lines.append("")
-                        lines.append(f"Total Tax: {money(total_tax)}")
-                        lines.append(f"Final Price: {money(amount + total_tax)}")
-                        lines.append("")
-                        lines.append(rule.get("notes", ""))
-
-                        return None, "\n".join(lines)
+        for sector, product, variants in match.products:
+            for variant, rule in variants.items():
+                if "price_above" in rule and amount <= rule["price_above"]:
+                    continue
+                if "price_below" in rule and amount >= rule["price_below"]:
+                    continue
+
+                breakdown, total_tax = calculate_components(
+                    amount,
+                    rule["tax_components"],
+                    tax_data.get("state_fees"),
+                    state
+                )
+
+                lines = [
+                    f"Product: {product} ({variant})",
+                    f"Base Price: {money(amount)}",
+                    ""
+                ]
+
+                for b in breakdown:
+                    lines.append(
+                        f"- {b['name']} ({b['rate']}%) → {b['amount']}"
+                    )
+
+                lines.append("")
+                lines.append(f"Total Tax: {money(total_tax)}")
+                lines.append(f"Final Price: {money(amount + total_tax)}")
+                lines.append("")
+                lines.append(rule.get("notes", ""))
+
+                return "\n".join(lines)
 
     # 3️⃣ SERVICES GST
-    for service, rule in categories["Services"].items():
-        if service.replace("_", " ").lower() in user_text.lower():
-            breakdown, total_tax = calculate_components(
-                amount or 0,
-                rule["tax_components"]
-            )
+    if match.services:
+        service, rule = match.services[0]
+        breakdown, total_tax = calculate_components(
+            amount or 0,
+            rule["tax_components"]
+        )
 
-            lines = [
-                f"Service: {service.replace('_',' ')}",
-                f"Base Amount: {money(amount or 0)}",
-                ""
-            ]
+        lines = [
+            f"Service: {service.replace('_',' ')}",
+            f"Base Amount: {money(amount or 0)}",
+            ""
+        ]
 
-            for b in breakdown:
-                lines.append(
-                    f"- {b['name']} ({b['rate']}%) → {b['amount']}"
-                )
+        for b in breakdown:
+            lines.append(
+                f"- {b['name']} ({b['rate']}%) → {b['amount']}"
+            )
 
-            lines.append("")
-            lines.append(f"Total Tax: {money(total_tax)}")
-            lines.append(rule.get("notes", ""))
+        lines.append("")
+        lines.append(f"Total Tax: {money(total_tax)}")
+        lines.append(rule.get("notes", ""))
 
-            return None, "\n".join(lines)
+        return "\n".join(lines)
 
     # 4️⃣ INCOME TAX
     if "income" in user_text.lower() and amount:
@@ -321,11 +497,110 @@ def smart_tax_flow(user_text):
         lines.append("")
         lines.append(f"Total Income Tax: {money(tax)}")
 
-        return None, "\n".join(lines)
+        return "\n".join(lines)
+
+    return None
+
+def smart_tax_flow(user_text):
+    # 1️⃣ UTTI FLOW
+    utti = extract_utti(user_text)
+    if utti:
+        return handle_utti_query(utti, load_allocation())
 
-    # 5️⃣ AI EXPLANATION FALLBACK
+    # 2️⃣–4️⃣ GOODS / SERVICES / INCOME TAX
+    text = rule_based_answer(user_text)
+    if text is not None:
+        return None, text
+
+    # 5️⃣ BUDGET LINE ITEMS
+    text = budget_answer(user_text)
+    if text is not None:
+        return None, text
+
+    # 6️⃣ AI EXPLANATION FALLBACK
     return None, ai_explain(user_text)
 
+def local_answer(user_text):
+    """
+    Rule-based answer, else budget line-item answer, else None
+    (steps 2–5 of smart_tax_flow).
+    """
+    text = rule_based_answer(user_text)
+    if text is None:
+        text = budget_answer(user_text)
+    return text
+
+async def smart_tax_flow_async(user_text):
+    """
+    Same answers as smart_tax_flow without blocking the event loop:
+    UTTI lookups and the LLM fallback are awaited, charts render in
+    the chart pool. Rule matching and budget lookups (which may
+    reload a rule file or build an index) run in the CPU pool.
+    """
+    utti = extract_utti(user_text)
+    if utti:
+        return await handle_utti_query_async(utti, await run_cpu(load_allocation))
+
+    text = await run_cpu(local_answer, user_text)
+    if text is not None:
+        return None, text
+
+    return None, await ai_explain_async(user_text)
+
+# ==============================
+# STREAMING ENTRY
+# ==============================
+# Same answers as smart_tax_flow, as a sequence of events:
+#   ("text", str)            complete rule-based / UTTI answer
+#   ("token", str)           piece of an LLM answer
+#   ("chart", (key, future)) chart being rendered in the chart pool
+# Text is produced before the chart, so callers can send it right away.
+
+def _utti_events(utti, slip, allocation_data):
+    text_response, chart = utti_answer(utti, slip, allocation_data)
+    yield "text", text_response
+    if chart is not None:
+        yield "chart", chart
+
+def smart_tax_flow_stream(user_text):
+    utti = extract_utti(user_text)
+    if utti:
+        try:
+            slip = utti_client.get_slip(utti)
+        except Exception as e:
+            yield "text", f"⚠️ Error processing UTTI: {e}"
+            return
+        yield from _utti_events(utti, slip, load_allocation())
+        return
+
+    text = local_answer(user_text)
+    if text is not None:
+        yield "text", text
+        return
+
+    for piece in ai_explain_stream(user_text):
+        yield "token", piece
+
+async def smart_tax_flow_stream_async(user_text):
+    utti = extract_utti(user_text)
+    if utti:
+        try:
+            slip = await async_utti_client.get_slip(utti)
+        except Exception as e:
+            yield "text", f"⚠️ Error processing UTTI: {e}"
+            return
+        for event in _utti_events(utti, slip, await run_cpu(load_allocation)):
+            yield event
+        return
+
+    text = await run_cpu(local_answer, user_text)
+    if text is not None:
+        yield "text", text
+        return
+
+    async for piece in ai_explain_stream_async(user_text):
+        yield "token", piece
+
 # ==============================
 # CLI TEST
 # ==============================
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# ==============================
+# CONFIG
+# ==============================
+# Minimum seconds between two stat() checks of the same file. Inside this
+# window readers get the current snapshot without touching the filesystem.
+CHECK_INTERVAL = float(os.getenv("RULE_STORE_CHECK_INTERVAL", "1.0"))
+
+
+# ==============================
+# SNAPSHOT
+# ==============================
+class _Entry:
+    """
+    One loaded JSON file. Replaced as a whole on reload,
+    never mutated, so readers can hold on to it safely.
+    """
+
+    __slots__ = ("data", "mtime_ns", "size", "digest", "version", "derived", "building")
+
+    def __init__(self, data, mtime_ns, size, digest, version):
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.version = version
+        self.derived = {}
+        # derived name -> lock held while that value is being built
+        self.building = {}
+
+
+# ==============================
+# RULE STORE
+# ==============================
+class RuleStore:
+    """
+    Process-wide cache of the JSON rule files (tax rates, allocations).
+
+    Files are parsed once and shared by every worker thread. A file is
+    re-read only when its mtime/size changes AND its content hash differs;
+    the new snapshot is swapped in atomically, so a reader sees either the
+    old or the new data, never a half-loaded one.
+    """
+
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "loads": 0,
+            "reloads": 0,
+            "unchanged_touches": 0,
+            "checks": 0,
+            "errors": 0,
+        }
+        # Fast-path hits are counted per thread, without the lock;
+        # stats() adds up the cells of every thread that has counted
+        self._local = threading.local()
+        self._hit_cells = []
+
+    # ---------------- INTERNAL ----------------
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            raw = f.read()
+        return raw, hashlib.sha256(raw).hexdigest()
+
+    def _refresh(self, key):
+        """
+        Called with self._lock held. Returns the current entry,
+        loading or reloading the file if needed.
+        """
+        entry = self._entries.get(key)
+        self._stats["checks"] += 1
+        try:
+            st = os.stat(key)
+        except OSError:
+            if entry is None:
+                raise
+            # Keep serving the last good snapshot if the file vanished
+            self._stats["errors"] += 1
+            return entry
+
+        if entry and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry
+
+        raw, digest = self._read(key)
+        if entry and entry.digest == digest:
+            # touched but identical content: keep the parsed data
+            entry.mtime_ns = st.st_mtime_ns
+            entry.size = st.st_size
+            self._stats["unchanged_touches"] += 1
+            return entry
+
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            if entry is None:
+                raise
+            # Half-written file during a deploy: keep the old rules
+            self._stats["errors"] += 1
+            return entry
+
+        version = entry.version + 1 if entry else 1
+        new_entry = _Entry(data, st.st_mtime_ns, st.st_size, digest, version)
+        self._entries[key] = new_entry
+        self._stats["reloads" if entry else "loads"] += 1
+        return new_entry
+
+    def _count_hit(self):
+        cell = getattr(self._local, "hits", None)
+        if cell is None:
+            cell = self._local.hits = [0]
+            with self._lock:
+                self._hit_cells.append(cell)
+        cell[0] += 1
+
+    def _entry(self, path):
+        key = self._key(path)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and now - self._checked_at.get(key, 0) < self.check_interval:
+            self._count_hit()
+            return entry
+
+        with self._lock:
+            entry = self._refresh(key)
+            self._checked_at[key] = now
+            return entry
+
+    # ---------------- PUBLIC API ----------------
+    def get(self, path):
+        """
+        Returns the parsed JSON for path. The returned object is
+        shared between threads and must be treated as read-only.
+        """
+        return self._entry(path).data
+
+    def version(self, path):
+        """
+        Monotonic version of the file's snapshot (1 on first load,
+        +1 on every content change).
+        """
+        return self._entry(path).version
+
+    def snapshot(self, path):
+        """
+        (data, version) taken from the same snapshot; get() followed
+        by version() could straddle a reload.
+        """
+        entry = self._entry(path)
+        return entry.data, entry.version
+
+    def derived(self, path, name, builder):
+        """
+        Returns builder(data) for the current snapshot of path,
+        cached until the file is reloaded. Used for indexes that
+        are expensive to build from the raw JSON.
+
+        The build runs under a lock of its own (one per snapshot and
+        name), so reads of the rule files never wait for it.
+        """
+        entry = self._entry(path)
+        value = entry.derived.get(name)
+        if value is not None:
+            return value
+
+        with self._lock:
+            build_lock = entry.building.setdefault(name, threading.Lock())
+        with build_lock:
+            value = entry.derived.get(name)
+            if value is None:
+                value = entry.derived.setdefault(name, builder(entry.data))
+        return value
+
+    def invalidate(self, path=None):
+        """
+        Forces the next read of path (or of every file) to stat the file.
+        """
+        with self._lock:
+            if path is None:
+                self._checked_at.clear()
+            else:
+                self._checked_at.pop(self._key(path), None)
+
+    def stats(self):
+        with self._lock:
+            files = {
+                os.path.basename(k): {
+                    "version": e.version,
+                    "sha256": e.digest,
+                    "size": e.size,
+                }
+                for k, e in self._entries.items()
+            }
+            hits = sum(cell[0] for cell in self._hit_cells)
+            return {**self._stats, "hits": hits, "files": files}
+
+
+# Shared instance used by nlp_query and server
+rule_store = RuleStore()
@@ -1,13 +1,52 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pymongo import MongoClient
-import bcrypt
+from pymongo.errors import PyMongoError
 from datetime import datetime
-from nlp_query import smart_tax_flow
-import base64
-from typing import List, Optional
+from typing import Optional
+import threading
+import os
+from nlp_query import (
+    CHART_FORMAT,
+    ai_answer_cache,
+    utti_client,
+    smart_tax_flow,
+    load_allocation,
+    load_tax_rates
+)
+from api_common import (
+    hash_password,
+    verify_password,
+    Signup,
+    LoginModel,
+    UserMessage,
+    CreateChatModel,
+    AddMessageModel,
+    AddMessagesModel,
+    BatchTaxModel,
+    encode_chart,
+    batch_tax_response,
+    budget_query,
+    budget_item_search,
+    chat_stream,
+    chat_list_query,
+    chat_list_page,
+    CHART_MEDIA_TYPES,
+    NDJSON_MEDIA_TYPE,
+    CHAT_INDEXES,
+    CHAT_LIST_SORT,
+    CHAT_LIST_PROJECTION,
+    CHAT_PAGE_SIZE,
+    MAX_PAGE_SIZE
+)
+from rule_store import rule_store
+from ai_cache import MongoStore
+from chart_render import chart_renderer
+from chat_store import ChatStore, ChatWriteBuffer, MESSAGE_PAGE_SIZE, CHAT_WRITE_BEHIND_MS
+from budget_data import bundle_response
+from budget_analytics import TOP_N_MAX
+from budget_search import SEARCH_LIMIT_MAX, budget_search
 
 app = FastAPI(title="Tax Allocation Chatbot + Signup API")
 
@@ -29,41 +68,13 @@ client = MongoClient("mongodb://localhost:27017")
 db = client["user_db"]
 users = db["users"]
 chats = db["chats"]   # ✅ NEW COLLECTION
+chat_store = ChatStore(db)   # messages + chart_blobs live beside chats
+# Optional write-behind: appends are acknowledged once queued
+chat_writer = ChatWriteBuffer(chat_store) if CHAT_WRITE_BEHIND_MS > 0 else None
 
-# ------------------------------------------------------------
-# PASSWORD HASHING
-# ------------------------------------------------------------
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode(), hashed.encode())
-
-# ------------------------------------------------------------
-# MODELS
-# ------------------------------------------------------------
-class Signup(BaseModel):
-    username: str
-    email: EmailStr
-    password: str
-
-class LoginModel(BaseModel):
-    email: EmailStr
-    password: str
-
-class UserMessage(BaseModel):
-    message: str
-
-# NEW MODELS FOR CHAT STORAGE
-class CreateChatModel(BaseModel):
-    email: EmailStr
-    title: Optional[str] = "New chat"
-
-class AddMessageModel(BaseModel):
-    chat_id: str
-    role: str
-    text: str
-    chart: Optional[str] = None
+# Persist cached LLM answers in Mongo instead of memory / AI_CACHE_FILE
+# (attached in the background at startup, see ensure_indexes)
+AI_CACHE_MONGO = os.getenv("AI_CACHE_BACKEND") == "mongo"
 
 # ------------------------------------------------------------
 # SIGNUP
@@ -105,62 +116,92 @@ def login(user: LoginModel):
 # ------------------------------------------------------------
 @app.post("/api/chat/create")
 def create_chat(payload: CreateChatModel):
-    result = chats.insert_one({
-        "email": payload.email,
-        "title": payload.title,
-        "messages": [],
-        "created_at": datetime.utcnow()
-    })
-
-    return {"chat_id": str(result.inserted_id)}
+    chat_id = chat_store.create_chat(payload.email, payload.title)
+    return {"chat_id": chat_id}
 
 # ------------------------------------------------------------
-# ADD MESSAGE TO CHAT
+# ADD MESSAGE(S) TO CHAT
 # ------------------------------------------------------------
+def store_messages(chat_id: str, messages: list):
+    try:
+        if chat_writer is not None:
+            chat_writer.append(chat_id, messages)
+            return
+        seqs = chat_store.append(chat_id, messages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if seqs is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
 @app.post("/api/chat/add-message")
 def add_message(payload: AddMessageModel):
-    from bson import ObjectId
-
-    chats.update_one(
-        {"_id": ObjectId(payload.chat_id)},
-        {
-            "$push": {
-                "messages": {
-                    "role": payload.role,
-                    "text": payload.text,
-                    "chart": payload.chart,
-                    "timestamp": datetime.utcnow()
-                }
-            }
-        }
-    )
-
+    message = {"role": payload.role, "text": payload.text, "chart": payload.chart}
+    store_messages(payload.chat_id, [message])
     return {"message": "Message added"}
 
+@app.post("/api/chat/add-messages")
+def add_messages(payload: AddMessagesModel):
+    messages = [
+        {"role": m.role, "text": m.text, "chart": m.chart}
+        for m in payload.messages
+    ]
+    store_messages(payload.chat_id, messages)
+    return {"message": "Messages added", "count": len(messages)}
+
 # ------------------------------------------------------------
 # FETCH USER CHATS
 # ------------------------------------------------------------
 @app.get("/api/chats/{email}")
 def get_user_chats(email: str):
-    from bson import ObjectId
-
-    user_chats = []
-    for chat in chats.find({"email": email}).sort("created_at", -1):
-        user_chats.append({
-            "id": str(chat["_id"]),
-            "title": chat["title"],
-            "messages": chat.get("messages", [])
-        })
+    return chat_store.chats_with_messages(email)
+
+# ------------------------------------------------------------
+# CHAT LIST (titles only, paginated)
+# ------------------------------------------------------------
+@app.get("/api/chats/{email}/list")
+def list_user_chats(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(CHAT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        query = chat_list_query(email, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return user_chats
+    docs = list(
+        chats.find(query, CHAT_LIST_PROJECTION)
+        .sort(CHAT_LIST_SORT)
+        .limit(limit + 1)
+    )
+    return chat_list_page(docs, limit)
+
+# ------------------------------------------------------------
+# CHAT MESSAGES (newest page first, older via ?before=<seq>)
+# ------------------------------------------------------------
+@app.get("/api/chat/{chat_id}/messages")
+def get_chat_messages(
+    chat_id: str,
+    before: Optional[int] = None,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        page = chat_store.page(chat_id, before, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return page
 
 # ------------------------------------------------------------
 # DELETE CHAT
 # ------------------------------------------------------------
 @app.delete("/api/chat/{chat_id}")
 def delete_chat(chat_id: str):
-    from bson import ObjectId
-    chats.delete_one({"_id": ObjectId(chat_id)})
+    try:
+        chat_store.delete_chat(chat_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"message": "Chat deleted"}
 
 # ------------------------------------------------------------
@@ -170,16 +211,7 @@ def delete_chat(chat_id: str):
 def get_chat_response(user: UserMessage):
     try:
         chart_buf, summary = smart_tax_flow(user.message)
-
-        chart_base64 = (
-            base64.b64encode(chart_buf.getvalue()).decode("utf-8")
-            if chart_buf else None
-        )
-
-        return JSONResponse({
-            "summary": summary,
-            "chart": chart_base64
-        })
+        return JSONResponse({"summary": summary, **encode_chart(chart_buf)})
 
     except Exception as e:
         print("❌ Backend Error:", e)
@@ -188,6 +220,177 @@ def get_chat_response(user: UserMessage):
             "chart": None
         })
 
+# ------------------------------------------------------------
+# STREAMING CHATBOT RESPONSE
+# ------------------------------------------------------------
+@app.post("/api/chat/stream")
+def stream_chat_response(user: UserMessage, chart: str = "inline"):
+    """
+    NDJSON stream: the text (or LLM tokens) first, the chart last.
+    chart=url sends a link to GET /api/charts/{key} instead of the image.
+    """
+    return StreamingResponse(
+        chat_stream(user.message, chart),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+# ------------------------------------------------------------
+# BULK TAX CALCULATION
+# ------------------------------------------------------------
+@app.post("/api/tax/batch")
+def tax_batch(payload: BatchTaxModel):
+    try:
+        return batch_tax_response(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ------------------------------------------------------------
+# RULE STORE STATUS
+# ------------------------------------------------------------
+@app.on_event("startup")
+def warm_rule_store():
+    # Parse the rule files once before the first chat request
+    load_allocation()
+    load_tax_rates()
+    try:
+        budget_search()   # index for budget questions in chat
+    except OSError:
+        pass
+
+def create_indexes():
+    try:
+        users.create_index("email")
+        chats.create_index(CHAT_INDEXES)
+        chat_store.create_indexes()
+    except PyMongoError as e:
+        print("⚠️ Could not create indexes:", e)
+    if AI_CACHE_MONGO:
+        try:
+            ai_answer_cache.attach_store(MongoStore(db["ai_answers"]))
+        except PyMongoError as e:
+            print("⚠️ Could not load the AI answer cache from Mongo:", e)
+
+@app.on_event("startup")
+def ensure_indexes():
+    # In the background: an unreachable Mongo must not hold up startup
+    threading.Thread(target=create_indexes, daemon=True).start()
+
+@app.get("/api/rules/stats")
+def rule_store_stats():
+    return rule_store.stats()
+
+@app.get("/api/charts/stats")
+def chart_cache_stats():
+    return chart_renderer.stats()
+
+@app.get("/api/ai-cache/stats")
+def ai_cache_stats():
+    return ai_answer_cache.stats()
+
+@app.get("/api/utti/stats")
+def utti_client_stats():
+    return utti_client.stats()
+
+@app.get("/api/chat-writer/stats")
+def chat_writer_stats():
+    if chat_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **chat_writer.stats()}
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    if chat_writer is not None:
+        chat_writer.close()   # flush queued messages
+    chart_renderer.shutdown()
+    utti_client.close()
+
+# ------------------------------------------------------------
+# CHART BY KEY (declared after /api/charts/stats)
+# ------------------------------------------------------------
+@app.get("/api/charts/{key}")
+def get_chart(key: str):
+    data = chart_renderer.get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    return Response(
+        data,
+        media_type=CHART_MEDIA_TYPES[CHART_FORMAT],
+        headers={"Cache-Control": "public, max-age=86400, immutable"}
+    )
+
+# ------------------------------------------------------------
+# BUDGET ANALYTICS (precomputed rollups)
+# ------------------------------------------------------------
+def budget_route(method: str, *args):
+    try:
+        return budget_query(method, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget data has not been built")
+
+@app.get("/api/budget/ministry/{name}")
+def budget_ministry(name: str):
+    return budget_route("ministry", name)
+
+@app.get("/api/budget/demand/{demand_no}")
+def budget_demand(demand_no: int):
+    return budget_route("demand", demand_no)
+
+@app.get("/api/budget/top")
+def budget_top(
+    col: str = "total_2025_26",
+    n: int = Query(10, ge=1, le=TOP_N_MAX),
+    level: str = "demand"
+):
+    return budget_route("top", col, n, level)
+
+@app.get("/api/budget/compare")
+def budget_compare(
+    from_col: str = Query("total_2024_25", alias="from"),
+    to_col: str = Query("total_2025_26", alias="to"),
+    level: str = "ministry",
+    n: int = Query(10, ge=1, le=TOP_N_MAX)
+):
+    return budget_route("compare", from_col, to_col, level, n)
+
+@app.get("/api/budget/stats")
+def budget_stats():
+    return budget_route("stats")
+
+@app.get("/api/budget/search")
+def budget_item_lookup(
+    q: str = Query(..., min_length=1),
+    n: int = Query(10, ge=1, le=SEARCH_LIMIT_MAX)
+):
+    try:
+        return budget_item_search(q, n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget bundle has not been built")
+
+# ------------------------------------------------------------
+# BUDGET BUNDLE (all demands, one compressed file)
+# ------------------------------------------------------------
+@app.get("/api/budget/bundle")
+def get_budget_bundle(request: Request):
+    try:
+        status, body, headers = bundle_response(
+            request.headers.get("accept-encoding"),
+            request.headers.get("if-none-match")
+        )
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget bundle has not been built")
+    return Response(
+        body,
+        status_code=status,
+        media_type="application/json" if status == 200 else None,
+        headers=headers
+    )
+
 # ------------------------------------------------------------
 # ROOT
 # ------------------------------------------------------------
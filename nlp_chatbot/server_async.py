@@ -0,0 +1,429 @@
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.errors import PyMongoError
+from datetime import datetime
+from typing import Optional
+import asyncio
+import os
+from nlp_query import (
+    CHART_FORMAT,
+    ai_answer_cache,
+    utti_client,
+    async_utti_client,
+    smart_tax_flow_async,
+    load_allocation,
+    load_tax_rates,
+    cpu_executor,
+    run_cpu
+)
+from api_common import (
+    hash_password,
+    verify_password,
+    Signup,
+    LoginModel,
+    UserMessage,
+    CreateChatModel,
+    AddMessageModel,
+    AddMessagesModel,
+    BatchTaxModel,
+    encode_chart,
+    batch_tax_response,
+    budget_query,
+    budget_item_search,
+    chat_stream_async,
+    chat_list_query,
+    chat_list_page,
+    CHART_MEDIA_TYPES,
+    NDJSON_MEDIA_TYPE,
+    CHAT_INDEXES,
+    CHAT_LIST_SORT,
+    CHAT_LIST_PROJECTION,
+    CHAT_PAGE_SIZE,
+    MAX_PAGE_SIZE
+)
+from rule_store import rule_store
+from ai_cache import MongoStore
+from chart_render import chart_renderer
+from chat_store import AsyncChatStore, AsyncChatWriteBuffer, MESSAGE_PAGE_SIZE, CHAT_WRITE_BEHIND_MS
+from budget_data import bundle_response
+from budget_analytics import TOP_N_MAX
+from budget_search import SEARCH_LIMIT_MAX, budget_search
+
+# ------------------------------------------------------------
+# Async variant of server.py with the same routes.
+#   uvicorn server_async:app --port 8000
+# Mongo, the UTTI service and the LLM are awaited; bcrypt and
+# other CPU-bound work run in a dedicated executor (run_cpu from
+# nlp_query, shared with the chat flow) so slow LLM fallbacks can
+# no longer starve logins of worker threads.
+# ------------------------------------------------------------
+app = FastAPI(title="Tax Allocation Chatbot + Signup API (async)")
+
+# ------------------------------------------------------------
+# CORS
+# ------------------------------------------------------------
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ------------------------------------------------------------
+# MONGODB (PyMongo async API)
+# ------------------------------------------------------------
+client = AsyncMongoClient("mongodb://localhost:27017")
+db = client["user_db"]
+users = db["users"]
+chats = db["chats"]
+chat_store = AsyncChatStore(db)
+# Optional write-behind: appends are acknowledged once queued
+chat_writer = AsyncChatWriteBuffer(chat_store) if CHAT_WRITE_BEHIND_MS > 0 else None
+
+# The answer cache is shared with the sync code path and writes once per
+# LLM miss, so it keeps a small synchronous client of its own, opened
+# and loaded in the background at startup (see ensure_indexes).
+AI_CACHE_MONGO = os.getenv("AI_CACHE_BACKEND") == "mongo"
+ai_cache_client = None
+
+# ------------------------------------------------------------
+# SIGNUP
+# ------------------------------------------------------------
+@app.post("/signup")
+async def signup(user: Signup):
+    if await users.find_one({"email": user.email}):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    await users.insert_one({
+        "username": user.username,
+        "email": user.email,
+        "password": await run_cpu(hash_password, user.password),
+        "created_at": datetime.utcnow()
+    })
+
+    return {"message": "Signup successful!"}
+
+# ------------------------------------------------------------
+# LOGIN
+# ------------------------------------------------------------
+@app.post("/login")
+async def login(user: LoginModel):
+    existing_user = await users.find_one({"email": user.email})
+    if not existing_user:
+        raise HTTPException(status_code=400, detail="Email not registered")
+
+    if not await run_cpu(verify_password, user.password, existing_user["password"]):
+        raise HTTPException(status_code=400, detail="Incorrect password")
+
+    return {
+        "message": "Login successful!",
+        "username": existing_user["username"],
+        "email": existing_user["email"]
+    }
+
+# ------------------------------------------------------------
+# CREATE NEW CHAT
+# ------------------------------------------------------------
+@app.post("/api/chat/create")
+async def create_chat(payload: CreateChatModel):
+    chat_id = await chat_store.create_chat(payload.email, payload.title)
+    return {"chat_id": chat_id}
+
+# ------------------------------------------------------------
+# ADD MESSAGE(S) TO CHAT
+# ------------------------------------------------------------
+async def store_messages(chat_id: str, messages: list):
+    try:
+        if chat_writer is not None:
+            await chat_writer.append(chat_id, messages)
+            return
+        seqs = await chat_store.append(chat_id, messages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if seqs is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+@app.post("/api/chat/add-message")
+async def add_message(payload: AddMessageModel):
+    message = {"role": payload.role, "text": payload.text, "chart": payload.chart}
+    await store_messages(payload.chat_id, [message])
+    return {"message": "Message added"}
+
+@app.post("/api/chat/add-messages")
+async def add_messages(payload: AddMessagesModel):
+    messages = [
+        {"role": m.role, "text": m.text, "chart": m.chart}
+        for m in payload.messages
+    ]
+    await store_messages(payload.chat_id, messages)
+    return {"message": "Messages added", "count": len(messages)}
+
+# ------------------------------------------------------------
+# FETCH USER CHATS
+# ------------------------------------------------------------
+@app.get("/api/chats/{email}")
+async def get_user_chats(email: str):
+    return await chat_store.chats_with_messages(email)
+
+# ------------------------------------------------------------
+# CHAT LIST (titles only, paginated)
+# ------------------------------------------------------------
+@app.get("/api/chats/{email}/list")
+async def list_user_chats(
+    email: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(CHAT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        query = chat_list_query(email, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    docs = await (
+        chats.find(query, CHAT_LIST_PROJECTION)
+        .sort(CHAT_LIST_SORT)
+        .limit(limit + 1)
+        .to_list()
+    )
+    return chat_list_page(docs, limit)
+
+# ------------------------------------------------------------
+# CHAT MESSAGES (newest page first, older via ?before=<seq>)
+# ------------------------------------------------------------
+@app.get("/api/chat/{chat_id}/messages")
+async def get_chat_messages(
+    chat_id: str,
+    before: Optional[int] = None,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    try:
+        page = await chat_store.page(chat_id, before, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return page
+
+# ------------------------------------------------------------
+# DELETE CHAT
+# ------------------------------------------------------------
+@app.delete("/api/chat/{chat_id}")
+async def delete_chat(chat_id: str):
+    try:
+        await chat_store.delete_chat(chat_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Chat deleted"}
+
+# ------------------------------------------------------------
+# CHATBOT RESPONSE
+# ------------------------------------------------------------
+@app.post("/api/chat")
+async def get_chat_response(user: UserMessage):
+    try:
+        chart_buf, summary = await smart_tax_flow_async(user.message)
+        chart = await run_cpu(encode_chart, chart_buf)
+        return JSONResponse({"summary": summary, **chart})
+
+    except Exception as e:
+        print("❌ Backend Error:", e)
+        return JSONResponse({
+            "summary": "Error processing request.",
+            "chart": None
+        })
+
+# ------------------------------------------------------------
+# STREAMING CHATBOT RESPONSE
+# ------------------------------------------------------------
+@app.post("/api/chat/stream")
+async def stream_chat_response(user: UserMessage, chart: str = "inline"):
+    """
+    NDJSON stream: the text (or LLM tokens) first, the chart last.
+    chart=url sends a link to GET /api/charts/{key} instead of the image.
+    """
+    return StreamingResponse(
+        chat_stream_async(user.message, chart),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+# ------------------------------------------------------------
+# BULK TAX CALCULATION
+# ------------------------------------------------------------
+@app.post("/api/tax/batch")
+async def tax_batch(payload: BatchTaxModel):
+    try:
+        return await run_cpu(batch_tax_response, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ------------------------------------------------------------
+# RULE STORE STATUS
+# ------------------------------------------------------------
+@app.on_event("startup")
+async def warm_rule_store():
+    await run_cpu(load_allocation)
+    await run_cpu(load_tax_rates)
+    try:
+        await run_cpu(budget_search)   # index for budget questions in chat
+    except OSError:
+        pass
+
+async def create_indexes():
+    try:
+        await users.create_index("email")
+        await chats.create_index(CHAT_INDEXES)
+        await chat_store.create_indexes()
+    except PyMongoError as e:
+        print("⚠️ Could not create indexes:", e)
+    if AI_CACHE_MONGO:
+        await attach_ai_cache_store()
+
+async def attach_ai_cache_store():
+    global ai_cache_client
+    ai_cache_client = MongoClient("mongodb://localhost:27017")
+    store = MongoStore(ai_cache_client["user_db"]["ai_answers"])
+    try:
+        # blocking driver: its own thread, not the CPU pool
+        await asyncio.to_thread(ai_answer_cache.attach_store, store)
+    except PyMongoError as e:
+        print("⚠️ Could not load the AI answer cache from Mongo:", e)
+
+index_task = None
+
+@app.on_event("startup")
+async def ensure_indexes():
+    # In the background: an unreachable Mongo must not hold up startup
+    global index_task
+    index_task = asyncio.create_task(create_indexes())
+
+@app.get("/api/rules/stats")
+async def rule_store_stats():
+    return rule_store.stats()
+
+@app.get("/api/charts/stats")
+async def chart_cache_stats():
+    return chart_renderer.stats()
+
+@app.get("/api/ai-cache/stats")
+async def ai_cache_stats():
+    return ai_answer_cache.stats()
+
+@app.get("/api/utti/stats")
+async def utti_client_stats():
+    return async_utti_client.stats()
+
+@app.get("/api/chat-writer/stats")
+async def chat_writer_stats():
+    if chat_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **chat_writer.stats()}
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    if chat_writer is not None:
+        await chat_writer.close()   # flush queued messages
+    await async_utti_client.close()
+    utti_client.close()
+    chart_renderer.shutdown()
+    cpu_executor.shutdown(wait=True)
+    await client.close()
+    if ai_cache_client is not None:
+        ai_cache_client.close()
+
+# ------------------------------------------------------------
+# CHART BY KEY (declared after /api/charts/stats)
+# ------------------------------------------------------------
+@app.get("/api/charts/{key}")
+async def get_chart(key: str):
+    data = chart_renderer.get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    return Response(
+        data,
+        media_type=CHART_MEDIA_TYPES[CHART_FORMAT],
+        headers={"Cache-Control": "public, max-age=86400, immutable"}
+    )
+
+# ------------------------------------------------------------
+# BUDGET ANALYTICS (precomputed rollups)
+# ------------------------------------------------------------
+async def budget_route(method: str, *args):
+    try:
+        return await run_cpu(budget_query, method, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget data has not been built")
+
+@app.get("/api/budget/ministry/{name}")
+async def budget_ministry(name: str):
+    return await budget_route("ministry", name)
+
+@app.get("/api/budget/demand/{demand_no}")
+async def budget_demand(demand_no: int):
+    return await budget_route("demand", demand_no)
+
+@app.get("/api/budget/top")
+async def budget_top(
+    col: str = "total_2025_26",
+    n: int = Query(10, ge=1, le=TOP_N_MAX),
+    level: str = "demand"
+):
+    return await budget_route("top", col, n, level)
+
+@app.get("/api/budget/compare")
+async def budget_compare(
+    from_col: str = Query("total_2024_25", alias="from"),
+    to_col: str = Query("total_2025_26", alias="to"),
+    level: str = "ministry",
+    n: int = Query(10, ge=1, le=TOP_N_MAX)
+):
+    return await budget_route("compare", from_col, to_col, level, n)
+
+@app.get("/api/budget/stats")
+async def budget_stats():
+    return await budget_route("stats")
+
+@app.get("/api/budget/search")
+async def budget_item_lookup(
+    q: str = Query(..., min_length=1),
+    n: int = Query(10, ge=1, le=SEARCH_LIMIT_MAX)
+):
+    try:
+        return await run_cpu(budget_item_search, q, n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget bundle has not been built")
+
+# ------------------------------------------------------------
+# BUDGET BUNDLE (all demands, one compressed file)
+# ------------------------------------------------------------
+@app.get("/api/budget/bundle")
+async def get_budget_bundle(request: Request):
+    try:
+        status, body, headers = await run_cpu(
+            bundle_response,
+            request.headers.get("accept-encoding"),
+            request.headers.get("if-none-match")
+        )
+    except OSError:
+        raise HTTPException(status_code=404, detail="Budget bundle has not been built")
+    return Response(
+        body,
+        status_code=status,
+        media_type="application/json" if status == 200 else None,
+        headers=headers
+    )
+
+# ------------------------------------------------------------
+# ROOT
+# ------------------------------------------------------------
+@app.get("/")
+async def root():
+    return {"message": "Welcome to the Tax Chatbot + Signup API"}
@@ -0,0 +1,152 @@
+from collections import deque
+
+# ==============================
+# ALIASES
+# ==============================
+# Extra spellings for catalogue names. Keys are catalogue names as they
+# appear in tax_rate.json; plurals of every name are generated automatically.
+ALIASES = {
+    "Mobile": ["phone", "smartphone"],
+    "TV": ["television"],
+    "Bike": ["motorcycle", "motorbike"],
+    "Laptop": ["notebook"],
+    "IT_Software": ["software"],
+    "Financial_Services": ["banking"],
+}
+
+
+def _plurals(word):
+    forms = [word + "s"]
+    if word.endswith(("s", "x", "z", "ch", "sh")):
+        forms.append(word + "es")
+    if word.endswith("y") and len(word) > 1 and word[-2] not in "aeiou":
+        forms.append(word[:-1] + "ies")
+    return forms
+
+
+def _spellings(name):
+    base = name.replace("_", " ").lower()
+    words = [base] + [a.lower() for a in ALIASES.get(name, [])]
+    out = []
+    for w in words:
+        for form in [w] + _plurals(w):
+            if form not in out:
+                out.append(form)
+    return out
+
+
+# ==============================
+# AHO-CORASICK AUTOMATON
+# ==============================
+class _Automaton:
+    """
+    Multi-pattern substring matcher. Every pattern occurrence in the
+    text is reported in a single left-to-right pass, including
+    overlapping ones.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, pattern, payload):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node].append(payload)
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def find(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        hits = set()
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+        return hits
+
+
+# ==============================
+# TAX MATCHER
+# ==============================
+class MatchResult:
+    __slots__ = ("products", "services", "states")
+
+    def __init__(self, products, services, states):
+        # each list is in tax_rate.json order, so callers keep
+        # the same precedence as a linear scan of the catalogue
+        self.products = products
+        self.services = services
+        self.states = states
+
+
+class TaxMatcher:
+    """
+    Product / service / state index compiled once from tax_rate.json.
+    """
+
+    def __init__(self, tax_data):
+        categories = tax_data.get("categories", {})
+        self.products = []   # (sector, product, {variant: rule})
+        self.services = []   # (service, rule)
+        self.states = list(tax_data.get("state_fees", {}).keys())
+
+        for sector, items in categories.get("Goods", {}).items():
+            for product, variants in items.items():
+                if "tax_components" in variants:
+                    # product without variants (e.g. Food): one rule
+                    variants = {product: variants}
+                self.products.append((sector, product, variants))
+
+        for service, rule in categories.get("Services", {}).items():
+            self.services.append((service, rule))
+
+        self._automaton = _Automaton()
+        for i, (_, product, _) in enumerate(self.products):
+            for form in _spellings(product):
+                self._automaton.add(form, ("product", i))
+        for i, (service, _) in enumerate(self.services):
+            for form in _spellings(service):
+                self._automaton.add(form, ("service", i))
+        for i, state in enumerate(self.states):
+            self._automaton.add(state.lower(), ("state", i))
+        self._automaton.build()
+
+    @classmethod
+    def from_tax_data(cls, tax_data):
+        return cls(tax_data)
+
+    def match(self, text):
+        hits = self._automaton.find(text.lower())
+        product_ids = sorted(i for kind, i in hits if kind == "product")
+        service_ids = sorted(i for kind, i in hits if kind == "service")
+        state_ids = sorted(i for kind, i in hits if kind == "state")
+        return MatchResult(
+            [self.products[i] for i in product_ids],
+            [self.services[i] for i in service_ids],
+            [self.states[i] for i in state_ids],
+        )
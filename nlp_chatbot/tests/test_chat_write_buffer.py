@@ -0,0 +1,109 @@
+"""
+Write-behind chat buffers: batching, and staying alive when a batch fails.
+
+Run from nlp_chatbot/:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from bson import ObjectId
+from bson.errors import InvalidDocument
+from pymongo.errors import AutoReconnect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chat_store import AsyncChatWriteBuffer, ChatWriteBuffer  # noqa: E402
+
+
+class FlakyStore:
+    """append_batch raises the queued errors first, then stores batches."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.batches = []
+        self.written = []
+
+    def append_batch(self, batch):
+        self.batches.append(batch)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.written += batch
+        return [len(messages) for _, messages in batch]
+
+    def append(self, chat_id, messages):
+        self.written.append((chat_id, messages))
+
+
+class AsyncFlakyStore(FlakyStore):
+    async def append_batch(self, batch):
+        return FlakyStore.append_batch(self, batch)
+
+    async def append(self, chat_id, messages):
+        FlakyStore.append(self, chat_id, messages)
+
+
+def message(text):
+    return [{"role": "user", "text": text}]
+
+
+ERRORS = [InvalidDocument("bad key"), KeyError("seq"), TypeError("payload"), AutoReconnect("reset")]
+
+
+@pytest.mark.parametrize("error", ERRORS, ids=lambda e: type(e).__name__)
+def test_thread_writer_survives_a_failed_batch(error):
+    store = FlakyStore(error)
+    buffer = ChatWriteBuffer(store, window_ms=5)
+    chat_id = str(ObjectId())
+
+    buffer.append(chat_id, message("lost"))
+    while not store.batches:
+        time.sleep(0.001)
+    buffer.append(chat_id, message("kept"))
+    buffer.close()
+
+    assert store.written == [(chat_id, message("kept"))]
+    stats = buffer.stats()
+    assert stats["failed_batches"] == 1 and stats["failed_appends"] == 1
+    assert stats["appends"] == 1 and stats["pending"] == 0
+
+
+def test_thread_writer_batches_appends_within_the_window():
+    store = FlakyStore()
+    buffer = ChatWriteBuffer(store, window_ms=200)
+    chat_ids = [str(ObjectId()) for _ in range(5)]
+    for chat_id in chat_ids:
+        buffer.append(chat_id, message(chat_id))
+    buffer.close()
+
+    assert [chat_id for chat_id, _ in store.written] == chat_ids
+    assert buffer.stats()["batches"] == 1
+
+
+def test_thread_writer_rejects_malformed_chat_ids():
+    buffer = ChatWriteBuffer(FlakyStore(), window_ms=5)
+    with pytest.raises(ValueError):
+        buffer.append("not-an-id", message("x"))
+    buffer.close()
+
+
+@pytest.mark.parametrize("error", ERRORS, ids=lambda e: type(e).__name__)
+def test_async_writer_survives_a_failed_batch(error):
+    async def run():
+        store = AsyncFlakyStore(error)
+        buffer = AsyncChatWriteBuffer(store, window_ms=5)
+        chat_id = str(ObjectId())
+
+        await buffer.append(chat_id, message("lost"))
+        while not store.batches:
+            await asyncio.sleep(0.001)
+        await buffer.append(chat_id, message("kept"))
+        await buffer.close()
+        return store, buffer, chat_id
+
+    store, buffer, chat_id = asyncio.run(run())
+    assert store.written == [(chat_id, message("kept"))]
+    stats = buffer.stats()
+    assert stats["failed_batches"] == 1 and stats["failed_appends"] == 1
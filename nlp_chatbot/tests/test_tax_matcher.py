@@ -0,0 +1,99 @@
+"""
+TaxMatcher against plain substring scans of tax_rate.json.
+
+Run from nlp_chatbot/:
+    python -m pytest tests
+"""
+import json
+import os
+import random
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+from tax_matcher import TaxMatcher, _spellings  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def tax_data():
+    with open(os.path.join(APP_DIR, "tax_rate.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def matcher(tax_data):
+    return TaxMatcher(tax_data)
+
+
+def old_scan(tax_data, text):
+    """The linear scans the matcher replaced: catalogue names only."""
+    text = text.lower()
+    categories = tax_data["categories"]
+    products = [product for items in categories["Goods"].values() for product in items
+                if product.lower() in text]
+    services = [service for service in categories["Services"]
+                if service.replace("_", " ").lower() in text]
+    states = [state for state in tax_data.get("state_fees", {}) if state.lower() in text]
+    return products, services, states
+
+
+def spelling_scan(matcher, text):
+    """Every catalogue entry one of whose spellings occurs in text."""
+    text = text.lower()
+    products = [product for _, product, _ in matcher.products
+                if any(form in text for form in _spellings(product))]
+    services = [service for service, _ in matcher.services
+                if any(form in text for form in _spellings(service))]
+    states = [state for state in matcher.states if state.lower() in text]
+    return products, services, states
+
+
+def names(result):
+    return ([product for _, product, _ in result.products],
+            [service for service, _ in result.services],
+            result.states)
+
+
+def queries(matcher, n=500, seed=2):
+    """Random questions mixing catalogue words, aliases, plurals and filler."""
+    words = ["what", "is", "gst", "on", "a", "for", "in", "my", "new", "price", "50000", "rs"]
+    for _, product, _ in matcher.products:
+        words += _spellings(product)
+    for service, _ in matcher.services:
+        words += _spellings(service)
+    words += [state.lower() for state in matcher.states]
+    rng = random.Random(seed)
+    for _ in range(n):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        yield text.upper() if rng.random() < 0.2 else text
+
+
+def test_matches_equal_a_scan_of_every_spelling(matcher):
+    for text in queries(matcher):
+        assert names(matcher.match(text)) == spelling_scan(matcher, text), text
+
+
+def test_old_scan_hits_are_kept_in_catalogue_order(tax_data, matcher):
+    for text in queries(matcher):
+        new = names(matcher.match(text))
+        for old_hits, new_hits in zip(old_scan(tax_data, text), new):
+            assert [hit for hit in new_hits if hit in old_hits] == old_hits, text
+
+
+@pytest.mark.parametrize("text, product", [
+    ("gst on a new smartphone", "Mobile"),
+    ("price of two laptops", "Laptop"),
+    ("tax on a motorbike", "Bike"),
+])
+def test_aliases_and_plurals(matcher, text, product):
+    assert product in names(matcher.match(text))[0]
+
+
+def test_overlapping_patterns_are_all_reported(matcher):
+    state = matcher.states[0]
+    service = matcher.services[0][0]
+    text = f"{service.replace('_', ' ')}{state}".lower()
+    products, services, states = names(matcher.match(text))
+    assert service in services and state in states
@@ -0,0 +1,87 @@
+"""
+Microbenchmark: building the Mongo document for a purchase slip.
+
+  old: slip.dict() + recursive _serialize_for_mongo + created_at
+  new: to_mongo_document (per-model encoder, one pass)
+
+Both are also timed through bson.encode, which insert_many does for
+every document. Checks that both paths produce the same document.
+No MongoDB needed.
+
+Run from utti_backend/:
+    python benchmarks/bench_slip_encode.py [n_slips] [items_per_slip]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as dtime
+
+import bson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import _serialize_for_mongo, to_mongo_document  # noqa: E402
+from models import Item, PurchaseSlipDB  # noqa: E402
+
+
+def old_document(slip):
+    doc = _serialize_for_mongo(slip.dict())
+    doc["created_at"] = datetime.utcnow()
+    return doc
+
+
+def make_slips(n, items):
+    return [
+        PurchaseSlipDB(
+            utti=f"UTTI-GST-25-{i:06X}",
+            invoice_number=f"INV-{i}",
+            purchase_date=date(2025, 6, 12),
+            purchase_time=dtime(14, 30),
+            items=[
+                Item(name=f"item {k}", price=round(random.uniform(1, 5000), 2),
+                     gst_percent=random.choice([5, 12, 18, 28]), gst_amount=0)
+                for k in range(items)
+            ],
+            total_amount=0,
+            total_gst=0
+        )
+        for i in range(n)
+    ]
+
+
+def timed(fn, slips, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for slip in slips:
+            fn(slip)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    slips = make_slips(n, items)
+
+    for slip in slips[:100]:
+        old, new = old_document(slip), to_mongo_document(slip)
+        old.pop("created_at"), new.pop("created_at")
+        assert old == new, (old, new)
+
+    print(f"{n} slips x {items} items (best of 5)")
+    rows = [
+        ("old: dict + serialize", old_document),
+        ("new: single pass", to_mongo_document),
+        ("old + bson.encode", lambda s: bson.encode(old_document(s))),
+        ("new + bson.encode", lambda s: bson.encode(to_mongo_document(s))),
+    ]
+    results = {}
+    for name, fn in rows:
+        results[name] = timed(fn, slips)
+        print(f"  {name:<24} {results[name] * 1000:8.1f} ms  {n / results[name]:>10,.0f} slips/s")
+    print(f"  speedup (documents only): {results[rows[0][0]] / results[rows[1][0]]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
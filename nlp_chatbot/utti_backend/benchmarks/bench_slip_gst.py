@@ -0,0 +1,100 @@
+"""
+Microbenchmark: GST for large slips.
+
+  old: per-item float round() loop (the previous calculate_item_gst +
+       calculate_totals)
+  new: calculate_slip_gst (integer paise, whole slip as arrays), and
+       calculate_slips_gst over all slips at once as the bulk path does
+
+Also reports how far each total is from an exact Decimal computation
+with the same invoice rounding (line GST half-up to the paisa).
+No MongoDB needed.
+
+Run from utti_backend/:
+    python benchmarks/bench_slip_gst.py [items_per_slip] [n_slips]
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models import Item  # noqa: E402
+from utti_generator import calculate_slip_gst, calculate_slips_gst  # noqa: E402
+
+PAISA = Decimal("0.01")
+
+
+def old_slip_gst(items):
+    total_amount = 0.0
+    total_gst = 0.0
+    for item in items:
+        item.gst_amount = round((float(item.price or 0) * float(item.gst_percent or 0)) / 100, 2)
+        total_amount += float(item.price or 0)
+        total_gst += item.gst_amount
+    return round(total_amount, 2), round(total_gst, 2)
+
+
+def exact_slip_gst(items):
+    total_amount = total_gst = Decimal(0)
+    for item in items:
+        price = Decimal(str(item.price))
+        total_amount += price
+        total_gst += (price * Decimal(str(item.gst_percent)) / 100).quantize(PAISA, ROUND_HALF_UP)
+    return total_amount, total_gst
+
+
+def make_slip(items):
+    return [
+        Item(name=f"item {k}", price=round(random.uniform(0.5, 500), 2),
+             gst_percent=random.choice([0.25, 3, 5, 12, 18, 28]), gst_amount=0)
+        for k in range(items)
+    ]
+
+
+def timed(fn, slips, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for slip in slips:
+            fn(slip)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    random.seed(7)
+    slips = [make_slip(items) for _ in range(n)]
+
+    print(f"{n} slips x {items} items (best of 5)")
+    results = {}
+    for name, fn in (("old: float loop", old_slip_gst), ("new: integer paise", calculate_slip_gst)):
+        results[name] = timed(fn, slips)
+        per_slip = results[name] / n * 1000
+        print(f"  {name:<20} {per_slip:8.2f} ms/slip  {n * items / results[name]:>12,.0f} items/s")
+    old, new = results.values()
+    print(f"  speedup: {old / new:.1f}x")
+
+    # Bulk ingestion prices a whole chunk of slips in one call
+    start = time.perf_counter()
+    calculate_slips_gst(slips)
+    bulk = time.perf_counter() - start
+    print(f"  {'new: all slips at once':<20} {bulk / n * 1000:8.2f} ms/slip  {n * items / bulk:>12,.0f} items/s")
+
+    drift_old = drift_new = 0
+    for slip in slips:
+        exact = exact_slip_gst(slip)
+        for totals, counter in ((old_slip_gst(slip), "old"), (calculate_slip_gst(slip), "new")):
+            off = any(Decimal(str(value)) != expected for value, expected in zip(totals, exact))
+            if counter == "old":
+                drift_old += off
+            else:
+                drift_new += off
+    print(f"  slips whose totals differ from exact Decimal: old {drift_old}/{n}, new {drift_new}/{n}")
+
+
+if __name__ == "__main__":
+    main()
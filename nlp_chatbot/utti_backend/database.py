@@ -1,19 +1,94 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pymongo import MongoClient
-from typing import Optional
+from pymongo.errors import BulkWriteError
+from pydantic import BaseModel
+from typing import Optional, Union, get_args, get_origin, get_type_hints
 from datetime import datetime, date, time
 
 # -------------------------------------------------
 # MONGODB CONNECTION
 # -------------------------------------------------
 
-MONGO_URI = "mongodb://localhost:27017"
-DB_NAME = "utti_db"
+MONGO_URI = os.getenv("UTTI_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("UTTI_DB_NAME", "utti_db")
 COLLECTION_NAME = "purchase_slips"
 
+DUPLICATE_KEY = 11000
+
+SLIP_CACHE_SIZE = int(os.getenv("UTTI_SLIP_CACHE_SIZE", "10000"))
+
 client = MongoClient(MONGO_URI)
 db = client[DB_NAME]
 purchase_slips_collection = db[COLLECTION_NAME]
 
+# -------------------------------------------------
+# SLIP CACHE (slips never change once stored)
+# -------------------------------------------------
+
+class SlipLRU:
+    """
+    Bounded LRU of stored slips keyed by UTTI.
+    Only found slips are cached: a missing UTTI may be created
+    a moment later. Cached dicts are shared; do not modify them.
+    """
+
+    def __init__(self, max_entries: int = SLIP_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _size(slip: dict) -> int:
+        # rough: the dict plus its strings and item dicts
+        return sys.getsizeof(slip) + sum(
+            sys.getsizeof(v) + sum(sys.getsizeof(i) for i in v) if isinstance(v, list) else sys.getsizeof(v)
+            for v in slip.values()
+        )
+
+    def get(self, utti: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(utti)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(utti)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, utti: str, slip: dict):
+        if self.max_entries <= 0:
+            return
+        size = self._size(slip)
+        with self._lock:
+            old = self._data.pop(utti, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[utti] = (slip, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._data)
+            stats["max_entries"] = self.max_entries
+            stats["approx_bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+slip_cache = SlipLRU()
+
 # -------------------------------------------------
 # INTERNAL HELPER (MongoDB-safe conversion)
 # -------------------------------------------------
@@ -39,35 +114,156 @@ def _serialize_for_mongo(data):
 
     return data
 
+# -------------------------------------------------
+# MODEL -> MONGO DOCUMENT (single pass)
+# -------------------------------------------------
+
+def _date_to_datetime(value):
+    return datetime.combine(value, time.min)
+
+
+def _time_to_str(value):
+    return value.strftime("%H:%M")
+
+
+def _field_converter(annotation):
+    """
+    Converter for one declared field type, or None
+    when the value can be stored as it is.
+    """
+    origin = get_origin(annotation)
+    if origin is Union:
+        # Optional[X]: None passes through untouched
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return _field_converter(args[0]) if len(args) == 1 else None
+    if origin is list:
+        (inner,) = get_args(annotation) or (None,)
+        convert = _field_converter(inner)
+        return (lambda values: [convert(v) for v in values]) if convert else list
+
+    if annotation is datetime:
+        return None
+    if annotation is date:
+        return _date_to_datetime
+    if annotation is time:
+        return _time_to_str
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return model_encoder(annotation)
+    return None
+
+
+def _model_field_names(model_class):
+    # declaration order; pydantic v2 has model_fields, v1 __fields__
+    return list(getattr(model_class, "model_fields", None) or model_class.__fields__)
+
+
+@lru_cache(maxsize=None)
+def model_encoder(model_class):
+    """
+    Builds (once per model class) a function that turns a model
+    instance into a Mongo-ready dict: dates become datetimes, times
+    "HH:MM" strings, nested models dicts. Replaces model.dict()
+    followed by a recursive _serialize_for_mongo pass.
+    """
+    hints = get_type_hints(model_class)
+    fields = [(name, _field_converter(hints[name])) for name in _model_field_names(model_class)]
+
+    def encode(obj):
+        doc = {}
+        for name, convert in fields:
+            value = getattr(obj, name)
+            doc[name] = convert(value) if convert is not None and value is not None else value
+        return doc
+
+    return encode
+
+
+def to_mongo_document(slip) -> dict:
+    """
+    Mongo document for a PurchaseSlipDB (or any model);
+    plain dicts still go through _serialize_for_mongo.
+    """
+    if isinstance(slip, BaseModel):
+        return model_encoder(type(slip))(slip)
+
+    doc = _serialize_for_mongo(slip)
+    doc.setdefault("created_at", datetime.utcnow())
+    return doc
+
 # -------------------------------------------------
 # DATABASE OPERATIONS
 # -------------------------------------------------
 
-def insert_purchase_slip(slip_data: dict) -> str:
+def ensure_indexes():
     """
-    Inserts a purchase slip into MongoDB
-    after converting unsupported types.
-    Returns inserted document ID.
+    The unique index is what keeps UTTIs unique across
+    workers; inserts that collide raise DuplicateKeyError
     """
-    safe_data = _serialize_for_mongo(slip_data)
-    safe_data["created_at"] = datetime.utcnow()
+    purchase_slips_collection.create_index("utti", unique=True)
 
-    result = purchase_slips_collection.insert_one(safe_data)
+
+def insert_purchase_slip(slip) -> str:
+    """
+    Inserts a purchase slip (PurchaseSlipDB or dict) into
+    MongoDB after converting unsupported types.
+    Returns inserted document ID.
+    Raises DuplicateKeyError if the UTTI is taken.
+    """
+    result = purchase_slips_collection.insert_one(to_mongo_document(slip))
     return str(result.inserted_id)
 
 
+def insert_purchase_slips(slips: list) -> dict:
+    """
+    Inserts many purchase slips with one unordered insert_many.
+    Returns {index: write error} for the slips that failed
+    (code DUPLICATE_KEY: UTTI taken); the others are stored.
+    """
+    docs = [to_mongo_document(slip) for slip in slips]
+
+    try:
+        purchase_slips_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"]: err for err in e.details["writeErrors"]}
+    return {}
+
+
 def get_slip_by_utti(utti: str) -> Optional[dict]:
     """
-    Fetch purchase slip using UTTI
+    Fetch purchase slip using UTTI (cached)
     """
-    return purchase_slips_collection.find_one(
+    slip = slip_cache.get(utti)
+    if slip is not None:
+        return slip
+
+    slip = purchase_slips_collection.find_one(
         {"utti": utti},
         {"_id": 0}  # hide internal Mongo ID
     )
+    if slip is not None:
+        slip_cache.put(utti, slip)
+    return slip
 
 
-def utti_exists(utti: str) -> bool:
+def get_slips_by_utti(uttis: list) -> dict:
     """
-    Checks whether a UTTI already exists
+    Fetch many purchase slips at once: cached ones from memory,
+    the rest with a single $in query. Returns {utti: slip} for
+    the UTTIs that exist.
     """
-    return purchase_slips_collection.count_documents({"utti": utti}) > 0
+    found = {}
+    missing = []
+    for utti in dict.fromkeys(uttis):
+        slip = slip_cache.get(utti)
+        if slip is not None:
+            found[utti] = slip
+        else:
+            missing.append(utti)
+
+    if missing:
+        for slip in purchase_slips_collection.find({"utti": {"$in": missing}}, {"_id": 0}):
+            slip_cache.put(slip["utti"], slip)
+            found[slip["utti"]] = slip
+
+    return found
+
@@ -1,22 +1,50 @@
-from fastapi import FastAPI, HTTPException
+import json
+import time
+
+from typing import List
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from starlette.concurrency import run_in_threadpool
 
 from models import (
     PurchaseSlipCreate,
     PurchaseSlipDB,
-    UTTIResponse
+    UTTIResponse,
+    BulkSlipCreate,
+    BulkSlipResult,
+    BulkSlipResponse
 )
 from utti_generator import (
     generate_utti,
-    calculate_item_gst,
-    calculate_totals
+    generate_uttis,
+    calculate_slip_gst,
+    calculate_slips_gst
 )
 from database import (
+    ensure_indexes,
     insert_purchase_slip,
+    insert_purchase_slips,
     get_slip_by_utti,
-    utti_exists
+    get_slips_by_utti,
+    slip_cache,
+    DUPLICATE_KEY
 )
 
+# Slips per insert_many during bulk ingestion
+BULK_CHUNK_SIZE = 1000
+
+# Fresh UTTIs tried per slip before giving up (a collision needs
+# two identical random parts, 6 characters of [A-Z0-9] or ~31 bits,
+# in the same year)
+UTTI_INSERT_ATTEMPTS = 8
+
+# UTTIs accepted by one GET /slips call
+MAX_MULTI_GET = 500
+
 app = FastAPI(title="UTTI Slip Generation Service")
 
 # -------------------------------------------------
@@ -30,6 +58,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -------------------------------------------------
+# INDEXES
+# -------------------------------------------------
+@app.on_event("startup")
+def create_indexes():
+    try:
+        ensure_indexes()
+    except PyMongoError as e:
+        print("⚠️ Could not create indexes:", e)
+
 # -------------------------------------------------
 # HEALTH CHECK
 # -------------------------------------------------
@@ -48,26 +86,13 @@ def create_purchase_slip(payload: PurchaseSlipCreate):
     and returns UTTI.
     """
 
-    # Calculate GST per item
-    processed_items = []
-    for item in payload.items:
-        gst_amount = calculate_item_gst(item.price, item.gst_percent)
-        item.gst_amount = gst_amount
-        processed_items.append(item)
-
-    # Calculate totals
-    total_amount, total_gst = calculate_totals(processed_items)
-
-    # Generate unique UTTI
-    utti = generate_utti("GST")
-
-    # Ensure uniqueness (very rare but safe)
-    while utti_exists(utti):
-        utti = generate_utti("GST")
+    # Calculate GST per item and totals (integer paise)
+    processed_items = payload.items
+    total_amount, total_gst = calculate_slip_gst(processed_items)
 
     # Build DB object
     slip_record = PurchaseSlipDB(
-        utti=utti,
+        utti=generate_utti("GST"),
         invoice_number=payload.invoice_number,
         purchase_date=payload.purchase_date,
         purchase_time=payload.purchase_time,
@@ -76,8 +101,18 @@ def create_purchase_slip(payload: PurchaseSlipCreate):
         total_gst=total_gst
     )
 
-    # Insert into database
-    insert_purchase_slip(slip_record.dict())
+    # Insert into database; the unique index rejects a taken
+    # UTTI, so draw a new one and retry
+    for _ in range(UTTI_INSERT_ATTEMPTS):
+        try:
+            insert_purchase_slip(slip_record)
+            break
+        except DuplicateKeyError:
+            slip_record.utti = generate_utti("GST")
+    else:
+        raise HTTPException(status_code=503, detail="Could not allocate a unique UTTI")
+
+    utti = slip_record.utti
 
     return UTTIResponse(
         message="UTTI generated successfully",
@@ -101,3 +136,227 @@ def fetch_slip_by_utti(utti: str):
         raise HTTPException(status_code=404, detail="UTTI not found")
 
     return slip
+
+# -------------------------------------------------
+# FETCH MANY SLIPS (GET /slips?utti=..&utti=..)
+# -------------------------------------------------
+@app.get("/slips")
+def fetch_slips_by_utti(utti: List[str] = Query(...)):
+    """
+    Found slips in request order, plus the UTTIs that do not exist.
+    """
+    if len(utti) > MAX_MULTI_GET:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MULTI_GET} UTTIs per request")
+
+    found = get_slips_by_utti(utti)
+    return {
+        "slips": [found[u] for u in dict.fromkeys(utti) if u in found],
+        "missing": [u for u in dict.fromkeys(utti) if u not in found]
+    }
+
+@app.get("/cache/stats")
+def slip_cache_stats():
+    return slip_cache.stats()
+
+
+# -------------------------------------------------
+# BULK INGESTION (end-of-day merchant batches)
+# -------------------------------------------------
+def _insert_with_retry(records: list) -> dict:
+    """
+    Inserts PurchaseSlipDB records; those whose UTTI is taken get
+    a new one and only those are inserted again.
+    Returns {position: error message} for records that failed.
+    """
+    errors = {}
+    pending = list(range(len(records)))
+
+    for attempt in range(UTTI_INSERT_ATTEMPTS):
+        failed = insert_purchase_slips([records[i] for i in pending])
+        retry = []
+        for j, error in failed.items():
+            pos = pending[j]
+            if error["code"] == DUPLICATE_KEY and attempt + 1 < UTTI_INSERT_ATTEMPTS:
+                records[pos].utti = generate_utti("GST")
+                retry.append(pos)
+            else:
+                errors[pos] = error["errmsg"]
+        if not retry:
+            break
+        pending = retry
+
+    return errors
+
+
+def _ingest_chunk(indexed_slips: list) -> list:
+    """
+    indexed_slips: [(index, PurchaseSlipCreate)].
+    Computes GST, assigns UTTIs and stores the whole chunk
+    with one insert; returns a BulkSlipResult per slip.
+    """
+    slips = [slip for _, slip in indexed_slips]
+    totals = calculate_slips_gst(slips)
+    uttis = generate_uttis(len(slips))
+
+    records = [
+        PurchaseSlipDB(
+            utti=utti,
+            invoice_number=slip.invoice_number,
+            purchase_date=slip.purchase_date,
+            purchase_time=slip.purchase_time,
+            items=slip.items,
+            total_amount=total_amount,
+            total_gst=total_gst
+        )
+        for slip, utti, (total_amount, total_gst) in zip(slips, uttis, totals)
+    ]
+    errors = _insert_with_retry(records)
+
+    results = []
+    for pos, (index, slip) in enumerate(indexed_slips):
+        if pos in errors:
+            results.append(BulkSlipResult(
+                index=index,
+                invoice_number=slip.invoice_number,
+                status="failed",
+                error=errors[pos]
+            ))
+        else:
+            results.append(BulkSlipResult(
+                index=index,
+                invoice_number=slip.invoice_number,
+                status="created",
+                utti=records[pos].utti,
+                total_gst=records[pos].total_gst
+            ))
+    return results
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body
+    is still being read. The stock class listens for disconnects on
+    the same receive channel and would swallow request chunks;
+    request.stream() reports disconnects here instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def _throughput(count: int, start: float) -> dict:
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "slips_per_second": round(count / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+
+@app.post("/create-slips/bulk", response_model=BulkSlipResponse)
+def create_purchase_slips_bulk(payload: BulkSlipCreate):
+    """
+    Creates many slips in one request. Every slip gets its own
+    result; a failed slip does not stop the others.
+    """
+    start = time.perf_counter()
+    indexed = list(enumerate(payload.slips))
+
+    results = []
+    for offset in range(0, len(indexed), BULK_CHUNK_SIZE):
+        try:
+            results += _ingest_chunk(indexed[offset:offset + BULK_CHUNK_SIZE])
+        except PyMongoError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Storage failed after slip {offset} (earlier slips are stored): {e}"
+            )
+
+    created = sum(1 for r in results if r.status == "created")
+    return BulkSlipResponse(
+        message="Bulk ingestion finished",
+        total=len(results),
+        created=created,
+        failed=len(results) - created,
+        results=results,
+        **_throughput(len(results), start)
+    )
+
+
+@app.post("/create-slips/bulk/stream")
+async def create_purchase_slips_stream(request: Request):
+    """
+    NDJSON in, NDJSON out: one PurchaseSlipCreate per request line,
+    one BulkSlipResult per response line as each chunk is stored,
+    and a final {"summary": ...} line.
+
+    If a chunk cannot be stored (Mongo unreachable, timeout), the
+    stream ends with {"error": ..., "committed": n, ...}: every slip
+    before index n has its result line above, nothing from n on is
+    confirmed (part of the failed chunk may still have been stored).
+    """
+
+    def line(data: dict) -> str:
+        return json.dumps(data, default=str) + "\n"
+
+    async def results():
+        start = time.perf_counter()
+        counts = {"created": 0, "failed": 0}
+        pending = []
+        index = 0
+        buffer = b""
+
+        def parse(raw: bytes):
+            nonlocal index
+            raw = raw.strip()
+            if not raw:
+                return None
+            index += 1
+            try:
+                pending.append((index - 1, PurchaseSlipCreate(**json.loads(raw))))
+                return None
+            except (ValueError, TypeError, ValidationError) as e:
+                return BulkSlipResult(index=index - 1, status="failed", error=str(e))
+
+        async def flush():
+            """(results, None), or ([], error line) if the chunk failed."""
+            chunk = pending[:]
+            pending.clear()
+            try:
+                return await run_in_threadpool(_ingest_chunk, chunk), None
+            except PyMongoError as e:
+                return [], {"error": f"Storage failed: {e}", "committed": chunk[0][0], **counts}
+
+        async for data in request.stream():
+            buffer += data
+            *raw_lines, buffer = buffer.split(b"\n")
+            for raw in raw_lines:
+                bad = parse(raw)
+                if bad is not None:
+                    counts["failed"] += 1
+                    yield line(bad.dict())
+                if len(pending) >= BULK_CHUNK_SIZE:
+                    chunk_results, error = await flush()
+                    for result in chunk_results:
+                        counts[result.status] += 1
+                        yield line(result.dict())
+                    if error is not None:
+                        yield line(error)
+                        return
+
+        bad = parse(buffer)
+        if bad is not None:
+            counts["failed"] += 1
+            yield line(bad.dict())
+        if pending:
+            chunk_results, error = await flush()
+            for result in chunk_results:
+                counts[result.status] += 1
+                yield line(result.dict())
+            if error is not None:
+                yield line(error)
+                return
+
+        total = counts["created"] + counts["failed"]
+        yield line({"summary": {"total": total, **counts, **_throughput(total, start)}})
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
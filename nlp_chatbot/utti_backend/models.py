@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import date, time, datetime
 
+from utti_generator import to_rate_units
+
 
 # -------------------------------------------------
 # ITEM MODEL (each product in the slip)
@@ -12,6 +14,12 @@ class Item(BaseModel):
     gst_percent: float = Field(..., example=18)
     gst_amount: float = Field(..., example=14400)
 
+    @field_validator("gst_percent")
+    @classmethod
+    def whole_rate_units(cls, value):
+        to_rate_units([value])   # ValueError for rates it would have to round
+        return value
+
 
 # -------------------------------------------------
 # PURCHASE SLIP INPUT MODEL (from frontend)
@@ -47,3 +55,29 @@ class UTTIResponse(BaseModel):
     utti: str = Field(..., example="UTTI-GST-25-A9F3KQ")
     total_items: int = Field(..., example=2)
     total_gst: float = Field(..., example=14580)
+
+
+# -------------------------------------------------
+# BULK INGESTION MODELS
+# -------------------------------------------------
+class BulkSlipCreate(BaseModel):
+    slips: List[PurchaseSlipCreate]
+
+
+class BulkSlipResult(BaseModel):
+    index: int
+    invoice_number: Optional[str] = None
+    status: str = Field(..., example="created")   # created | failed
+    utti: Optional[str] = None
+    total_gst: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BulkSlipResponse(BaseModel):
+    message: str = Field(..., example="Bulk ingestion finished")
+    total: int
+    created: int
+    failed: int
+    elapsed_seconds: float
+    slips_per_second: float
+    results: List[BulkSlipResult]
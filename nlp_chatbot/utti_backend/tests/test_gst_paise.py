@@ -0,0 +1,87 @@
+"""
+Integer-paise GST against an exact Decimal reference.
+
+Run from utti_backend/:
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utti_generator import (  # noqa: E402
+    RATE_SCALE,
+    calculate_slips_gst,
+    gst_paise,
+    to_paise,
+    to_rate_units,
+)
+from models import Item  # noqa: E402
+
+RATES = [0, 0.1, 0.125, 0.25, 1, 1.5, 3, 5, 12, 12.5, 18, 28]
+
+
+def reference_paise(price, rate):
+    """GST of one line as on an invoice: decimal arithmetic, half-up to the paisa."""
+    gst = Decimal(str(price)) * Decimal(str(rate)) / 100
+    return int(gst.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def test_gst_paise_matches_decimal_reference():
+    rng = random.Random(17)
+    prices = [round(rng.uniform(0, 1_000_000), 2) for _ in range(20_000)]
+    rates = [rng.choice(RATES) for _ in prices]
+
+    got = gst_paise(to_paise(prices), to_rate_units(rates)).tolist()
+
+    assert got == [reference_paise(p, r) for p, r in zip(prices, rates)]
+
+
+@pytest.mark.parametrize("price, rate", [
+    (1.005, 100),     # 100.5 paise: the float product is 100.4999...
+    (0.5, 1),         # GST of exactly half a paisa
+    (999.99, 0.125),
+    (-250.5, 18),     # credit notes round away from zero too
+])
+def test_gst_paise_ties_round_half_up(price, rate):
+    got = int(gst_paise(to_paise([price]), to_rate_units([rate]))[0])
+    assert got == reference_paise(price, rate)
+
+
+def test_to_paise_rounds_decimal_ties_up():
+    assert to_paise([1.005, 2.675, 0.285, "10.005", Decimal("0.125")]).tolist() == [101, 268, 29, 1001, 13]
+
+
+def test_fractional_rates_are_exact():
+    assert to_rate_units([18, 0.125, "0.25"]).tolist() == [18 * RATE_SCALE, 1250, 2500]
+
+
+@pytest.mark.filterwarnings("ignore:invalid value encountered in cast")
+@pytest.mark.parametrize("rate", [0.00001, "0.123456", float("nan")])
+def test_rates_finer_than_a_unit_are_rejected(rate):
+    with pytest.raises(ValueError):
+        to_rate_units([rate])
+
+
+def test_item_rejects_unrepresentable_rate():
+    with pytest.raises(ValueError):
+        Item(name="x", price=100, gst_percent=0.00001, gst_amount=0)
+
+
+def test_slip_totals_are_sums_of_rounded_lines():
+    items = [Item(name=str(i), price=p, gst_percent=r, gst_amount=0)
+             for i, (p, r) in enumerate([(10.01, 18), (0.05, 5), (999.99, 0.125), (1.005, 12)])]
+    (total_amount, total_gst), = calculate_slips_gst([items])
+
+    assert total_gst == sum(reference_paise(it.price, it.gst_percent) for it in items) / 100
+    assert total_amount == sum(int(to_paise([it.price])[0]) for it in items) / 100
+    assert [it.gst_amount for it in items] == [reference_paise(it.price, it.gst_percent) / 100 for it in items]
+
+
+def test_overflowing_amounts_are_rejected():
+    with pytest.raises(ValueError):
+        gst_paise(np.array([10 ** 15], dtype=np.int64), to_rate_units([28]))
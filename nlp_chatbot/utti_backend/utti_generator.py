@@ -1,10 +1,32 @@
-import uuid
+import secrets
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
 
 
 # -------------------------------------------------
 # UTTI GENERATION LOGIC
 # -------------------------------------------------
+# The random part uses all of [A-Z0-9]: 36^6 ≈ 2.18 billion IDs per
+# tax type and year (6 hex digits gave 16.7 million). A new ID collides
+# with probability stored / UTTI_SPACE, e.g. 0.5% at 10 million stored
+# for the year; collisions are retried by the insert paths.
+UTTI_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+UTTI_RANDOM_CHARS = 6
+UTTI_SPACE = len(UTTI_ALPHABET) ** UTTI_RANDOM_CHARS
+
+
+def random_part(chars: int = UTTI_RANDOM_CHARS) -> str:
+    """`chars` uniformly random characters of UTTI_ALPHABET."""
+    n = secrets.randbelow(len(UTTI_ALPHABET) ** chars)
+    out = []
+    for _ in range(chars):
+        n, digit = divmod(n, len(UTTI_ALPHABET))
+        out.append(UTTI_ALPHABET[digit])
+    return "".join(reversed(out))
+
+
 def generate_utti(tax_type: str = "GST") -> str:
     """
     Generates a unique Universal Tax Trace Identifier (UTTI)
@@ -17,9 +39,123 @@ def generate_utti(tax_type: str = "GST") -> str:
     """
 
     year = datetime.utcnow().strftime("%y")
-    random_part = uuid.uuid4().hex[:6].upper()
 
-    return f"UTTI-{tax_type}-{year}-{random_part}"
+    return f"UTTI-{tax_type}-{year}-{random_part()}"
+
+
+def generate_uttis(count: int, tax_type: str = "GST") -> list:
+    """
+    Generates `count` distinct UTTIs at once (bulk ingestion),
+    same format as generate_utti
+    """
+    year = datetime.utcnow().strftime("%y")
+    uttis = set()
+
+    while len(uttis) < count:
+        uttis.update(
+            f"UTTI-{tax_type}-{year}-{random_part()}"
+            for _ in range(count - len(uttis))
+        )
+
+    return list(uttis)
+
+
+# -------------------------------------------------
+# GST IN INTEGER PAISE
+# -------------------------------------------------
+# Amounts are computed in whole paise (int64) and rates in ten-
+# thousandths of a percent (18% -> 180000, a 0.125% cess -> 1250), so
+# the only rounding is one step per line, as on a GST invoice: line GST
+# is rounded half away from zero to the paisa, and slip totals are exact
+# sums of the rounded lines. Rates finer than RATE_SCALE are rejected,
+# never rounded.
+RATE_SCALE = 10_000
+_GST_DIVISOR = 100 * RATE_SCALE
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+_PAISA = Decimal("0.01")
+
+
+def _exact_scaled(value, scale: int) -> int:
+    step = _PAISA if scale == 100 else Decimal(1) / scale
+    return int(Decimal(str(value)).quantize(step, rounding=ROUND_HALF_UP) * scale)
+
+
+def _scaled_ints(values, scale: int) -> np.ndarray:
+    """
+    values x scale as int64, rounded half away from zero in decimal, as
+    on an invoice: a float counts as its shortest repr, so 1.005 rupees
+    is 100.5 paise -> 101 (1.005 * 100 in binary floating point is
+    100.49999...).
+
+    Floats are scaled and rounded as arrays; only values whose scaled
+    fraction lies within float error of .5 go through Decimal. Strings
+    and Decimals always do.
+    """
+    arr = np.asarray(values)
+    flat = arr.reshape(-1)
+    if arr.dtype.kind in "iub":
+        return arr.astype(np.int64) * scale
+    if arr.dtype.kind != "f":
+        exact = (_exact_scaled(v, scale) for v in flat.tolist())
+        return np.fromiter(exact, dtype=np.int64, count=flat.size).reshape(arr.shape)
+
+    scaled = flat * scale
+    magnitude = np.abs(scaled)
+    out = (np.sign(scaled) * np.floor(magnitude + 0.5)).astype(np.int64)
+    # the float error of x * scale is ~1e-16 relative; 1e-9 leaves room
+    near_tie = np.abs(magnitude % 1 - 0.5) <= 1e-9 * np.maximum(1.0, magnitude)
+    for i in np.flatnonzero(near_tie).tolist():
+        out[i] = _exact_scaled(float(flat[i]), scale)
+    return out.reshape(arr.shape)
+
+
+def to_paise(rupees) -> np.ndarray:
+    """Rupee amounts (floats, ints, Decimals or numeric strings) -> int64 paise"""
+    return _scaled_ints(rupees, 100)
+
+
+def to_rate_units(gst_percent) -> np.ndarray:
+    """
+    GST percentages -> int64 ten-thousandths of a percent.
+    Raises ValueError for a rate that is not a whole number of units.
+    """
+    units = _scaled_ints(gst_percent, RATE_SCALE)
+    rates = np.asarray(gst_percent)
+    if rates.dtype.kind in "iub":
+        return units
+    if rates.dtype.kind == "f":
+        scaled = rates * RATE_SCALE
+        # NaN compares False, so it is rejected too
+        inexact = ~(np.abs(scaled - units) <= 1e-9 * np.maximum(1.0, np.abs(scaled)))
+    else:
+        inexact = np.array([
+            Decimal(str(rate)) * RATE_SCALE != unit
+            for rate, unit in zip(rates.reshape(-1).tolist(), units.reshape(-1).tolist())
+        ], dtype=bool).reshape(rates.shape)
+    if inexact.any():
+        raise ValueError(f"GST rate {rates[inexact].reshape(-1)[0]}% is not a whole multiple of 1/{RATE_SCALE} of a percent")
+    return units
+
+
+def gst_paise(price_paise: np.ndarray, rate_units: np.ndarray) -> np.ndarray:
+    """
+    GST per line in paise, rounded half away from zero.
+    Exact integer arithmetic (no float step); raises ValueError
+    if price x rate would not fit in int64.
+    """
+    if price_paise.size and int(np.abs(price_paise).max()) * int(np.abs(rate_units).max()) > _INT64_MAX:
+        raise ValueError("amount too large for exact GST arithmetic")
+    product = price_paise * rate_units
+    return np.sign(product) * ((np.abs(product) + _GST_DIVISOR // 2) // _GST_DIVISOR)
+
+
+def _item_arrays(items: list) -> tuple:
+    count = len(items)
+    prices = np.fromiter((item.price or 0 for item in items), dtype=np.float64, count=count)
+    rates = np.fromiter((item.gst_percent or 0 for item in items), dtype=np.float64, count=count)
+    return to_paise(prices), to_rate_units(rates)
 
 
 # -------------------------------------------------
@@ -29,10 +165,8 @@ def calculate_item_gst(price: float, gst_percent: float) -> float:
     """
     Calculates GST amount for a single item
     """
-    price = float(price or 0)
-    gst_percent = float(gst_percent or 0)
-
-    return round((price * gst_percent) / 100, 2)
+    gst = gst_paise(to_paise([price or 0]), to_rate_units([gst_percent or 0]))
+    return int(gst[0]) / 100
 
 
 def calculate_totals(items: list) -> tuple:
@@ -41,15 +175,43 @@ def calculate_totals(items: list) -> tuple:
 
     items: list of Item models (from models.py)
     """
+    count = len(items)
+    prices = to_paise(np.fromiter((item.price or 0 for item in items), dtype=np.float64, count=count))
+    gst = to_paise(np.fromiter((item.gst_amount or 0 for item in items), dtype=np.float64, count=count))
+
+    return int(prices.sum()) / 100, int(gst.sum()) / 100
+
+
+def calculate_slip_gst(items: list) -> tuple:
+    """
+    Sets gst_amount on every item of one slip and returns
+    (total_amount, total_gst), all lines priced at once
+    """
+    return calculate_slips_gst([items])[0]
+
+
+def calculate_slips_gst(slips: list) -> list:
+    """
+    Calculates item GST and totals for many slips in one pass
+    (bulk ingestion). Sets gst_amount on every item and returns
+    (total_amount, total_gst) per slip.
+
+    slips: slip models with .items, or plain item lists
+    """
+    item_lists = [slip if isinstance(slip, list) else slip.items for slip in slips]
+    items = [item for item_list in item_lists for item in item_list]
 
-    total_amount = 0.0
-    total_gst = 0.0
+    price, rate = _item_arrays(items)
+    gst = gst_paise(price, rate)
 
-    for item in items:
-        price = float(item.price or 0)
-        gst_amount = float(item.gst_amount or 0)
+    for item, amount in zip(items, gst.tolist()):
+        item.gst_amount = amount / 100
 
-        total_amount += price
-        total_gst += gst_amount
+    # Per-slip sums from running totals; empty slips come out as 0
+    bounds = np.cumsum([0] + [len(item_list) for item_list in item_lists])
+    price_sums = np.concatenate(([0], np.cumsum(price)))
+    gst_sums = np.concatenate(([0], np.cumsum(gst)))
+    total_amount = (price_sums[bounds[1:]] - price_sums[bounds[:-1]]).tolist()
+    total_gst = (gst_sums[bounds[1:]] - gst_sums[bounds[:-1]]).tolist()
 
-    return round(total_amount, 2), round(total_gst, 2)
+    return [(amount / 100, tax / 100) for amount, tax in zip(total_amount, total_gst)]
@@ -0,0 +1,317 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==============================
+# CONFIG
+# ==============================
+UTTI_POOL_SIZE = int(os.getenv("UTTI_POOL_SIZE", "20"))
+UTTI_MAX_CONCURRENCY = int(os.getenv("UTTI_MAX_CONCURRENCY", "20"))
+UTTI_RETRIES = int(os.getenv("UTTI_RETRIES", "3"))
+UTTI_TIMEOUT = float(os.getenv("UTTI_TIMEOUT", "5"))
+UTTI_CACHE_SIZE = int(os.getenv("UTTI_CACHE_SIZE", "4096"))
+UTTI_CACHE_TTL = float(os.getenv("UTTI_CACHE_TTL", "3600"))
+UTTI_NEGATIVE_TTL = float(os.getenv("UTTI_NEGATIVE_TTL", "30"))
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+class UTTIServiceError(Exception):
+    """
+    The UTTI service could not be reached (after retries)
+    or answered with an unexpected status.
+    """
+
+
+# ==============================
+# LRU + TTL CACHE
+# ==============================
+_MISSING = object()
+
+
+class SlipCache:
+    """
+    Bounded LRU of fetched slips. Slips are immutable once created,
+    so positive entries live long; "not found" answers are cached
+    for a short time only, in case the slip is created shortly after.
+    """
+
+    def __init__(self, max_entries=UTTI_CACHE_SIZE, ttl=UTTI_CACHE_TTL, negative_ttl=UTTI_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached slip, None for a cached "not found",
+        or _MISSING when there is no fresh entry.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def backoff_delay(attempt, base=0.1, cap=2.0):
+    # "full jitter" exponential backoff
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ==============================
+# POOLED CLIENTS
+# ==============================
+class _BaseUTTIClient:
+    """
+    Cache lookup, status handling and counters shared by the
+    sync and async clients.
+    """
+
+    def __init__(self, base_url, retries, timeout, cache):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache if cache is not None else SlipCache()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            # async lookups that joined an in-flight fetch of the same UTTI
+            "coalesced": 0,
+            "requests": 0,
+            "retries": 0,
+            "not_found": 0,
+            "errors": 0,
+        }
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _cached(self, utti):
+        cached = self.cache.get(utti)
+        if cached is not _MISSING:
+            self._count("hits" if cached is not None else "negative_hits")
+        return cached
+
+    def _store(self, utti, slip):
+        if slip is None:
+            self._count("not_found")
+        self.cache.put(utti, slip)
+
+    def _handle_status(self, status_code):
+        """
+        True: slip found, False: not found, None: retry.
+        """
+        if status_code == 200:
+            return True
+        if status_code == 404:
+            return False
+        if status_code in RETRY_STATUSES:
+            return None
+        raise UTTIServiceError(f"UTTI service returned {status_code}")
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        stats["cache_entries"] = len(self.cache)
+        return stats
+
+
+class UTTIClient(_BaseUTTIClient):
+    """
+    Keep-alive client for the UTTI slip service.
+
+    One requests.Session with a connection pool is shared by all
+    threads, the number of in-flight calls is bounded, transient
+    failures are retried with jittered backoff, and slips are served
+    from a local LRU+TTL cache when possible.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=UTTI_POOL_SIZE,
+        max_concurrency=UTTI_MAX_CONCURRENCY,
+        retries=UTTI_RETRIES,
+        timeout=UTTI_TIMEOUT,
+        cache=None
+    ):
+        super().__init__(base_url, retries, timeout, cache)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _fetch(self, utti):
+        url = f"{self.base_url}/{utti}"
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(backoff_delay(attempt - 1))
+            try:
+                with self._slots:
+                    self._count("requests")
+                    resp = self._session.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                last_error = e
+                continue
+
+            found = self._handle_status(resp.status_code)
+            if found is None:
+                last_error = UTTIServiceError(f"UTTI service returned {resp.status_code}")
+                continue
+            return resp.json() if found else None
+
+        raise UTTIServiceError(f"UTTI service unavailable: {last_error}")
+
+    def get_slip(self, utti):
+        """
+        Returns the slip dict, or None if the UTTI does not exist.
+        Raises UTTIServiceError if the service cannot be reached.
+        """
+        cached = self._cached(utti)
+        if cached is not _MISSING:
+            return cached
+
+        self._count("misses")
+        try:
+            slip = self._fetch(utti)
+        except UTTIServiceError:
+            self._count("errors")
+            raise
+
+        self._store(utti, slip)
+        return slip
+
+    def close(self):
+        self._session.close()
+
+
+class AsyncUTTIClient(_BaseUTTIClient):
+    """
+    asyncio counterpart of UTTIClient built on httpx.AsyncClient.
+    Concurrent lookups of the same UTTI share one upstream call.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=UTTI_POOL_SIZE,
+        max_concurrency=UTTI_MAX_CONCURRENCY,
+        retries=UTTI_RETRIES,
+        timeout=UTTI_TIMEOUT,
+        cache=None
+    ):
+        super().__init__(base_url, retries, timeout, cache)
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size
+        )
+        self._max_concurrency = max_concurrency
+        self._client = None
+        self._slots = None
+        self._inflight = {}
+
+    def _http(self):
+        # created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self._limits, timeout=self.timeout)
+            self._slots = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    async def _fetch(self, utti):
+        client = self._http()
+        url = f"{self.base_url}/{utti}"
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+                await asyncio.sleep(backoff_delay(attempt - 1))
+            try:
+                async with self._slots:
+                    self._count("requests")
+                    resp = await client.get(url)
+            except httpx.HTTPError as e:
+                last_error = e
+                continue
+
+            found = self._handle_status(resp.status_code)
+            if found is None:
+                last_error = UTTIServiceError(f"UTTI service returned {resp.status_code}")
+                continue
+            return resp.json() if found else None
+
+        raise UTTIServiceError(f"UTTI service unavailable: {last_error}")
+
+    async def get_slip(self, utti):
+        cached = self._cached(utti)
+        if cached is not _MISSING:
+            return cached
+
+        pending = self._inflight.get(utti)
+        if pending is not None:
+            self._count("coalesced")
+            return await asyncio.shield(pending)
+
+        self._count("misses")
+        task = asyncio.ensure_future(self._fetch(utti))
+        self._inflight[utti] = task
+        # Stored by the task itself: the fetch completes (and is
+        # cached) even if the caller that started it is cancelled
+        task.add_done_callback(lambda done: self._fetched(utti, done))
+        return await asyncio.shield(task)
+
+    def _fetched(self, utti, task):
+        self._inflight.pop(utti, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            self._store(utti, task.result())
+        elif isinstance(error, UTTIServiceError):
+            self._count("errors")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None